@@ -0,0 +1,328 @@
+"""
+ARP Packet I/O - One long-lived layer-2 socket and prebuilt ARP frames.
+
+Building `Ether()/ARP()` objects in scapy and opening a fresh socket for
+every `srp()`/`send()` call costs far more CPU than the packets themselves.
+This module keeps a single layer-2 socket open for the life of the process
+and builds frames from byte templates, patching only the address fields:
+
+    0   Ethernet destination    6 bytes
+    6   Ethernet source         6 bytes
+    12  EtherType (0x0806)      2 bytes
+    14  ARP fixed header        8 bytes (hw type, proto type, sizes, opcode)
+    22  sender MAC / IP         6 + 4 bytes
+    32  target MAC / IP         6 + 4 bytes
+
+Linux uses an AF_PACKET socket bound to the interface that owns our IP.
+Other platforms fall back to scapy's `conf.L2socket` (opened once, fed raw bytes).
+"""
+
+import socket
+import struct
+import select
+import threading
+import time
+
+from scan_control import POLL_INTERVAL
+from interfaces import interface_for
+
+ETH_P_ARP = 0x0806
+ETH_P_IP = 0x0800
+ARP_REQUEST = 1
+ARP_REPLY = 2
+
+BROADCAST_MAC = b"\xff" * 6
+ZERO_MAC = b"\x00" * 6
+ZERO_IP = b"\x00" * 4
+
+# Ethernet II header + ARP for IPv4 over Ethernet (42 bytes)
+ARP_FRAME = struct.Struct("!6s6sHHHBBH6s4s6s4s")
+
+SIOCGIFADDR = 0x8915
+SIOCGIFHWADDR = 0x8927
+
+
+def mac_to_bytes(mac):
+    """Converts 'AA:BB:CC:DD:EE:FF' (or dash-separated) to 6 bytes."""
+    return bytes.fromhex(mac.replace(":", "").replace("-", ""))
+
+
+def _format_mac(raw):
+    return ":".join(f"{b:02X}" for b in raw)
+
+
+def parse_arp(frame):
+    """Returns (opcode, sender IP, sender MAC) for an Ethernet ARP frame, else None."""
+    if len(frame) < ARP_FRAME.size or frame[12:14] != b"\x08\x06":
+        return None
+    op = (frame[20] << 8) | frame[21]
+    return op, socket.inet_ntoa(frame[28:32]), _format_mac(frame[22:28])
+
+
+class ArpFrameBuilder:
+    """
+    Builds ARP request/reply frames for one source MAC/IP from byte templates.
+    """
+
+    def __init__(self, src_mac, src_ip):
+        self.src_mac = mac_to_bytes(src_mac)
+        self.src_ip = socket.inet_aton(src_ip) if src_ip else ZERO_IP
+        self._request = ARP_FRAME.pack(BROADCAST_MAC, self.src_mac, ETH_P_ARP, 1, ETH_P_IP, 6, 4,
+                                       ARP_REQUEST, self.src_mac, self.src_ip, ZERO_MAC, ZERO_IP)
+        self._reply = ARP_FRAME.pack(BROADCAST_MAC, self.src_mac, ETH_P_ARP, 1, ETH_P_IP, 6, 4,
+                                     ARP_REPLY, self.src_mac, self.src_ip, ZERO_MAC, ZERO_IP)
+        # Everything in a broadcast request except the target IP
+        self._broadcast_head = self._request[:38]
+
+    def requests(self, target_ips):
+        """Broadcast who-has frames for many IPs."""
+        head = self._broadcast_head
+        return [head + socket.inet_aton(ip) for ip in target_ips]
+
+    def request(self, target_ip, target_mac=None):
+        """A who-has frame for `target_ip`; unicast to `target_mac` when given."""
+        if not target_mac:
+            return self._broadcast_head + socket.inet_aton(target_ip)
+        frame = bytearray(self._request)
+        mac = mac_to_bytes(target_mac)
+        frame[0:6] = mac
+        frame[32:38] = mac
+        frame[38:42] = socket.inet_aton(target_ip)
+        return bytes(frame)
+
+    def reply(self, target_ip, target_mac, sender_ip, sender_mac=None):
+        """
+        An is-at frame telling `target_ip`/`target_mac` that `sender_ip` is at
+        `sender_mac` (our own MAC when omitted).
+        """
+        frame = bytearray(self._reply)
+        mac = mac_to_bytes(target_mac)
+        frame[0:6] = mac
+        frame[32:38] = mac
+        frame[38:42] = socket.inet_aton(target_ip)
+        frame[28:32] = socket.inet_aton(sender_ip)
+        if sender_mac:
+            frame[22:28] = mac_to_bytes(sender_mac)
+        return bytes(frame)
+
+
+def _local_ip():
+    s = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    try:
+        s.connect(("8.8.8.8", 80))
+        return s.getsockname()[0]
+    finally:
+        s.close()
+
+
+def _linux_interface_for(ip):
+    """Returns (interface name, MAC string) of the interface that owns `ip`."""
+    found = interface_for(ip)  # Also finds secondary addresses
+    if found:
+        return found
+    import fcntl
+    s = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    try:
+        for _, ifname in socket.if_nameindex():
+            ifreq = struct.pack("256s", ifname.encode()[:15])
+            try:
+                addr = fcntl.ioctl(s.fileno(), SIOCGIFADDR, ifreq)[20:24]
+                if socket.inet_ntoa(addr) != ip:
+                    continue
+                hwaddr = fcntl.ioctl(s.fileno(), SIOCGIFHWADDR, ifreq)[18:24]
+                return ifname, _format_mac(hwaddr)
+            except OSError:
+                continue
+    finally:
+        s.close()
+    raise OSError(f"no interface owns {ip}")
+
+
+class L2Socket:
+    """
+    A layer-2 socket for sending prebuilt frames and collecting ARP replies.
+
+    src_ip: our address; selects the interface (detected from the default route if omitted)
+    """
+
+    def __init__(self, src_ip=None):
+        ip = src_ip or _local_ip()
+        if hasattr(socket, "AF_PACKET"):
+            iface, mac = _linux_interface_for(ip)
+            sock = socket.socket(socket.AF_PACKET, socket.SOCK_RAW, socket.htons(ETH_P_ARP))
+            sock.bind((iface, 0))
+            sock.setblocking(False)
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 1 << 20)
+            self._setup(sock, iface, mac, ip, scapy=False)
+        else:
+            from scapy.all import conf, get_if_hwaddr  # Slow to import, so only loaded here
+            conf.verb = 0
+            sock = conf.L2socket(iface=conf.iface, filter="arp")
+            self._setup(sock, conf.iface, get_if_hwaddr(conf.iface).upper(), ip, scapy=True)
+
+    @classmethod
+    def from_socket(cls, sock, mac, ip, iface=None):
+        """
+        Wraps an already open, non-blocking frame socket (anything with send/recv/fileno),
+        e.g. one end of a socketpair standing in for the link in benchmarks.
+        """
+        l2 = cls.__new__(cls)
+        l2._setup(sock, iface, mac, ip, scapy=False)
+        return l2
+
+    def _setup(self, sock, iface, mac, ip, scapy):
+        self._sock = sock
+        self.iface = iface
+        self.mac = mac
+        self.ip = ip
+        self._scapy = scapy
+        self._send_lock = threading.Lock()
+        self._exchange_lock = threading.Lock()
+        self.builder = ArpFrameBuilder(self.mac, self.ip)
+        self._own_mac = mac_to_bytes(self.mac)
+
+    # --- Sending ---
+
+    def send(self, frame):
+        """Sends one prebuilt frame."""
+        if self._scapy:
+            with self._send_lock:
+                self._sock.send(frame)
+        else:
+            self._sock.send(frame)
+
+    def send_batch(self, frames, rate=0):
+        """Sends `frames` back to back, paced to `rate` frames per second (0 = unlimited)."""
+        interval = 1.0 / rate if rate else 0
+        start = time.monotonic()
+        count = 0
+        for count, frame in enumerate(frames, 1):
+            try:
+                self.send(frame)
+            except OSError:
+                pass
+            if interval:
+                wait = start + count * interval - time.monotonic()
+                if wait > 0:
+                    time.sleep(wait)
+        return count
+
+    # --- Receiving ---
+
+    def _recv_ready(self, timeout):
+        """Returns the frames that arrive within `timeout` seconds (at least one read attempt)."""
+        frames = []
+        if self._scapy:
+            ready = self._sock.select([self._sock], max(timeout, 0))
+            if ready:
+                _cls, data, _ts = self._sock.recv_raw()
+                if data:
+                    frames.append(data)
+            return frames
+
+        readable, _, _ = select.select([self._sock], [], [], max(timeout, 0))
+        if readable:
+            while True:
+                try:
+                    frames.append(self._sock.recv(2048))
+                except (BlockingIOError, InterruptedError):
+                    break
+        return frames
+
+    def _collect(self, wait, accept, replies, on_reply, sent_at=None, idle=None, cancel=None):
+        """
+        Reads ARP replies for up to `wait` seconds. With `idle`, stops early once
+        no new reply has arrived for `idle` seconds; with `cancel`, once it is stopped.
+        """
+        last_activity = time.monotonic()
+        deadline = last_activity + wait
+        while True:
+            if cancel and cancel.stopped():
+                return
+            stop_at = deadline if idle is None else min(deadline, last_activity + idle)
+            remaining = stop_at - time.monotonic()
+            for frame in self._recv_ready(min(remaining, POLL_INTERVAL)):
+                if frame[6:12] == self._own_mac:
+                    continue  # Our own outgoing frames
+                parsed = parse_arp(frame)
+                if not parsed or parsed[0] != ARP_REPLY:
+                    continue
+                _op, ip, mac = parsed
+                if ip in replies or not accept(ip):
+                    continue
+                replies[ip] = mac
+                last_activity = time.monotonic()
+                if on_reply:
+                    sent = sent_at.get(frame[28:32]) if sent_at else None
+                    on_reply(ip, mac, last_activity - sent if sent else None)
+            if remaining <= 0:
+                return
+
+    def exchange(self, batches, accept, timeout, rate=0, on_reply=None, idle=None, flush=True, cancel=None):
+        """
+        Sends each batch of request frames (paced to `rate`) and then listens up to
+        `timeout` seconds for replies, or until none arrived for `idle` seconds
+        (after every batch when unpaced, otherwise once after the last).
+        `accept(ip)` filters the replies; `on_reply(ip, mac, rtt)` is called as
+        each new responder arrives. `flush` discards frames queued before the
+        exchange started. A CancelToken in `cancel` ends the exchange
+        early with the replies so far.
+        Returns {ip: mac} in the order the replies arrived.
+        """
+        replies = {}
+        sent_at = {}  # {target IP bytes: send time}
+        interval = 1.0 / rate if rate else 0
+        with self._exchange_lock:
+            if flush:
+                # Throw away whatever queued up since the last exchange
+                self._collect(0, lambda ip: False, replies, None)
+
+            for frames in batches:
+                start = time.monotonic()
+                for index, frame in enumerate(frames, 1):
+                    if cancel and cancel.stopped():
+                        return replies
+                    try:
+                        self.send(frame)
+                        sent_at[frame[38:42]] = time.monotonic()
+                    except OSError:
+                        pass
+                    # Pace sends, picking up replies while we wait for the next slot
+                    if interval:
+                        wait = start + index * interval - time.monotonic()
+                        if wait > 0:
+                            self._collect(wait, accept, replies, on_reply, sent_at, cancel=cancel)
+                if not interval:
+                    # Unpaced: let this batch's replies arrive before sending the next one
+                    self._collect(timeout, accept, replies, on_reply, sent_at, idle, cancel)
+            if interval:
+                # Paced sends listened between packets all along; wait once for the stragglers
+                self._collect(timeout, accept, replies, on_reply, sent_at, idle, cancel)
+        return replies
+
+    def close(self):
+        try:
+            self._sock.close()
+        except Exception:
+            pass
+
+
+_shared_sockets = {}  # {source IP: L2Socket}
+_shared_lock = threading.Lock()
+
+
+def get_l2_socket(src_ip=None):
+    """
+    Returns the process-wide L2Socket for the interface that owns `src_ip`
+    (the default route's if omitted), opening it on first use.
+    Returns None if no layer-2 socket can be opened (e.g. missing privileges).
+    """
+    with _shared_lock:
+        try:
+            src_ip = src_ip or _local_ip()
+            if src_ip not in _shared_sockets:
+                _shared_sockets[src_ip] = L2Socket(src_ip)
+        except Exception as e:
+            print(f"[-] Could not open layer-2 socket: {e}")
+            return None
+        return _shared_sockets[src_ip]
@@ -0,0 +1,90 @@
+"""
+ARP Timing - Learns how long to wait for ARP replies on each network.
+
+A wired LAN answers within a millisecond or two while phones dozing on
+busy Wi-Fi can take hundreds. Each scan feeds its reply round-trip times
+in, and the estimate per network (smoothed RTT plus four deviations, as
+TCP does for its retransmission timer) decides when a round is over.
+Estimates are kept in a small JSON file so they survive restarts.
+"""
+
+import os
+import json
+import threading
+
+
+class ArpTimeoutEstimator:
+    """
+    path:            JSON file the estimates are kept in (None = memory only)
+    default_timeout: idle timeout for networks with no history
+    min_timeout / max_timeout: bounds for the learned value
+    """
+
+    ALPHA = 0.125  # Weight of a new sample in the smoothed RTT
+    BETA = 0.25    # Weight of a new sample in the RTT deviation
+
+    def __init__(self, path="arp_timing.json", default_timeout=0.5, min_timeout=0.05, max_timeout=3.0):
+        self.path = path
+        self.default_timeout = default_timeout
+        self.min_timeout = min_timeout
+        self.max_timeout = max_timeout
+        self.networks = {}  # {network: {"srtt": s, "rttvar": s, "samples": n}}
+        self._lock = threading.Lock()
+        self._load()
+
+    def _load(self):
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, "r") as f:
+                self.networks = json.load(f)
+        except (OSError, ValueError):
+            self.networks = {}
+
+    def save(self):
+        """Writes the estimates to disk."""
+        if not self.path:
+            return
+        with self._lock:
+            data = dict(self.networks)
+        try:
+            tmp_file = self.path + ".tmp"
+            with open(tmp_file, "w") as f:
+                json.dump(data, f, indent=2)
+            os.replace(tmp_file, self.path)
+        except OSError as e:
+            print(f"[-] Could not save ARP timing estimates: {e}")
+
+    def timeout_for(self, network):
+        """Seconds without a reply after which a round on `network` can end."""
+        with self._lock:
+            entry = self.networks.get(network)
+        if not entry:
+            return self.default_timeout
+        timeout = entry["srtt"] + 4 * entry["rttvar"]
+        return min(max(timeout, self.min_timeout), self.max_timeout)
+
+    def observe(self, network, rtts, late_rtts=()):
+        """
+        Feeds in the reply round-trip times (seconds) measured during one scan.
+        late_rtts: times of replies that only came in a retry round, i.e. hosts the
+                   current timeout cut off; the sample is at least the slowest of them,
+                   so a timeout that got too short grows again
+        """
+        rtts = sorted(rtt for rtt in rtts if rtt is not None and rtt >= 0)
+        late_rtts = [rtt for rtt in late_rtts if rtt is not None and rtt >= 0]
+        if not rtts and not late_rtts:
+            return
+        # The slow tail decides who gets missed, so learn from the 90th percentile
+        sample = rtts[min(int(len(rtts) * 0.9), len(rtts) - 1)] if rtts else 0
+        if late_rtts:
+            sample = max(sample, max(late_rtts))
+
+        with self._lock:
+            entry = self.networks.get(network)
+            if entry is None:
+                self.networks[network] = {"srtt": sample, "rttvar": sample / 2, "samples": 1}
+                return
+            entry["rttvar"] = (1 - self.BETA) * entry["rttvar"] + self.BETA * abs(entry["srtt"] - sample)
+            entry["srtt"] = (1 - self.ALPHA) * entry["srtt"] + self.ALPHA * sample
+            entry["samples"] += 1
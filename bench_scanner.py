@@ -0,0 +1,378 @@
+"""
+Scanner Benchmark - Measures NetworkScanner.scan() against a simulated LAN.
+
+No root and no real network are needed. The scanner runs unmodified, but
+its link layer is replaced:
+
+- the layer-2 socket (ARP) and the raw ICMP socket are socketpairs to a
+  simulator process that answers like hosts on a LAN would, with
+  configurable latency, jitter and packet loss
+- in `--icmp ping` mode `subprocess.run(["ping", ...])` is faked instead
+- the neighbor table is read from a generated file in /proc/net/arp format
+
+Each scenario runs in its own process so CPU time and peak memory are
+its own. Reported per run: wall time, CPU time, peak RSS, packets sent per
+second and how many of the simulated hosts were found.
+
+Usage:
+    python bench_scanner.py                                 # /24, /22 and /16
+    python bench_scanner.py --network 10.0.0.0/22 --hosts 300 --loss 0.05
+    python bench_scanner.py --icmp ping --repeat 3 --json results.json
+
+Linux only (AF_UNIX socketpairs and fork).
+"""
+
+import io
+import os
+import json
+import time
+import heapq
+import random
+import select
+import socket
+import argparse
+import resource
+import tempfile
+import ipaddress
+import contextlib
+import subprocess
+import multiprocessing
+from types import SimpleNamespace
+
+import icmp_sweep
+import wifi_scanner
+import neighbor_table
+from arp_io import L2Socket, ARP_FRAME, ETH_P_ARP, ETH_P_IP, ARP_REQUEST, ARP_REPLY, mac_to_bytes
+
+DEFAULT_SCENARIOS = [("10.10.0.0/24", 40), ("10.20.0.0/22", 150), ("10.30.0.0/16", 1000)]
+
+# Big socket buffers so the simulated link rarely pushes back
+SOCKET_BUFFER = 4 << 20
+
+
+# --- Simulated hosts ---
+
+def build_hosts(network, count, seed, slow_fraction, slow_latency, latency, icmp_block):
+    """Returns {ip bytes: host dict} for `count` random addresses in `network` (not the first two)."""
+    rng = random.Random(seed)
+    candidates = range(2, network.num_addresses - 1)
+    hosts = {}
+    for offset in rng.sample(candidates, min(count, len(candidates))):
+        ip = network.network_address + offset
+        mac = bytes([0x02, rng.randrange(256)]) + rng.randbytes(4)
+        hosts[ip.packed] = {
+            "ip": str(ip),
+            "mac": mac,
+            "latency": slow_latency if rng.random() < slow_fraction else latency,
+            "icmp": rng.random() >= icmp_block
+        }
+    return hosts
+
+
+def write_neighbor_file(hosts, path):
+    """Writes the hosts as a /proc/net/arp table."""
+    with open(path, "w") as f:
+        f.write("IP address       HW type     Flags       HW address            Mask     Device\n")
+        for host in hosts.values():
+            mac = ":".join(f"{b:02x}" for b in host["mac"])
+            f.write(f"{host['ip']:<16} 0x1         0x2         {mac}     *        sim0\n")
+
+
+def simulate(arp_sock, icmp_sock, hosts, our_mac, our_ip, loss, jitter, seed, inherited=()):
+    """
+    Simulator process: answers ARP requests and ICMP echo requests until both sockets close.
+    `inherited` are the scanner's socket ends copied in by fork; they are closed so EOF arrives.
+    """
+    for sock in inherited:
+        sock.close()
+    rng = random.Random(seed + 1)
+    our_mac = mac_to_bytes(our_mac)
+    our_ip = socket.inet_aton(our_ip)
+    pending = []  # heap of (due, n, sock, frame)
+    counter = 0
+    open_socks = [arp_sock, icmp_sock]
+    for sock in open_socks:
+        sock.setblocking(False)
+
+    def schedule(host, sock, frame):
+        nonlocal counter
+        if rng.random() < loss:
+            return
+        due = time.monotonic() + host["latency"] + rng.uniform(0, jitter)
+        counter += 1
+        heapq.heappush(pending, (due, counter, sock, frame))
+
+    while open_socks or pending:
+        timeout = max(pending[0][0] - time.monotonic(), 0) if pending else 1.0
+        if open_socks:
+            readable, _, _ = select.select(open_socks, [], [], timeout)
+        else:
+            readable = []
+            time.sleep(timeout)
+        for sock in readable:
+            while True:
+                try:
+                    data = sock.recv(2048)
+                except BlockingIOError:
+                    break
+                except OSError:
+                    data = b""
+                if not data:
+                    open_socks.remove(sock)
+                    pending = [p for p in pending if p[2] is not sock]
+                    heapq.heapify(pending)
+                    break
+
+                if sock is arp_sock:
+                    if len(data) < ARP_FRAME.size or int.from_bytes(data[20:22], "big") != ARP_REQUEST:
+                        continue
+                    host = hosts.get(data[38:42])
+                    if host:
+                        reply = ARP_FRAME.pack(our_mac, host["mac"], ETH_P_ARP, 1, ETH_P_IP, 6, 4,
+                                               ARP_REPLY, host["mac"], data[38:42], our_mac, our_ip)
+                        schedule(host, sock, reply)
+                else:
+                    # 4-byte destination, then the ICMP echo request
+                    host = hosts.get(data[:4])
+                    if host and host["icmp"] and data[4] == icmp_sweep.ICMP_ECHO_REQUEST:
+                        ip_header = bytes([0x45, 0, 0, 0, 0, 0, 0, 0, 64, 1, 0, 0]) + data[:4] + our_ip
+                        reply = ip_header + bytes([icmp_sweep.ICMP_ECHO_REPLY, 0, 0, 0]) + data[8:]
+                        schedule(host, sock, reply)
+
+        now = time.monotonic()
+        while pending and pending[0][0] <= now:
+            due, n, sock, frame = heapq.heappop(pending)
+            try:
+                sock.send(frame)
+            except BlockingIOError:
+                # Receiver is behind: try again a moment later
+                heapq.heappush(pending, (now + 0.001, n, sock, frame))
+                break
+            except OSError:
+                pass
+
+
+# --- Scanner-side stand-ins ---
+
+class CountingSocket:
+    """Non-blocking socketpair end that counts sent packets and waits instead of failing when full."""
+
+    def __init__(self, sock):
+        self.sock = sock
+        self.sent = 0
+        sock.setblocking(False)
+
+    def fileno(self):
+        return self.sock.fileno()
+
+    def send(self, data):
+        while True:
+            try:
+                self.sock.send(data)
+                self.sent += 1
+                return len(data)
+            except BlockingIOError:
+                select.select([], [self.sock], [], 0.01)
+
+    def recv(self, size):
+        return self.sock.recv(size)
+
+    def setblocking(self, flag):
+        pass
+
+    def setsockopt(self, *args):
+        pass
+
+    def bind(self, address):
+        pass
+
+    def close(self):
+        pass
+
+
+class FakeIcmpSocket(CountingSocket):
+    """Raw ICMP socket stand-in: prefixes each request with its destination."""
+
+    def sendto(self, data, address):
+        return self.send(socket.inet_aton(address[0]) + data)
+
+    def recvfrom(self, size):
+        data = self.sock.recv(size)
+        return data, (socket.inet_ntoa(data[12:16]), 0)
+
+
+class SimulatedScanner(wifi_scanner.NetworkScanner):
+    """NetworkScanner with privilege checks, self-detection and OUI downloads skipped."""
+
+    def __init__(self, our_ip, our_mac, netmask, **kwargs):
+        self._sim_self = (our_ip, our_mac, netmask)
+        super().__init__(**kwargs)
+
+    def _check_admin(self):
+        pass
+
+    def _detect_self(self):
+        self.my_ip, self.my_mac, self.my_netmask = self._sim_self
+
+    def _load_oui(self):
+        # Use the compiled index if the registries are already here; never download
+        self.oui_index = wifi_scanner.OuiIndex.open([self.oui_file, self.mam_file, self.oui36_file])
+
+
+def _pair():
+    a, b = socket.socketpair(socket.AF_UNIX, socket.SOCK_SEQPACKET)
+    for sock in (a, b):
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, SOCKET_BUFFER)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, SOCKET_BUFFER)
+    return a, b
+
+
+def run_scenario(config):
+    """Runs one scenario (in a fresh process). Returns a list of per-run result dicts."""
+    network = ipaddress.ip_network(config["network"], strict=False)
+    our_ip = str(network.network_address + 1)
+    our_mac = "02:00:00:00:00:01"
+    hosts = build_hosts(network, config["hosts"], config["seed"], config["slow_fraction"],
+                        config["slow_latency"], config["latency"], config["icmp_block"])
+
+    arp_scanner_end, arp_sim_end = _pair()
+    icmp_scanner_end, icmp_sim_end = _pair()
+    sim = multiprocessing.get_context("fork").Process(
+        target=simulate,
+        args=(arp_sim_end, icmp_sim_end, hosts, our_mac, our_ip,
+              config["loss"], config["jitter"], config["seed"], (arp_scanner_end, icmp_scanner_end)),
+        daemon=True
+    )
+    sim.start()
+    arp_sim_end.close()
+    icmp_sim_end.close()
+
+    arp_link = CountingSocket(arp_scanner_end)
+    icmp_link = FakeIcmpSocket(icmp_scanner_end)
+    l2 = L2Socket.from_socket(arp_link, our_mac, our_ip, iface="sim0")
+
+    neighbor_file = tempfile.NamedTemporaryFile("w", suffix=".arp", delete=False)
+    neighbor_file.close()
+    write_neighbor_file(hosts, neighbor_file.name)
+
+    pings = [0]
+    ping_rng = random.Random(config["seed"] + 2)
+
+    def fake_ping(command, **kwargs):
+        pings[0] += 1
+        host = hosts.get(socket.inet_aton(command[-1]))
+        if host and host["icmp"] and ping_rng.random() >= config["loss"]:
+            time.sleep(host["latency"])
+            return SimpleNamespace(returncode=0)
+        time.sleep(config["ping_timeout"])
+        return SimpleNamespace(returncode=1)
+
+    # Swap the link layer under the unmodified scanner
+    wifi_scanner.get_l2_socket = lambda src_ip=None: l2
+    wifi_scanner.raw_icmp_available = lambda: config["icmp"] == "raw"
+    wifi_scanner.read_neighbor_table = lambda family=socket.AF_INET: neighbor_table._read_proc_arp(neighbor_file.name)
+    wifi_scanner.subprocess = SimpleNamespace(run=fake_ping, DEVNULL=subprocess.DEVNULL)
+    icmp_sweep.socket = SimpleNamespace(**{
+        name: getattr(socket, name) for name in ("AF_INET", "SOCK_RAW", "IPPROTO_ICMP", "SOL_SOCKET", "SO_RCVBUF")
+    }, socket=lambda *args: icmp_link)
+
+    # Keep the scanner's progress output out of the results table
+    output = contextlib.nullcontext() if config["verbose"] else contextlib.redirect_stdout(io.StringIO())
+
+    runs = []
+    try:
+        with output:
+            scanner = SimulatedScanner(our_ip, our_mac, str(network.netmask),
+                                       arp_rate=config["arp_rate"], icmp_rate=config["icmp_rate"],
+                                       pipelined=not config["sequential"], arp_timing_file=None)
+        for run in range(config["repeat"]):
+            sent_before = arp_link.sent + icmp_link.sent + pings[0]
+            wall_start = time.perf_counter()
+            cpu_start = time.process_time()
+            with output:
+                results = scanner.scan(str(network))
+            wall = time.perf_counter() - wall_start
+            cpu = time.process_time() - cpu_start
+            sent = arp_link.sent + icmp_link.sent + pings[0] - sent_before
+
+            found = {d["ip"] for d in results}
+            runs.append({
+                "network": str(network),
+                "hosts": len(hosts),
+                "run": run + 1,
+                "wall_s": round(wall, 3),
+                "cpu_s": round(cpu, 3),
+                "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+                "packets": sent,
+                "pps": round(sent / wall) if wall else 0,
+                "found": sum(1 for h in hosts.values() if h["ip"] in found),
+            })
+    finally:
+        arp_scanner_end.close()
+        icmp_scanner_end.close()
+        sim.join(5)
+        os.unlink(neighbor_file.name)
+    return runs
+
+
+def _run_isolated(config):
+    """Runs a scenario in a child process so its CPU time and memory are its own."""
+    ctx = multiprocessing.get_context("fork")
+    results = ctx.Queue()
+    child = ctx.Process(target=lambda: results.put(run_scenario(config)))
+    child.start()
+    runs = results.get()
+    child.join()
+    return runs
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark NetworkScanner.scan() on a simulated network.")
+    parser.add_argument("--network", help="CIDR to scan (default: a /24, a /22 and a /16)")
+    parser.add_argument("--hosts", type=int, help="live hosts in --network")
+    parser.add_argument("--loss", type=float, default=0.01, help="packet loss rate (default 0.01)")
+    parser.add_argument("--latency-ms", type=float, default=2.0, help="reply latency (default 2)")
+    parser.add_argument("--jitter-ms", type=float, default=3.0, help="random extra latency (default 3)")
+    parser.add_argument("--slow-fraction", type=float, default=0.05, help="share of slow (dozing) hosts")
+    parser.add_argument("--slow-latency-ms", type=float, default=250.0, help="latency of slow hosts")
+    parser.add_argument("--icmp-block", type=float, default=0.3, help="share of hosts that ignore ping")
+    parser.add_argument("--icmp", choices=("raw", "ping"), default="raw", help="ICMP engine to exercise")
+    parser.add_argument("--ping-timeout-ms", type=float, default=50.0, help="simulated ping timeout (ping mode)")
+    parser.add_argument("--arp-rate", type=int, default=10000, help="ARP requests per second (0 = unlimited)")
+    parser.add_argument("--icmp-rate", type=int, default=10000, help="echo requests per second (0 = unlimited)")
+    parser.add_argument("--sequential", action="store_true", help="run ARP and ICMP one after the other")
+    parser.add_argument("--repeat", type=int, default=1, help="scans per scenario (later runs use learned timeouts)")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--verbose", action="store_true", help="show the scanner's own output")
+    parser.add_argument("--json", help="also write the results to this file")
+    args = parser.parse_args()
+
+    if args.network:
+        scenarios = [(args.network, args.hosts or 50)]
+    else:
+        scenarios = DEFAULT_SCENARIOS
+
+    results = []
+    print(f"{'network':<18} {'run':>3} {'hosts':>6} {'found':>6} {'wall s':>8} {'cpu s':>8} "
+          f"{'rss MB':>7} {'packets':>8} {'pps':>8}")
+    for network, count in scenarios:
+        config = {
+            "network": network, "hosts": count, "seed": args.seed,
+            "loss": args.loss, "latency": args.latency_ms / 1000, "jitter": args.jitter_ms / 1000,
+            "slow_fraction": args.slow_fraction, "slow_latency": args.slow_latency_ms / 1000,
+            "icmp_block": args.icmp_block, "icmp": args.icmp, "ping_timeout": args.ping_timeout_ms / 1000,
+            "arp_rate": args.arp_rate, "icmp_rate": args.icmp_rate,
+            "sequential": args.sequential, "repeat": args.repeat, "verbose": args.verbose
+        }
+        for r in _run_isolated(config):
+            results.append(r)
+            print(f"{r['network']:<18} {r['run']:>3} {r['hosts']:>6} {r['found']:>6} {r['wall_s']:>8.3f} "
+                  f"{r['cpu_s']:>8.3f} {r['peak_rss_mb']:>7.1f} {r['packets']:>8} {r['pps']:>8}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
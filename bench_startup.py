@@ -0,0 +1,144 @@
+"""
+Startup Benchmark - Measures how long the app takes to come up.
+
+Every measurement runs in a fresh interpreter, so nothing is already
+imported or cached in-process:
+
+- import time of each of the app's modules, and which heavy dependencies
+  (scapy, requests, neo4j, dotenv, Tk) importing it pulled in
+- time to first frame: importing main.py, building NetworkAnalyzerApp
+  and processing events until the window is drawn (needs customtkinter
+  and a display; skipped otherwise)
+
+Usage:
+    python bench_startup.py                       # median of 5 runs each
+    python bench_startup.py --repeat 10 --json startup.json
+    python bench_startup.py --max-first-frame-ms 800   # exit 1 if slower
+"""
+
+import os
+import sys
+import json
+import argparse
+import statistics
+import subprocess
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+MODULES = ["wifi_scanner", "wifi_blocker", "database_manager", "neo4j_manager", "headless", "main"]
+
+# Dependencies that should only load on first use
+HEAVY = ["scapy", "requests", "neo4j", "dotenv", "customtkinter", "tkinter"]
+
+IMPORT_SNIPPET = """
+import sys, time, json
+start = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - start
+heavy = sorted(name for name in {heavy!r} if name in sys.modules)
+print(json.dumps({{"seconds": elapsed, "heavy": heavy}}))
+"""
+
+FIRST_FRAME_SNIPPET = """
+import os, sys, time, json, io, contextlib
+start = time.perf_counter()
+with contextlib.redirect_stdout(io.StringIO()):
+    import main
+    imported = time.perf_counter() - start
+    app = main.NetworkAnalyzerApp()
+    built = time.perf_counter() - start
+    app.update()
+    drawn = time.perf_counter() - start
+print(json.dumps({"import": imported, "init": built, "first_frame": drawn}))
+sys.stdout.flush()
+os._exit(0)  # Skip teardown of the scanner's background threads
+"""
+
+
+def _run(snippet, timeout=60):
+    """Runs `snippet` in a new interpreter in the repo directory; returns its JSON output or an error string."""
+    try:
+        proc = subprocess.run([sys.executable, "-c", snippet], cwd=HERE, capture_output=True,
+                              text=True, timeout=timeout)
+    except subprocess.TimeoutExpired:
+        return None, f"timed out after {timeout}s"
+    if proc.returncode != 0:
+        lines = (proc.stderr or proc.stdout).strip().splitlines()
+        return None, lines[-1] if lines else f"exit code {proc.returncode}"
+    return json.loads(proc.stdout.strip().splitlines()[-1]), None
+
+
+def measure_imports(repeat):
+    results = []
+    for module in MODULES:
+        times, heavy, error = [], [], None
+        for _ in range(repeat):
+            data, error = _run(IMPORT_SNIPPET.format(module=module, heavy=HEAVY))
+            if error:
+                break
+            times.append(data["seconds"])
+            heavy = data["heavy"]
+        results.append({
+            "module": module,
+            "median_ms": statistics.median(times) * 1000 if times else None,
+            "heavy": heavy,
+            "error": error
+        })
+    return results
+
+
+def measure_first_frame(repeat):
+    if not os.environ.get("DISPLAY") and os.name != "nt" and sys.platform != "darwin":
+        return None, "no display"
+    runs = []
+    for _ in range(repeat):
+        data, error = _run(FIRST_FRAME_SNIPPET)
+        if error:
+            return None, error
+        runs.append(data)
+    return {key: statistics.median(r[key] for r in runs) * 1000 for key in ("import", "init", "first_frame")}, None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark module import time and time to first frame.")
+    parser.add_argument("--repeat", type=int, default=5, help="fresh interpreters per measurement (median is reported)")
+    parser.add_argument("--no-gui", action="store_true", help="skip the time-to-first-frame measurement")
+    parser.add_argument("--max-first-frame-ms", type=float,
+                        help="exit with status 1 if the first frame is slower (2 if it could not be measured)")
+    parser.add_argument("--json", help="also write the results to this file")
+    args = parser.parse_args()
+
+    imports = measure_imports(args.repeat)
+
+    print(f"{'module':<18} {'import ms':>10}  heavy dependencies loaded")
+    for r in imports:
+        if r["error"]:
+            print(f"{r['module']:<18} {'-':>10}  failed: {r['error']}")
+        else:
+            print(f"{r['module']:<18} {r['median_ms']:>10.1f}  {', '.join(r['heavy']) or '-'}")
+
+    frame, frame_error = (None, "skipped") if args.no_gui else measure_first_frame(args.repeat)
+    print()
+    if frame:
+        print(f"main.py import {frame['import']:.0f} ms, window built {frame['init']:.0f} ms, "
+              f"first frame {frame['first_frame']:.0f} ms")
+    else:
+        print(f"Time to first frame: not measured ({frame_error})")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"imports": imports, "first_frame_ms": frame,
+                       "python": sys.version.split()[0]}, f, indent=2)
+
+    if args.max_first_frame_ms:
+        if not frame:
+            print(f"[!] --max-first-frame-ms given but the first frame was not measured ({frame_error})")
+            return 2
+        if frame["first_frame"] > args.max_first_frame_ms:
+            print(f"[!] First frame took longer than {args.max_first_frame_ms:.0f} ms")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
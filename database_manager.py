@@ -0,0 +1,355 @@
+"""
+Database Manager - Device history, statuses and scan persistence.
+
+Shared by the GUI (main.py) and the headless daemon (headless.py); it has
+no GUI dependencies. Neo4j is used when it is configured and reachable,
+otherwise everything is kept in the local JSON files. Devices are handled
+as DeviceRecords; plain dicts only exist in the JSON files and Neo4j.
+"""
+
+import os
+import json
+import time
+
+import metrics_exporter
+from device_record import DeviceRecord
+from scan_diff import diff_scans
+
+
+class DatabaseManager:
+    """
+    Database manager using Neo4j for persistent storage.
+    Device statuses and history are also kept in local JSON files, so it works without Neo4j.
+    `logger` is anything with a log(message) method (the GUI app, or a console logger).
+    """
+    BLOCKED_DEVICES_FILE = "blocked_devices.json"
+    DEVICE_STATUSES_FILE = "device_statuses.json"  # For offline persistence
+    DEVICE_HISTORY_FILE = "device_history.json"    # For device history with dates
+    
+    def __init__(self, logger, connect=True):
+        """
+        connect: also connect to Neo4j now; with False the caller runs connect()
+                 later (e.g. in a background thread) and the local files are used until then
+        """
+        self.logger = logger
+        self.neo4j_manager = None
+        self.use_neo4j = False
+        self.local_cache = [] # In-memory cache for current session
+        self.last_scan = []        # Devices of the last saved scan, for the next scan's diff
+        self.last_diff = None      # ScanDiff of the last saved scan against the one before
+        self.device_statuses = {}  # Separate dict for status persistence: {mac: status}
+        self.device_history = {}   # Device history with timestamps: {mac: {vendor, first_seen, last_seen, status}}
+        
+        # Load persisted device statuses and history from file (works without Neo4j)
+        self._load_device_statuses()
+        self._load_device_history()
+        
+        if connect:
+            self.connect()
+
+    def connect(self):
+        """Connects to Neo4j if it is configured and reachable. Returns True if it is in use."""
+        try:
+            from neo4j_manager import create_neo4j_manager
+            neo4j_manager = create_neo4j_manager()
+            if neo4j_manager and neo4j_manager.is_available():
+                self.neo4j_manager = neo4j_manager
+                self.logger.log("DatabaseManager: Connected to Neo4j database.")
+                # Pre-load device statuses from Neo4j into local cache, then switch over
+                self._load_initial_cache()
+                self.use_neo4j = True
+            else:
+                self.logger.log("DatabaseManager: Neo4j not available. Using local session cache.")
+        except Exception as e:
+            self.logger.log(f"DatabaseManager: Neo4j initialization failed: {e}")
+            self.logger.log("DatabaseManager: Falling back to local session cache.")
+        return self.use_neo4j
+
+    def _load_device_statuses(self):
+        """Loads device statuses from JSON file for offline persistence."""
+        if os.path.exists(self.DEVICE_STATUSES_FILE):
+            try:
+                with open(self.DEVICE_STATUSES_FILE, 'r') as f:
+                    self.device_statuses = json.load(f)
+                self.logger.log(f"DatabaseManager: Loaded {len(self.device_statuses)} saved device statuses.")
+            except Exception as e:
+                self.logger.log(f"DatabaseManager: Error loading device statuses: {e}")
+                self.device_statuses = {}
+
+    def _save_device_statuses(self):
+        """Saves device statuses to JSON file for offline persistence."""
+        try:
+            with open(self.DEVICE_STATUSES_FILE, 'w') as f:
+                json.dump(self.device_statuses, f, indent=2)
+        except Exception as e:
+            self.logger.log(f"DatabaseManager: Error saving device statuses: {e}")
+
+    def _load_device_history(self):
+        """Loads device history from JSON file."""
+        if os.path.exists(self.DEVICE_HISTORY_FILE):
+            try:
+                with open(self.DEVICE_HISTORY_FILE, 'r') as f:
+                    self.device_history = json.load(f)
+                self.logger.log(f"DatabaseManager: Loaded history for {len(self.device_history)} devices.")
+            except Exception as e:
+                self.logger.log(f"DatabaseManager: Error loading device history: {e}")
+                self.device_history = {}
+
+    def _save_device_history(self):
+        """Saves device history to JSON file."""
+        try:
+            with open(self.DEVICE_HISTORY_FILE, 'w') as f:
+                json.dump(self.device_history, f, indent=2)
+        except Exception as e:
+            self.logger.log(f"DatabaseManager: Error saving device history: {e}")
+
+    def get_all_history_devices(self):
+        """Returns all devices from history as a list."""
+        return [self._history_record(mac, data) for mac, data in self.device_history.items()]
+
+    def _history_record(self, mac, data):
+        return DeviceRecord(
+            mac=mac,
+            vendor=data.get('vendor', 'Unknown'),
+            status=self.device_statuses.get(mac, data.get('status', 'Unknown')),
+            first_seen=data.get('first_seen', 'N/A'),
+            last_seen=data.get('last_seen', 'N/A'),
+            hostname=data.get('hostname')
+        )
+
+    def get_history_by_date_range(self, start_date, end_date):
+        """Returns devices from history filtered by date range."""
+        devices = []
+        for mac, data in self.device_history.items():
+            first_seen = data.get('first_seen', '')
+            last_seen = data.get('last_seen', '')
+            
+            # Check if device was seen within the date range
+            # A device is included if it was seen (last_seen) within the range
+            # or if it first appeared (first_seen) within the range
+            try:
+                if last_seen >= start_date and first_seen <= end_date:
+                    devices.append(self._history_record(mac, data))
+            except:
+                # If comparison fails, include the device anyway
+                pass
+        
+        self.logger.log(f"History: Found {len(devices)} devices in date range.")
+        return devices
+
+    def _load_initial_cache(self):
+        """Pre-loads device statuses from Neo4j into the local cache."""
+        try:
+            devices = self.neo4j_manager.device_manager.get_all_devices()
+            if devices:
+                for d in devices:
+                    self.local_cache.append(DeviceRecord(
+                        mac=d['mac'],
+                        vendor=d.get('vendor', 'Unknown'),
+                        status=d.get('status', 'Unknown')
+                    ))
+                    # Also sync to device_statuses dict
+                    self.device_statuses[d['mac']] = d.get('status', 'Unknown')
+                self.logger.log(f"DatabaseManager: Pre-loaded {len(devices)} device statuses from DB.")
+                self._save_device_statuses()  # Sync to file
+        except Exception as e:
+            self.logger.log(f"DatabaseManager: Error pre-loading cache: {e}")
+
+    def fetch_devices(self):
+        """Returns a list of device dictionaries from Neo4j or local cache."""
+        self.logger.log("DatabaseManager: Fetching known devices list...")
+        
+        if self.use_neo4j:
+            try:
+                devices = self.neo4j_manager.device_manager.get_all_devices()
+                if devices:
+                    # Convert Neo4j format to app format
+                    formatted_devices = []
+                    for d in devices:
+                        # Get appearance count
+                        count = self.neo4j_manager.device_manager.get_device_appearance_count(d['mac'])
+                        
+                        formatted_devices.append(DeviceRecord(
+                            mac=d['mac'],
+                            vendor=d.get('vendor', 'Unknown'),
+                            status=d.get('status', 'Unknown'),
+                            angle=0,
+                            distance=0.5,
+                            appearances=count,
+                            first_seen=str(d.get('first_seen', '')),
+                            last_seen=str(d.get('last_seen', ''))
+                        ))  # IP stays Unknown until the latest scan fills it in
+                    
+                    self.logger.log(f"DatabaseManager: Found {len(formatted_devices)} devices in Neo4j.")
+                    return formatted_devices
+                else:
+                    self.logger.log("DatabaseManager: No devices found in Neo4j.")
+                    return []
+            except Exception as e:
+                self.logger.log(f"DatabaseManager: Error fetching from Neo4j: {e}")
+                return self.local_cache
+        else:
+            # Fallback to local cache
+            self.logger.log(f"DatabaseManager: Found {len(self.local_cache)} devices in local cache.")
+            return self.local_cache
+    
+    def delete_device(self, mac):
+        """Deletes a device from Neo4j."""
+        if not self.use_neo4j:
+             # Remove from local cache
+             self.local_cache = [d for d in self.local_cache if d['mac'] != mac]
+             return True
+             
+        try:
+             query = "MATCH (d:Device {mac: $mac}) DETACH DELETE d"
+             self.neo4j_manager.connection.execute_query(query, {"mac": mac})
+             return True
+        except Exception as e:
+             self.logger.log(f"DatabaseManager: Error deleting device: {e}")
+             return False
+
+    def save_scan_results(self, devices, duration=0.0, diff=None):
+        """
+        Saves scan results to Neo4j database, local cache, and device history.
+        diff: the scan's ScanDiff if the caller already has one (otherwise it is
+              computed against the last saved scan); kept in `last_diff`
+        """
+        with metrics_exporter.DB_SAVE_LATENCY.time():
+            return self._save_scan_results(devices, duration, diff)
+
+    def _save_scan_results(self, devices, duration, diff):
+        current_time = time.strftime("%Y-%m-%d %H:%M:%S")
+        
+        # Merge logic: Create a map of existing cache to preserve 'status'
+        # (keyed by the records' integer MACs; no strings are built for the lookup)
+        existing_cache_map = {d.mac_int: d for d in self.local_cache if d.mac_int is not None}
+        
+        merged_devices = []
+        for new_device in devices:
+            if not isinstance(new_device, DeviceRecord):
+                new_device = DeviceRecord.from_dict(new_device)
+            mac = new_device['mac']
+            
+            # Update device history with timestamps
+            if mac in self.device_history:
+                # Existing device - update last_seen
+                self.device_history[mac]['last_seen'] = current_time
+                self.device_history[mac]['vendor'] = new_device.get('vendor', self.device_history[mac].get('vendor', 'Unknown'))
+                if new_device.get('hostname'):
+                    self.device_history[mac]['hostname'] = new_device['hostname']
+                if 'ports' in new_device:
+                    self.device_history[mac]['ports'] = new_device['ports']
+            else:
+                # New device - set first_seen and last_seen
+                self.device_history[mac] = {
+                    'vendor': new_device.get('vendor', 'Unknown'),
+                    'first_seen': current_time,
+                    'last_seen': current_time,
+                    'status': 'Unknown'
+                }
+                if new_device.get('hostname'):
+                    self.device_history[mac]['hostname'] = new_device['hostname']
+                if 'ports' in new_device:
+                    self.device_history[mac]['ports'] = new_device['ports']
+            
+            cached = existing_cache_map.get(new_device.mac_int)
+            if cached is not None:
+                # Preserve known status from cache
+                cached_status = cached.status
+                if cached_status != 'Unknown':
+                    new_device['status'] = cached_status
+                # ...and port probe results, which arrive after the scan that found the device
+                if 'ports' in cached and 'ports' not in new_device:
+                    new_device['ports'] = cached['ports']
+                    new_device['services'] = cached.get('services', [])
+            
+            merged_devices.append(new_device)
+        
+        # Save device history to file
+        self._save_device_history()
+            
+        # Update local cache with the merged list
+        self.local_cache = merged_devices
+        
+        if diff is None:
+            diff = diff_scans(self.last_scan, merged_devices)
+        self.last_scan = merged_devices
+        self.last_diff = diff
+        if diff:
+            self.logger.log(f"DatabaseManager: Changes since the last scan: {diff.summary()}.")
+        
+        if not self.use_neo4j:
+            self.logger.log("DatabaseManager: Neo4j not available. Saved to local cache only.")
+            return None
+        
+        try:
+            scan_id = self.neo4j_manager.scan_manager.create_scan(merged_devices, duration, diff)
+            self.logger.log(f"DatabaseManager: Scan saved to Neo4j (ID: {scan_id[:8]}...).")
+            return scan_id
+        except Exception as e:
+            self.logger.log(f"DatabaseManager: Error saving scan: {e}")
+            return None
+    
+    def mark_device_as_known(self, mac):
+        """Marks a device as 'Known' in the database."""
+        # Update local cache regardless
+        for d in self.local_cache:
+            if d['mac'] == mac:
+                d['status'] = 'Known'
+        
+        # Update device_statuses dict and persist to file
+        self.device_statuses[mac] = 'Known'
+        self._save_device_statuses()
+                
+        if not self.use_neo4j:
+            self.logger.log(f"DatabaseManager: Device {mac} marked as Known (Local Cache).")
+            return True
+        
+        try:
+            self.neo4j_manager.device_manager.mark_device_as_known(mac)
+            self.logger.log(f"DatabaseManager: Device {mac} marked as Known.")
+            return True
+        except Exception as e:
+            self.logger.log(f"DatabaseManager: Error marking device: {e}")
+            # We still return True if local cache succeeded, to keep UI responsive
+            return True
+
+    def mark_device_as_unknown(self, mac):
+        """Marks a device as 'Unknown' in the database."""
+        # Update local cache regardless
+        for d in self.local_cache:
+            if d['mac'] == mac:
+                d['status'] = 'Unknown'
+
+        # Update device_statuses dict and persist to file
+        self.device_statuses[mac] = 'Unknown'
+        self._save_device_statuses()
+
+        if not self.use_neo4j:
+            self.logger.log(f"DatabaseManager: Device {mac} marked as Unknown (Local Cache).")
+            return True
+            
+        try:
+            query = "MATCH (d:Device {mac: $mac}) SET d.status = 'Unknown' RETURN d"
+            self.neo4j_manager.connection.execute_query(query, {"mac": mac})
+            self.logger.log(f"DatabaseManager: Device {mac} marked as Unknown.")
+            return True
+        except Exception as e:
+            self.logger.log(f"DatabaseManager: Error marking device as Unknown: {e}")
+            return True
+    
+    def get_scan_history(self, limit=10):
+        """Retrieves scan history from database."""
+        if not self.use_neo4j:
+            return []
+        
+        try:
+            return self.neo4j_manager.scan_manager.get_scan_history(limit)
+        except Exception as e:
+            self.logger.log(f"DatabaseManager: Error fetching scan history: {e}")
+            return []
+    
+    def close(self):
+        """Closes database connection."""
+        if self.neo4j_manager:
+            self.neo4j_manager.close()
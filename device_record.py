@@ -0,0 +1,203 @@
+"""
+Device Record - Compact record for one device, used from the scanner to the GUI.
+
+A DeviceRecord has fixed __slots__ instead of a per-instance dict, and keeps
+the MAC (48-bit) and IPv4 address as integers. It behaves like the dicts it
+replaces (`d['ip']`, `d.get('vendor')`, `d['status'] = ...`, `'ip' in d`),
+so it is passed along and updated in place rather than rebuilt at every
+hop. Strings are only produced when a field is read, and code that writes
+records out (the JSON files, Neo4j) reads them field by field like a dict.
+
+    ip, mac, vendor, status     always present ("Unknown" when not known)
+    angle, distance             radar position (GUI)
+    interface, subnet           where a multi-interface sweep found it
+    hostname                    from reverse DNS, mDNS or NetBIOS
+    ports                       open TCP ports found by the port probe
+    ipv6                        IPv6 addresses (an IPv6-only device has one as its "ip")
+    presence                    "online" / "suspect" / "offline" (presence.PresenceTracker)
+    anything else               kept in a small side dict, created on first use
+"""
+
+import socket
+import struct
+from collections.abc import MutableMapping
+
+UNKNOWN = "Unknown"
+
+_IPV4 = struct.Struct("!I")
+
+# Keys stored in their own slot; "ip" and "mac" are encoded
+_CORE_KEYS = ("ip", "mac", "vendor", "status")
+_OPTIONAL_KEYS = ("angle", "distance", "interface", "subnet", "hostname", "ports", "ipv6", "presence")
+_SLOT_KEYS = frozenset(_CORE_KEYS + _OPTIONAL_KEYS)
+
+
+def mac_to_int(mac):
+    """'AA:BB:CC:DD:EE:FF' (or dash-separated) -> int; None for unknown or malformed MACs."""
+    if not mac or mac == UNKNOWN:
+        return None
+    try:
+        value = int(mac.replace(":", "").replace("-", ""), 16)
+    except ValueError:
+        return None
+    return value if value < 1 << 48 else None
+
+
+def int_to_mac(value):
+    digits = f"{value:012X}"
+    return ":".join(digits[i:i + 2] for i in range(0, 12, 2))
+
+
+def ip_to_int(ip):
+    """Dotted IPv4 -> int; None for unknown. Other strings (e.g. IPv6) are returned unchanged."""
+    if not ip or ip == UNKNOWN:
+        return None
+    try:
+        return _IPV4.unpack(socket.inet_aton(ip))[0] if ip.count(".") == 3 else ip
+    except OSError:
+        return ip
+
+
+def int_to_ip(value):
+    return socket.inet_ntoa(_IPV4.pack(value))
+
+
+class DeviceRecord(MutableMapping):
+    """One device. Takes the same fields as the dict records it replaces, as keywords."""
+
+    __slots__ = ("_ip", "_mac", "_mac_text", "vendor", "status",
+                 "angle", "distance", "interface", "subnet", "hostname", "ports", "ipv6",
+                 "presence", "_extra")
+
+    def __init__(self, ip=UNKNOWN, mac=UNKNOWN, vendor=UNKNOWN, status=UNKNOWN, **fields):
+        self._ip = ip_to_int(ip)
+        self._set_mac(mac)
+        self.vendor = vendor
+        self.status = status
+        self.angle = self.distance = self.interface = self.subnet = None
+        self.hostname = self.ports = self.ipv6 = self.presence = None
+        self._extra = None
+        for key, value in fields.items():
+            self[key] = value
+
+    @classmethod
+    def from_dict(cls, data):
+        """A record from a dict (or another record)."""
+        if isinstance(data, cls):
+            return data.copy()
+        return cls(**data)
+
+    # --- Encoded fields ---
+
+    @property
+    def ip(self):
+        value = self._ip
+        if value is None:
+            return UNKNOWN
+        return int_to_ip(value) if isinstance(value, int) else value
+
+    @ip.setter
+    def ip(self, value):
+        self._ip = ip_to_int(value)
+
+    @property
+    def mac(self):
+        value = self._mac
+        if value is None:
+            return self._mac_text or UNKNOWN
+        return int_to_mac(value)
+
+    @mac.setter
+    def mac(self, value):
+        self._set_mac(value)
+
+    def _set_mac(self, mac):
+        self._mac = mac_to_int(mac)
+        # Keep a malformed MAC as given instead of losing it
+        self._mac_text = mac if self._mac is None and mac and mac != UNKNOWN else None
+
+    @property
+    def ip_int(self):
+        """The IPv4 address as an int (None if unknown or not IPv4); cheap to sort and compare."""
+        return self._ip if isinstance(self._ip, int) else None
+
+    @property
+    def mac_int(self):
+        """The MAC as an int (None if unknown)."""
+        return self._mac
+
+    # --- Mapping interface ---
+
+    def __getitem__(self, key):
+        if key in _SLOT_KEYS:
+            value = getattr(self, key)
+            if value is None:
+                raise KeyError(key)
+            return value
+        if self._extra and key in self._extra:
+            return self._extra[key]
+        raise KeyError(key)
+
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def __contains__(self, key):
+        if key in _SLOT_KEYS:
+            return getattr(self, key) is not None
+        return bool(self._extra) and key in self._extra
+
+    def __setitem__(self, key, value):
+        if key in _SLOT_KEYS:
+            setattr(self, key, value)
+        else:
+            if self._extra is None:
+                self._extra = {}
+            self._extra[key] = value
+
+    def __delitem__(self, key):
+        if key in _CORE_KEYS:
+            setattr(self, key, UNKNOWN)
+        elif key in _OPTIONAL_KEYS:
+            if getattr(self, key) is None:
+                raise KeyError(key)
+            setattr(self, key, None)
+        elif self._extra and key in self._extra:
+            del self._extra[key]
+        else:
+            raise KeyError(key)
+
+    def __iter__(self):
+        yield from _CORE_KEYS
+        for key in _OPTIONAL_KEYS:
+            if getattr(self, key) is not None:
+                yield key
+        if self._extra:
+            yield from self._extra
+
+    def __len__(self):
+        optional = sum(1 for key in _OPTIONAL_KEYS if getattr(self, key) is not None)
+        return len(_CORE_KEYS) + optional + (len(self._extra) if self._extra else 0)
+
+    def copy(self):
+        record = DeviceRecord.__new__(DeviceRecord)
+        record._ip = self._ip
+        record._mac = self._mac
+        record._mac_text = self._mac_text
+        record.vendor = self.vendor
+        record.status = self.status
+        record.angle = self.angle
+        record.distance = self.distance
+        record.interface = self.interface
+        record.subnet = self.subnet
+        record.hostname = self.hostname
+        record.ports = self.ports
+        record.ipv6 = self.ipv6
+        record.presence = self.presence
+        record._extra = dict(self._extra) if self._extra else None
+        return record
+
+    def __repr__(self):
+        return f"DeviceRecord({dict(self.items())!r})"
@@ -0,0 +1,162 @@
+"""
+Headless Daemon - Scanning and persistence without the GUI.
+
+Runs the same adaptive scan cycle as the GUI's auto-scan (unicast ARP
+liveness checks on known hosts, full sweeps every 5 minutes), saving
+each changed result to the device history and Neo4j. Nothing here
+imports Tk, so it runs on servers and over SSH:
+
+    sudo python3 headless.py                    # run until Ctrl+C / SIGTERM
+    sudo python3 headless.py --once             # one full scan, then exit
+    sudo python3 headless.py --metrics-port 9464
+"""
+
+import sys
+import time
+import signal
+import argparse
+
+import metrics_exporter
+from database_manager import DatabaseManager
+from scan_control import CancelToken
+from scan_metrics import format_summary
+from presence import describe_event
+from scan_diff import diff_scans
+
+
+class ConsoleLogger:
+    """Minimal logger for DatabaseManager and the daemon: timestamped lines on stdout."""
+
+    def __init__(self, quiet=False):
+        self.quiet = quiet
+
+    def log(self, message):
+        if not self.quiet:
+            print(f"[{time.strftime('%Y-%m-%d %H:%M:%S')}] {message}", flush=True)
+
+
+class HeadlessDaemon:
+    """
+    Drives NetworkScanner from its own AdaptiveScheduler loop.
+    full_budget / liveness_budget: seconds a full sweep / liveness round may take
+    """
+
+    # Bounds on how long the loop sleeps between cycles
+    MIN_SLEEP = 1
+    MAX_SLEEP = 60
+
+    def __init__(self, logger, full_budget=180, liveness_budget=15, passive=True, probe_ports=False):
+        from scan_scheduler import AdaptiveScheduler
+        from wifi_scanner import NetworkScanner
+
+        self.logger = logger
+        self.full_budget = full_budget
+        self.liveness_budget = liveness_budget
+        self.probe_ports = probe_ports  # Also probe new hosts' common TCP ports
+        self.stop_token = CancelToken()
+        self.db_manager = DatabaseManager(logger)
+        self.scheduler = AdaptiveScheduler()
+        self.scanner = NetworkScanner()
+        self.previous_devices = []
+        metrics_exporter.watch_scanner(self.scanner)
+        self.scanner.presence.listeners.append(
+            lambda event: self.logger.log(f"Presence: {describe_event(event)}"))
+
+        if passive and self.scanner.start_passive_discovery():
+            self.logger.log("Daemon: Passive discovery (ARP/DHCP/mDNS) active.")
+
+    def stop(self):
+        """Ends the loop; a scan in progress returns what it has found so far."""
+        self.stop_token.cancel()
+
+    def run_cycle(self, force_full=False):
+        """Runs one scheduler cycle and saves the result if anything changed. Returns the devices."""
+        full_sweep = force_full or self.scheduler.discovery_due()
+        token = CancelToken(self.full_budget if full_sweep else self.liveness_budget, parent=self.stop_token)
+        started = time.time()
+
+        devices, was_full = self.scanner.scheduled_scan(self.scheduler, force_discovery=force_full, cancel=token)
+        self.scanner.enrich_hostnames(devices)  # Cached names now; new ones are saved with the next scan
+        if self.probe_ports:
+            self.scanner.probe_ports(devices)   # Same for open ports
+        diff = diff_scans(self.previous_devices, devices)
+        changed = not token.cancelled and (was_full or bool(diff) or self.scanner.presence_changes > 0)
+
+        if changed:
+            metrics = self.scanner.metrics_history.last()
+            save_start = time.perf_counter()
+            self.db_manager.save_scan_results(devices, time.time() - started, diff)
+            if metrics:
+                metrics.add_time("persistence", time.perf_counter() - save_start)
+            self.previous_devices = devices
+
+        if was_full:
+            self.logger.log(f"Daemon: Scan completed. {len(devices)} devices online.")
+            metrics = self.scanner.metrics_history.last()
+            if metrics:
+                self.logger.log(f"Scan metrics: {format_summary(metrics.summary())}")
+        elif changed:
+            self.logger.log(f"Daemon: Liveness check: {len(devices)} devices online.")
+        return devices
+
+    def run(self):
+        """Scans until stop() is called."""
+        self.logger.log("Daemon: Started.")
+        while not self.stop_token.stopped():
+            try:
+                self.run_cycle()
+            except Exception as e:
+                self.logger.log(f"Daemon: Scan error: {e}")
+            delay = min(max(self.scheduler.seconds_until_next(), self.MIN_SLEEP), self.MAX_SLEEP)
+            self.stop_token.sleep(delay)
+        self.close()
+
+    def close(self):
+        self.scanner.stop_passive_discovery()
+        self.db_manager.close()
+        self.logger.log("Daemon: Stopped.")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Network Analyzer headless daemon (no GUI)")
+    parser.add_argument("--once", action="store_true", help="run a single full scan and exit")
+    parser.add_argument("--full-budget", type=float, default=180, help="max seconds per full sweep")
+    parser.add_argument("--liveness-budget", type=float, default=15, help="max seconds per liveness round")
+    parser.add_argument("--no-passive", action="store_true", help="do not sniff ARP/DHCP/mDNS traffic")
+    parser.add_argument("--probe-ports", action="store_true", help="probe discovered hosts' common TCP ports")
+    parser.add_argument("--metrics-port", type=int, help="serve Prometheus metrics on this port")
+    parser.add_argument("--metrics-host", default=metrics_exporter.DEFAULT_HOST, help="address for the metrics endpoint")
+    parser.add_argument("--quiet", action="store_true", help="do not print the daemon's log lines")
+    args = parser.parse_args(argv)
+
+    logger = ConsoleLogger(quiet=args.quiet)
+    if args.metrics_port is not None:
+        metrics_exporter.start_metrics_server(args.metrics_port, args.metrics_host)
+    else:
+        metrics_exporter.start_from_env()
+
+    try:
+        daemon = HeadlessDaemon(logger, full_budget=args.full_budget, liveness_budget=args.liveness_budget,
+                                passive=not args.no_passive and not args.once, probe_ports=args.probe_ports)
+    except Exception as e:
+        print(f"[-] Could not start the scanner: {e}")
+        return 1
+
+    def handle_signal(sig, frame):
+        logger.log("Daemon: Shutting down...")
+        daemon.stop()
+
+    signal.signal(signal.SIGINT, handle_signal)
+    signal.signal(signal.SIGTERM, handle_signal)
+
+    if args.once:
+        daemon.run_cycle(force_full=True)
+        daemon.close()
+        return 0
+
+    daemon.run()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
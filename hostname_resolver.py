@@ -0,0 +1,276 @@
+"""
+Hostname Resolver - Names for scanned devices (reverse DNS, NetBIOS, mDNS).
+
+Hosts are queried concurrently on one asyncio loop; every host asks all
+three sources at once and the first name in preference order wins:
+
+    reverse DNS   PTR lookup through the system resolver (routers usually
+                  register DHCP clients' names)
+    mDNS          unicast PTR query to the host's port 5353 (Apple, Linux,
+                  printers, Chromecasts, most IoT boards)
+    NetBIOS       node status request to UDP 137 (Windows, Samba)
+
+Results, including "no name", are kept in a JSON cache keyed by MAC with a
+TTL, so a repeat scan only asks about new hosts and hosts whose entry expired.
+Nothing here blocks a scan: NetworkScanner.enrich_hostnames() applies cached
+names right away and resolves the rest in a background thread.
+"""
+
+import os
+import json
+import time
+import random
+import socket
+import struct
+import asyncio
+import threading
+import concurrent.futures
+
+MDNS_PORT = 5353
+NETBIOS_PORT = 137
+
+DNS_HEADER = struct.Struct("!HHHHHH")  # id, flags, qdcount, ancount, nscount, arcount
+DNS_TYPE_PTR = 12
+NBSTAT_TYPE = 0x21
+
+
+# --- Wire formats ---
+
+def _encode_name(name):
+    return b"".join(bytes([len(label)]) + label.encode() for label in name.split(".") if label) + b"\0"
+
+
+def _reverse_name(ip):
+    return ".".join(reversed(ip.split("."))) + ".in-addr.arpa"
+
+
+def _read_name(data, offset):
+    """Decodes a (possibly compressed) DNS name. Returns (name, offset after it)."""
+    labels = []
+    end = None
+    for _ in range(128):  # Bounds pointer loops in malformed packets
+        length = data[offset]
+        if length & 0xC0 == 0xC0:
+            if end is None:
+                end = offset + 2
+            offset = ((length & 0x3F) << 8) | data[offset + 1]
+            continue
+        offset += 1
+        if length == 0:
+            break
+        labels.append(data[offset:offset + length].decode("utf-8", errors="ignore"))
+        offset += length
+    return ".".join(labels), end if end is not None else offset
+
+
+def mdns_query(ip):
+    """A unicast mDNS PTR query for `ip`'s reverse name (answered to our source port)."""
+    return DNS_HEADER.pack(random.randrange(1 << 16), 0, 1, 0, 0, 0) + \
+        _encode_name(_reverse_name(ip) + ".") + struct.pack("!HH", DNS_TYPE_PTR, 1)
+
+
+def parse_ptr_answer(data):
+    """The first PTR target in a DNS response, without a trailing ".local"; None if there is none."""
+    try:
+        _id, _flags, qdcount, ancount, _ns, _ar = DNS_HEADER.unpack_from(data)
+        offset = DNS_HEADER.size
+        for _ in range(qdcount):
+            _name, offset = _read_name(data, offset)
+            offset += 4
+        for _ in range(ancount):
+            _name, offset = _read_name(data, offset)
+            rtype, _cls, _ttl, rdlength = struct.unpack_from("!HHIH", data, offset)
+            offset += 10
+            if rtype == DNS_TYPE_PTR:
+                name, _ = _read_name(data, offset)
+                name = name.rstrip(".")
+                return name[:-len(".local")] if name.endswith(".local") else name or None
+            offset += rdlength
+    except (IndexError, struct.error):
+        pass
+    return None
+
+
+# NBSTAT query for the wildcard name "*" (first-level encoded, 32 bytes)
+NETBIOS_QUERY_NAME = b"\x20" + b"CK" + b"AA" * 15 + b"\0"
+
+
+def netbios_query():
+    return DNS_HEADER.pack(random.randrange(1 << 16), 0, 1, 0, 0, 0) + \
+        NETBIOS_QUERY_NAME + struct.pack("!HH", NBSTAT_TYPE, 1)
+
+
+def parse_netbios_answer(data):
+    """The workstation name (unique, suffix 0x00) from a node status response, else None."""
+    try:
+        offset = DNS_HEADER.size + len(NETBIOS_QUERY_NAME) + 10  # Name, type, class, TTL, length
+        count = data[offset]
+        offset += 1
+        for _ in range(count):
+            entry = data[offset:offset + 18]
+            if len(entry) < 18:
+                break
+            name, suffix, flags = entry[:15], entry[15], struct.unpack("!H", entry[16:18])[0]
+            if suffix == 0 and not flags & 0x8000:  # Not a group name
+                return name.decode("ascii", errors="ignore").strip() or None
+            offset += 18
+    except (IndexError, struct.error):
+        pass
+    return None
+
+
+class _Reply(asyncio.DatagramProtocol):
+    def __init__(self, ip, future):
+        self.ip = ip
+        self.future = future
+
+    def datagram_received(self, data, addr):
+        if addr[0] == self.ip and not self.future.done():
+            self.future.set_result(data)
+
+    def error_received(self, exc):
+        if not self.future.done():
+            self.future.set_exception(exc)
+
+
+async def _udp_query(ip, port, payload, timeout):
+    """Sends one datagram to ip:port and returns the first reply from `ip` (None on timeout)."""
+    loop = asyncio.get_running_loop()
+    future = loop.create_future()
+    transport, _ = await loop.create_datagram_endpoint(lambda: _Reply(ip, future),
+                                                       family=socket.AF_INET, local_addr=("0.0.0.0", 0))
+    try:
+        transport.sendto(payload, (ip, port))
+        return await asyncio.wait_for(future, timeout)
+    except (asyncio.TimeoutError, OSError):
+        return None
+    finally:
+        transport.close()
+
+
+# --- Cache ---
+
+class HostnameCache:
+    """
+    {mac: {"hostname", "source", "resolved_at"}} persisted to a JSON file.
+    A name is trusted for `ttl` seconds; a host with no name is asked again after `negative_ttl`.
+    """
+
+    def __init__(self, path="hostnames.json", ttl=24 * 3600, negative_ttl=3600):
+        self.path = path
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.entries = {}
+        self._lock = threading.Lock()
+        self._load()
+
+    def _load(self):
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, "r") as f:
+                self.entries = json.load(f)
+        except (OSError, ValueError):
+            self.entries = {}
+
+    def save(self):
+        if not self.path:
+            return
+        with self._lock:
+            data = dict(self.entries)
+        try:
+            tmp_file = self.path + ".tmp"
+            with open(tmp_file, "w") as f:
+                json.dump(data, f, indent=2)
+            os.replace(tmp_file, self.path)
+        except OSError as e:
+            print(f"[-] Could not save hostname cache: {e}")
+
+    def lookup(self, mac, now=None):
+        """Returns (fresh, hostname): fresh is False when `mac` should be resolved again."""
+        with self._lock:
+            entry = self.entries.get(mac)
+        if not entry:
+            return False, None
+        age = (now or time.time()) - entry["resolved_at"]
+        fresh = age < (self.ttl if entry["hostname"] else self.negative_ttl)
+        return fresh, entry["hostname"]
+
+    def store(self, mac, hostname, source, now=None):
+        with self._lock:
+            self.entries[mac] = {"hostname": hostname, "source": source, "resolved_at": now or time.time()}
+
+
+# --- Resolver ---
+
+class HostnameResolver:
+    """
+    Resolves many hosts at once.
+    concurrency: hosts queried at the same time
+    timeout: seconds each individual query may take
+    """
+
+    def __init__(self, cache=None, concurrency=64, timeout=1.5):
+        self.cache = cache if cache is not None else HostnameCache()
+        self.concurrency = concurrency
+        self.timeout = timeout
+
+    def resolve(self, hosts):
+        """
+        Resolves [(ip, mac)] and stores the results in the cache.
+        Returns {mac: (hostname, source)} for the hosts that have a name.
+        """
+        if not hosts:
+            return {}
+        # Reverse DNS goes through the blocking system resolver, on our own threads
+        # so a hung lookup cannot hold up the loop's shutdown
+        executor = concurrent.futures.ThreadPoolExecutor(max_workers=min(self.concurrency, 16))
+        try:
+            results = asyncio.run(self._resolve_all(hosts, executor))
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+        now = time.time()
+        found = {}
+        for (ip, mac), (hostname, source) in zip(hosts, results):
+            self.cache.store(mac, hostname, source, now)
+            if hostname:
+                found[mac] = (hostname, source)
+        self.cache.save()
+        return found
+
+    async def _resolve_all(self, hosts, executor):
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def bounded(ip):
+            async with semaphore:
+                return await self._resolve_host(ip, executor)
+
+        return await asyncio.gather(*(bounded(ip) for ip, _mac in hosts))
+
+    async def _resolve_host(self, ip, executor):
+        """(hostname, source) for one host, or (None, None)."""
+        rdns, mdns, netbios = await asyncio.gather(
+            self._reverse_dns(ip, executor),
+            _udp_query(ip, MDNS_PORT, mdns_query(ip), self.timeout),
+            _udp_query(ip, NETBIOS_PORT, netbios_query(), self.timeout),
+            return_exceptions=True
+        )
+        candidates = (
+            ("dns", rdns if isinstance(rdns, str) else None),
+            ("mdns", parse_ptr_answer(mdns) if isinstance(mdns, bytes) else None),
+            ("netbios", parse_netbios_answer(netbios) if isinstance(netbios, bytes) else None),
+        )
+        for source, hostname in candidates:
+            if hostname:
+                return hostname, source
+        return None, None
+
+    async def _reverse_dns(self, ip, executor):
+        loop = asyncio.get_running_loop()
+        try:
+            name = await asyncio.wait_for(loop.run_in_executor(executor, socket.gethostbyaddr, ip), self.timeout)
+        except (asyncio.TimeoutError, OSError):
+            return None
+        hostname = name[0].rstrip(".")
+        return hostname if hostname and hostname != ip else None
@@ -0,0 +1,160 @@
+"""
+ICMP Sweep Engine - Fast host discovery over a single raw socket.
+
+Instead of forking one `ping` process per address, the sweeper sends all
+echo requests from one raw ICMP socket at a configurable rate and matches
+the replies back to their targets by identifier/sequence number.
+
+Requires Administrator/Root (raw sockets). Callers should check
+`raw_icmp_available()` and fall back to the `ping` command otherwise.
+"""
+
+import socket
+import struct
+import select
+import time
+import random
+
+from scan_control import POLL_INTERVAL
+
+ICMP_ECHO_REPLY = 0
+ICMP_ECHO_REQUEST = 8
+
+_raw_icmp_supported = None
+
+
+def raw_icmp_available():
+    """Returns True if this process may open a raw ICMP socket (cached)."""
+    global _raw_icmp_supported
+    if _raw_icmp_supported is None:
+        try:
+            s = socket.socket(socket.AF_INET, socket.SOCK_RAW, socket.IPPROTO_ICMP)
+            s.close()
+            _raw_icmp_supported = True
+        except (OSError, AttributeError):
+            _raw_icmp_supported = False
+    return _raw_icmp_supported
+
+
+def _checksum(data):
+    """Internet checksum (RFC 1071)."""
+    if len(data) % 2:
+        data += b"\x00"
+    total = sum(struct.unpack(f"!{len(data) // 2}H", data))
+    total = (total >> 16) + (total & 0xFFFF)
+    total += total >> 16
+    return ~total & 0xFFFF
+
+
+class IcmpSweeper:
+    """
+    Sends ICMP echo requests to many hosts over one raw socket.
+
+    timeout: seconds to keep listening after the last request was sent.
+    rate:    maximum requests per second (0 = send as fast as possible).
+    """
+
+    def __init__(self, timeout=0.5, rate=2000, source_ip=None):
+        self.timeout = timeout
+        self.rate = rate
+        self.source_ip = source_ip
+        self.identifier = random.randint(0, 0xFFFF)
+
+    def _build_packet(self, seq):
+        """Builds an echo request with our identifier and the given sequence."""
+        payload = struct.pack("!d", time.time()) + b"\x00" * 24
+        header = struct.pack("!BBHHH", ICMP_ECHO_REQUEST, 0, 0, self.identifier, seq)
+        csum = _checksum(header + payload)
+        header = struct.pack("!BBHHH", ICMP_ECHO_REQUEST, 0, csum, self.identifier, seq)
+        return header + payload
+
+    def _parse_reply(self, data):
+        """Returns (identifier, sequence) for an echo reply, else None."""
+        if len(data) < 20:
+            return None
+        ihl = (data[0] & 0x0F) * 4
+        if len(data) < ihl + 8:
+            return None
+        icmp_type, _code, _csum, ident, seq = struct.unpack("!BBHHH", data[ihl:ihl + 8])
+        if icmp_type != ICMP_ECHO_REPLY:
+            return None
+        return ident, seq
+
+    def _drain(self, sock, pending, alive, wait, on_reply=None, cancel=None):
+        """Reads every reply that arrives within `wait` seconds (or until `cancel` stops)."""
+        deadline = time.monotonic() + wait
+        while pending:
+            if cancel and cancel.stopped():
+                break
+            remaining = deadline - time.monotonic()
+            readable, _, _ = select.select([sock], [], [], min(max(remaining, 0), POLL_INTERVAL))
+            if not readable:
+                if remaining <= POLL_INTERVAL:
+                    break
+                continue
+            while True:
+                try:
+                    data, addr = sock.recvfrom(1024)
+                except (BlockingIOError, InterruptedError):
+                    break
+                reply = self._parse_reply(data)
+                if not reply:
+                    continue
+                ident, seq = reply
+                ip = addr[0]
+                if ident == self.identifier and pending.get(ip) == seq:
+                    del pending[ip]
+                    alive.add(ip)
+                    if on_reply:
+                        on_reply(ip)
+            if remaining <= 0:
+                break
+
+    def sweep(self, ips, on_reply=None, cancel=None):
+        """
+        Pings every address in `ips`.
+        Returns the responding addresses, in the order they were given.
+        `on_reply(ip)` is called as soon as each reply arrives.
+        A CancelToken in `cancel` ends the sweep early with the replies so far.
+        """
+        ips = list(ips)
+        if not ips:
+            return []
+
+        sock = socket.socket(socket.AF_INET, socket.SOCK_RAW, socket.IPPROTO_ICMP)
+        try:
+            sock.setblocking(False)
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 1 << 20)
+            if self.source_ip:
+                sock.bind((self.source_ip, 0))
+
+            pending = {}  # {ip: seq} for requests still awaiting a reply
+            alive = set()
+            interval = 1.0 / self.rate if self.rate else 0
+            start = time.monotonic()
+
+            for index, ip in enumerate(ips):
+                if cancel and cancel.stopped():
+                    break
+                seq = index & 0xFFFF
+                pending[ip] = seq
+                try:
+                    sock.sendto(self._build_packet(seq), (ip, 0))
+                except OSError:
+                    # Unreachable network / no route - treat as no reply
+                    pending.pop(ip, None)
+
+                # Pace sends, picking up replies while we wait for the next slot
+                if interval:
+                    next_send = start + (index + 1) * interval
+                    wait = next_send - time.monotonic()
+                    if wait > 0:
+                        self._drain(sock, pending, alive, wait, on_reply, cancel)
+
+            # Collect late replies
+            wait = cancel.clamp(self.timeout) if cancel else self.timeout
+            self._drain(sock, pending, alive, wait, on_reply, cancel)
+        finally:
+            sock.close()
+
+        return [ip for ip in ips if ip in alive]
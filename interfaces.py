@@ -0,0 +1,163 @@
+"""
+Interfaces - Enumerates the machine's IPv4 interfaces and the subnets on them.
+
+Linux:  dumps every IPv4 address over rtnetlink (RTM_GETADDR), so VLAN
+        subinterfaces, aliases and secondary addresses are all included;
+        link state and MAC come from SIOCGIFFLAGS / SIOCGIFHWADDR.
+Others: returns [] and callers fall back to the interface of the default route.
+"""
+
+import socket
+import struct
+import time
+import ipaddress
+
+from neighbor_table import (NETLINK_ROUTE, NLMSG_ERROR, NLMSG_DONE, NLM_F_REQUEST, NLM_F_DUMP,
+                            NLMSGHDR, RTATTR, _align, _format_mac)
+
+# rtnetlink constants (linux/rtnetlink.h, linux/if_addr.h, linux/if.h, linux/sockios.h)
+RTM_NEWADDR = 20
+RTM_GETADDR = 22
+IFA_ADDRESS = 1
+IFA_LOCAL = 2
+IFA_LABEL = 3
+RT_SCOPE_HOST = 254
+IFF_UP = 0x1
+IFF_LOOPBACK = 0x8
+IFF_RUNNING = 0x40
+SIOCGIFFLAGS = 0x8913
+SIOCGIFHWADDR = 0x8927
+
+IFADDRMSG = struct.Struct("=BBBBI")  # family, prefixlen, flags, scope, ifindex
+
+
+def _dump_addresses():
+    """Dumps the kernel's IPv4 addresses. Returns [(ifindex, label, ip, prefixlen, scope)]."""
+    addresses = []
+    sock = socket.socket(socket.AF_NETLINK, socket.SOCK_RAW, NETLINK_ROUTE)
+    try:
+        sock.bind((0, 0))
+        seq = int(time.time()) & 0xFFFFFFFF
+        request = NLMSGHDR.pack(NLMSGHDR.size + IFADDRMSG.size, RTM_GETADDR,
+                                NLM_F_REQUEST | NLM_F_DUMP, seq, 0)
+        request += IFADDRMSG.pack(socket.AF_INET, 0, 0, 0, 0)
+        sock.send(request)
+
+        while True:
+            data = sock.recv(65536)
+            offset = 0
+            while offset + NLMSGHDR.size <= len(data):
+                msg_len, msg_type, _flags, msg_seq, _pid = NLMSGHDR.unpack_from(data, offset)
+                if msg_len < NLMSGHDR.size:
+                    return addresses
+                if msg_seq != seq:
+                    offset += _align(msg_len)
+                    continue
+                if msg_type == NLMSG_DONE:
+                    return addresses
+                if msg_type == NLMSG_ERROR:
+                    raise OSError("rtnetlink address dump failed")
+
+                if msg_type == RTM_NEWADDR:
+                    body = offset + NLMSGHDR.size
+                    family, prefixlen, _, scope, ifindex = IFADDRMSG.unpack_from(data, body)
+                    local = address = label = None
+                    attr = body + IFADDRMSG.size
+                    end = offset + msg_len
+                    while attr + RTATTR.size <= end:
+                        attr_len, attr_type = RTATTR.unpack_from(data, attr)
+                        if attr_len < RTATTR.size:
+                            break
+                        value = data[attr + RTATTR.size:attr + attr_len]
+                        if attr_type == IFA_LOCAL and len(value) == 4:
+                            local = socket.inet_ntoa(value)
+                        elif attr_type == IFA_ADDRESS and len(value) == 4:
+                            address = socket.inet_ntoa(value)
+                        elif attr_type == IFA_LABEL:
+                            label = value.split(b"\0", 1)[0].decode(errors="ignore")
+                        attr += _align(attr_len)
+
+                    ip = local or address
+                    if family == socket.AF_INET and ip:
+                        addresses.append((ifindex, label, ip, prefixlen, scope))
+
+                offset += _align(msg_len)
+    finally:
+        sock.close()
+
+
+def _link_info(sock, name):
+    """Returns (flags, MAC string or None) for interface `name`."""
+    import fcntl
+    ifreq = struct.pack("256s", name.encode()[:15])
+    flags = struct.unpack_from("H", fcntl.ioctl(sock.fileno(), SIOCGIFFLAGS, ifreq), 16)[0]
+    try:
+        hwaddr = fcntl.ioctl(sock.fileno(), SIOCGIFHWADDR, ifreq)[18:24]
+        mac = _format_mac(hwaddr)
+    except OSError:
+        mac = None
+    return flags, mac
+
+
+def all_addresses():
+    """
+    Every IPv4 address on the machine, including down and loopback interfaces, as
+    {"name", "label", "ip", "prefixlen", "scope", "flags", "mac"} records. [] if unavailable.
+    """
+    if not hasattr(socket, "AF_NETLINK"):
+        return []
+    try:
+        addresses = _dump_addresses()
+    except OSError:
+        return []
+
+    records = []
+    links = {}
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    try:
+        for ifindex, label, ip, prefixlen, scope in addresses:
+            try:
+                name = socket.if_indextoname(ifindex)
+                if name not in links:
+                    links[name] = _link_info(sock, name)
+            except OSError:
+                continue
+            flags, mac = links[name]
+            records.append({"name": name, "label": label or name, "ip": ip, "prefixlen": prefixlen,
+                            "scope": scope, "flags": flags, "mac": mac})
+    finally:
+        sock.close()
+    return records
+
+
+def list_interfaces():
+    """
+    The scannable interfaces: up, running, not loopback, with a subnet larger than /31.
+    Returns [{"name", "ip", "mac", "netmask", "network"}], one per address (so an
+    interface with two subnets appears twice); "network" is an IPv4Network.
+    VLAN subinterfaces are interfaces of their own (e.g. "eth0.10").
+    """
+    interfaces = []
+    for record in all_addresses():
+        flags = record["flags"]
+        if not flags & IFF_UP or not flags & IFF_RUNNING or flags & IFF_LOOPBACK:
+            continue
+        if record["scope"] == RT_SCOPE_HOST or record["prefixlen"] > 30 or not record["mac"]:
+            continue
+        iface = ipaddress.ip_interface(f"{record['ip']}/{record['prefixlen']}")
+        interfaces.append({
+            "name": record["name"],
+            "ip": record["ip"],
+            "mac": record["mac"],
+            "netmask": str(iface.netmask),
+            "network": iface.network
+        })
+    return interfaces
+
+
+def interface_for(ip):
+    """Returns (interface name, MAC string) of the interface that owns `ip`, or None."""
+    for record in all_addresses():
+        if record["ip"] == ip and record["mac"]:
+            return record["name"], record["mac"]
+    return None
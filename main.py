@@ -1,5 +1,6 @@
 import customtkinter as ctk
 import tkinter as tk
+import threading
 from threading import Thread
 import time
 import random
@@ -7,6 +8,13 @@ import math
 import json
 import os
 
+from scan_control import CancelToken
+from database_manager import DatabaseManager
+from scan_metrics import format_summary
+from presence import SUSPECT, describe_event
+from scan_diff import diff_scans
+import metrics_exporter
+
 # WiFi Blocker Integration
 try:
     from wifi_blocker import WiFiBlocker
@@ -45,347 +53,147 @@ MOCK_DEVICES = []
 
 # --- Backend Integration Classes ---
 
-class DatabaseManager:
-    """Database manager using Neo4j for persistent storage."""
-    BLOCKED_DEVICES_FILE = "blocked_devices.json"
-    DEVICE_STATUSES_FILE = "device_statuses.json"  # For offline persistence
-    DEVICE_HISTORY_FILE = "device_history.json"    # For device history with dates
-    
-    def __init__(self, app_instance):
-        self.app = app_instance
-        self.neo4j_manager = None
-        self.use_neo4j = False
-        self.local_cache = [] # In-memory cache for current session
-        self.device_statuses = {}  # Separate dict for status persistence: {mac: status}
-        self.device_history = {}   # Device history with timestamps: {mac: {vendor, first_seen, last_seen, status}}
-        
-        # Load persisted device statuses and history from file (works without Neo4j)
-        self._load_device_statuses()
-        self._load_device_history()
-        
-        # Try to initialize Neo4j
-        try:
-            from neo4j_manager import create_neo4j_manager
-            self.neo4j_manager = create_neo4j_manager()
-            if self.neo4j_manager and self.neo4j_manager.is_available():
-                self.use_neo4j = True
-                self.app.log("DatabaseManager: Connected to Neo4j database.")
-                # Pre-load device statuses from Neo4j into local cache
-                self._load_initial_cache()
-            else:
-                self.app.log("DatabaseManager: Neo4j not available. Using local session cache.")
-        except Exception as e:
-            self.app.log(f"DatabaseManager: Neo4j initialization failed: {e}")
-            self.app.log("DatabaseManager: Falling back to local session cache.")
-
-    def _load_device_statuses(self):
-        """Loads device statuses from JSON file for offline persistence."""
-        if os.path.exists(self.DEVICE_STATUSES_FILE):
-            try:
-                with open(self.DEVICE_STATUSES_FILE, 'r') as f:
-                    self.device_statuses = json.load(f)
-                self.app.log(f"DatabaseManager: Loaded {len(self.device_statuses)} saved device statuses.")
-            except Exception as e:
-                self.app.log(f"DatabaseManager: Error loading device statuses: {e}")
-                self.device_statuses = {}
-
-    def _save_device_statuses(self):
-        """Saves device statuses to JSON file for offline persistence."""
-        try:
-            with open(self.DEVICE_STATUSES_FILE, 'w') as f:
-                json.dump(self.device_statuses, f, indent=2)
-        except Exception as e:
-            self.app.log(f"DatabaseManager: Error saving device statuses: {e}")
-
-    def _load_device_history(self):
-        """Loads device history from JSON file."""
-        if os.path.exists(self.DEVICE_HISTORY_FILE):
-            try:
-                with open(self.DEVICE_HISTORY_FILE, 'r') as f:
-                    self.device_history = json.load(f)
-                self.app.log(f"DatabaseManager: Loaded history for {len(self.device_history)} devices.")
-            except Exception as e:
-                self.app.log(f"DatabaseManager: Error loading device history: {e}")
-                self.device_history = {}
-
-    def _save_device_history(self):
-        """Saves device history to JSON file."""
-        try:
-            with open(self.DEVICE_HISTORY_FILE, 'w') as f:
-                json.dump(self.device_history, f, indent=2)
-        except Exception as e:
-            self.app.log(f"DatabaseManager: Error saving device history: {e}")
-
-    def get_all_history_devices(self):
-        """Returns all devices from history as a list."""
-        devices = []
-        for mac, data in self.device_history.items():
-            devices.append({
-                'mac': mac,
-                'vendor': data.get('vendor', 'Unknown'),
-                'status': self.device_statuses.get(mac, data.get('status', 'Unknown')),
-                'first_seen': data.get('first_seen', 'N/A'),
-                'last_seen': data.get('last_seen', 'N/A')
-            })
-        return devices
-
-    def get_history_by_date_range(self, start_date, end_date):
-        """Returns devices from history filtered by date range."""
-        devices = []
-        for mac, data in self.device_history.items():
-            first_seen = data.get('first_seen', '')
-            last_seen = data.get('last_seen', '')
-            
-            # Check if device was seen within the date range
-            # A device is included if it was seen (last_seen) within the range
-            # or if it first appeared (first_seen) within the range
-            try:
-                if last_seen >= start_date and first_seen <= end_date:
-                    devices.append({
-                        'mac': mac,
-                        'vendor': data.get('vendor', 'Unknown'),
-                        'status': self.device_statuses.get(mac, data.get('status', 'Unknown')),
-                        'first_seen': first_seen,
-                        'last_seen': last_seen
-                    })
-            except:
-                # If comparison fails, include the device anyway
-                pass
-        
-        self.app.log(f"History: Found {len(devices)} devices in date range.")
-        return devices
-
-    def _load_initial_cache(self):
-        """Pre-loads device statuses from Neo4j into the local cache."""
-        try:
-            devices = self.neo4j_manager.device_manager.get_all_devices()
-            if devices:
-                for d in devices:
-                    self.local_cache.append({
-                        'mac': d['mac'],
-                        'vendor': d.get('vendor', 'Unknown'),
-                        'status': d.get('status', 'Unknown'),
-                        'ip': 'Unknown'
-                    })
-                    # Also sync to device_statuses dict
-                    self.device_statuses[d['mac']] = d.get('status', 'Unknown')
-                self.app.log(f"DatabaseManager: Pre-loaded {len(devices)} device statuses from DB.")
-                self._save_device_statuses()  # Sync to file
-        except Exception as e:
-            self.app.log(f"DatabaseManager: Error pre-loading cache: {e}")
-
-    def fetch_devices(self):
-        """Returns a list of device dictionaries from Neo4j or local cache."""
-        self.app.log("DatabaseManager: Fetching known devices list...")
-        
-        if self.use_neo4j:
-            try:
-                devices = self.neo4j_manager.device_manager.get_all_devices()
-                if devices:
-                    # Convert Neo4j format to app format
-                    formatted_devices = []
-                    for d in devices:
-                        # Get appearance count
-                        count = self.neo4j_manager.device_manager.get_device_appearance_count(d['mac'])
-                        
-                        formatted_devices.append({
-                            'vendor': d.get('vendor', 'Unknown'),
-                            'ip': 'Unknown',  # Will be updated from latest scan
-                            'mac': d['mac'],
-                            'status': d.get('status', 'Unknown'),
-                            'angle': 0,
-                            'distance': 0.5,
-                            'appearances': count,
-                            'first_seen': str(d.get('first_seen', '')),
-                            'last_seen': str(d.get('last_seen', ''))
-                        })
-                    
-                    self.app.log(f"DatabaseManager: Found {len(formatted_devices)} devices in Neo4j.")
-                    return formatted_devices
-                else:
-                    self.app.log("DatabaseManager: No devices found in Neo4j.")
-                    return []
-            except Exception as e:
-                self.app.log(f"DatabaseManager: Error fetching from Neo4j: {e}")
-                return self.local_cache
-        else:
-            # Fallback to local cache
-            self.app.log(f"DatabaseManager: Found {len(self.local_cache)} devices in local cache.")
-            return self.local_cache
-    
-    def delete_device(self, mac):
-        """Deletes a device from Neo4j."""
-        if not self.use_neo4j:
-             # Remove from local cache
-             self.local_cache = [d for d in self.local_cache if d['mac'] != mac]
-             return True
-             
-        try:
-             query = "MATCH (d:Device {mac: $mac}) DETACH DELETE d"
-             self.neo4j_manager.connection.execute_query(query, {"mac": mac})
-             return True
-        except Exception as e:
-             self.app.log(f"DatabaseManager: Error deleting device: {e}")
-             return False
-
-    def save_scan_results(self, devices, duration=0.0):
-        """Saves scan results to Neo4j database, local cache, and device history."""
-        import time
-        current_time = time.strftime("%Y-%m-%d %H:%M:%S")
-        
-        # Merge logic: Create a map of existing cache to preserve 'status'
-        existing_cache_map = {d['mac']: d for d in self.local_cache}
-        
-        merged_devices = []
-        for new_device in devices:
-            mac = new_device['mac']
-            
-            # Update device history with timestamps
-            if mac in self.device_history:
-                # Existing device - update last_seen
-                self.device_history[mac]['last_seen'] = current_time
-                self.device_history[mac]['vendor'] = new_device.get('vendor', self.device_history[mac].get('vendor', 'Unknown'))
-            else:
-                # New device - set first_seen and last_seen
-                self.device_history[mac] = {
-                    'vendor': new_device.get('vendor', 'Unknown'),
-                    'first_seen': current_time,
-                    'last_seen': current_time,
-                    'status': 'Unknown'
-                }
-            
-            if mac in existing_cache_map:
-                # Preserve known status from cache
-                cached_status = existing_cache_map[mac].get('status', 'Unknown')
-                if cached_status != 'Unknown':
-                    new_device['status'] = cached_status
-            
-            merged_devices.append(new_device)
-        
-        # Save device history to file
-        self._save_device_history()
-            
-        # Update local cache with the merged list
-        self.local_cache = merged_devices
-        
-        if not self.use_neo4j:
-            self.app.log("DatabaseManager: Neo4j not available. Saved to local cache only.")
-            return None
-        
-        try:
-            scan_id = self.neo4j_manager.scan_manager.create_scan(devices, duration)
-            self.app.log(f"DatabaseManager: Scan saved to Neo4j (ID: {scan_id[:8]}...).")
-            return scan_id
-        except Exception as e:
-            self.app.log(f"DatabaseManager: Error saving scan: {e}")
-            return None
-    
-    def mark_device_as_known(self, mac):
-        """Marks a device as 'Known' in the database."""
-        # Update local cache regardless
-        for d in self.local_cache:
-            if d['mac'] == mac:
-                d['status'] = 'Known'
-        
-        # Update device_statuses dict and persist to file
-        self.device_statuses[mac] = 'Known'
-        self._save_device_statuses()
-                
-        if not self.use_neo4j:
-            self.app.log(f"DatabaseManager: Device {mac} marked as Known (Local Cache).")
-            return True
-        
-        try:
-            self.neo4j_manager.device_manager.mark_device_as_known(mac)
-            self.app.log(f"DatabaseManager: Device {mac} marked as Known.")
-            return True
-        except Exception as e:
-            self.app.log(f"DatabaseManager: Error marking device: {e}")
-            # We still return True if local cache succeeded, to keep UI responsive
-            return True
-
-    def mark_device_as_unknown(self, mac):
-        """Marks a device as 'Unknown' in the database."""
-        # Update local cache regardless
-        for d in self.local_cache:
-            if d['mac'] == mac:
-                d['status'] = 'Unknown'
-
-        # Update device_statuses dict and persist to file
-        self.device_statuses[mac] = 'Unknown'
-        self._save_device_statuses()
-
-        if not self.use_neo4j:
-            self.app.log(f"DatabaseManager: Device {mac} marked as Unknown (Local Cache).")
-            return True
-            
-        try:
-            query = "MATCH (d:Device {mac: $mac}) SET d.status = 'Unknown' RETURN d"
-            self.neo4j_manager.connection.execute_query(query, {"mac": mac})
-            self.app.log(f"DatabaseManager: Device {mac} marked as Unknown.")
-            return True
-        except Exception as e:
-            self.app.log(f"DatabaseManager: Error marking device as Unknown: {e}")
-            return True
-    
-    def get_scan_history(self, limit=10):
-        """Retrieves scan history from database."""
-        if not self.use_neo4j:
-            return []
-        
-        try:
-            return self.neo4j_manager.scan_manager.get_scan_history(limit)
-        except Exception as e:
-            self.app.log(f"DatabaseManager: Error fetching scan history: {e}")
-            return []
-    
-    def close(self):
-        """Closes database connection."""
-        if self.neo4j_manager:
-            self.neo4j_manager.close()
-
 class ScannerModule:
     """Real Network Scanner using Scapy/ARP via wifi_scanner.py."""
-    def __init__(self, app_instance):
+    FULL_SCAN_BUDGET = 180  # Seconds a full sweep may take before it returns what it has
+    LIVENESS_BUDGET = 15    # Seconds a liveness round may take
+    # Probe every scanned host's common TCP ports in the background (opt-in; devices
+    # in the Device Manager can always be probed with their "Ports" button)
+    AUTO_PORT_PROBE = os.environ.get("WIFIANALYZER_PORT_PROBE", "") == "1"
+    
+    def __init__(self, app_instance, initialize=True):
+        """
+        initialize: build the NetworkScanner now; with False the caller runs initialize()
+                    later (it loads the OUI index and may download it)
+        """
         self.app = app_instance
         self.network_scanner = None
+        self.radar_positions = {}  # {mac or ip: (angle, distance)} so dots keep their place between updates
+        self.scheduler = None
+        self.last_scan_was_full = True
+        self.last_scan_cancelled = False
+        self.last_presence_changes = 0
+        if initialize:
+            self.initialize()
+
+    def initialize(self):
+        """Creates the scheduler and the real NetworkScanner. Returns True on success."""
         try:
+            from scan_scheduler import AdaptiveScheduler
+            self.scheduler = AdaptiveScheduler()
+
             from wifi_scanner import NetworkScanner
             self.network_scanner = NetworkScanner()
+            self.network_scanner.presence.listeners.append(
+                lambda event: self.app.log(f"Presence: {describe_event(event)}"))
             self.app.log("ScannerModule: Initialized real NetworkScanner.")
+            return True
         except Exception as e:
             self.app.log(f"ScannerModule: Failed to init NetworkScanner: {e}")
+            return False
+
+    def start_passive_discovery(self):
+        """Starts the ARP/DHCP/mDNS listener (loads scapy, so call it off the UI's startup path)."""
+        if self.network_scanner and self.network_scanner.start_passive_discovery():
+            self.app.log("ScannerModule: Passive discovery (ARP/DHCP/mDNS) active.")
+
+    def format_device(self, device):
+        """Fills in the App's fields (status, radar position) on a scanner record, in place."""
+        # Pick a random position for the radar (visual only), stable per device
+        key = device.get('mac', 'Unknown')
+        if key == 'Unknown':
+            key = device.get('ip', 'Unknown')
+        if key not in self.radar_positions:
+            self.radar_positions[key] = (random.randint(0, 360), random.uniform(0.1, 0.9))
+        angle, distance = self.radar_positions[key]
+        
+        device['status'] = 'Unknown' # Will be updated against DB later
+        device['angle'] = angle
+        device['distance'] = distance
+        return device
+
+    def probe_ports(self, devices, force=False):
+        """Runs the port probe on `devices`; results reach the App through apply_ports()."""
+        if not self.network_scanner:
+            return None
+        return self.network_scanner.probe_ports(
+            devices, force=force,
+            on_probed=lambda mac, ports, services: self.app.after(0, lambda: self.app.apply_ports(mac, ports, services))
+        )
+
+    def seconds_until_next_scan(self):
+        """Seconds until the scheduler wants the next cycle."""
+        if not self.scheduler:
+            return 60
+        return self.scheduler.seconds_until_next()
+
+    def last_metrics(self):
+        """ScanMetrics of the most recent scan or liveness round, or None."""
+        if not self.network_scanner:
+            return None
+        return self.network_scanner.metrics_history.last()
 
-    def run_network_scan(self):
-        """Executes the real network scan."""
+    def recent_metrics(self, n=None, kind=None):
+        """Timing summaries of recent scans (of `kind`, e.g. "full"), oldest first."""
+        if not self.network_scanner:
+            return []
+        return self.network_scanner.recent_metrics(n, kind)
+
+    def full_sweep_due(self):
+        """True if the next cycle will be a full discovery sweep."""
+        return not self.scheduler or self.scheduler.discovery_due()
+
+    def run_network_scan(self, on_device=None, force_full=False, cancel=None):
+        """
+        Executes the real network scan.
+        A full sweep runs when forced or when the scheduler says one is due; other
+        cycles only re-check the known hosts that are due.
+        `on_device(device)` receives each formatted device as soon as it is discovered.
+        `cancel` (a CancelToken) aborts the scan; it also stops on its own once its time
+        budget is used up. Either way the devices found so far are returned.
+        """
+        self.last_scan_cancelled = False
+        self.last_presence_changes = 0
         if not self.network_scanner:
             self.app.log("ScannerModule: Real scanner not available. Returning empty.")
             return []
 
-        self.app.log("ScannerModule: Starting real network scan (ARP + Ping)...")
+        full_sweep = force_full or self.full_sweep_due()
+        if full_sweep:
+            self.app.log("ScannerModule: Starting real network scan (ARP + Ping)...")
         # No artificial sleep needed, the scan takes time
         
+        budget = self.FULL_SCAN_BUDGET if full_sweep else self.LIVENESS_BUDGET
+        token = CancelToken(budget, parent=cancel)
+        
         try:
-            # Run the scan
-            raw_results = self.network_scanner.scan()
+            # Run the scan, streaming devices to the caller as they appear
+            callback = None
+            if on_device:
+                callback = lambda device: on_device(self.format_device(device))
+            raw_results, self.last_scan_was_full = self.network_scanner.scheduled_scan(
+                self.scheduler, force_discovery=force_full, on_device=callback, cancel=token
+            )
             
             # Format results for the App
-            devices_found = []
-            for device in raw_results:
-                # Calculate a random position for the radar (visual only)
-                angle = random.randint(0, 360)
-                distance = random.uniform(0.1, 0.9)
-                
-                devices_found.append({
-                    'vendor': device.get('vendor', 'Unknown'),
-                    'ip': device.get('ip', 'Unknown'),
-                    'mac': device.get('mac', 'Unknown'),
-                    'status': 'Unknown', # Will be updated against DB later
-                    'angle': angle,
-                    'distance': distance
-                })
-                
-            self.app.log(f"ScannerModule: Scan finished. Found {len(devices_found)} active targets.")
+            devices_found = [self.format_device(device) for device in raw_results]
+            
+            # Cached hostnames now, new ones once the background lookups finish
+            self.network_scanner.enrich_hostnames(
+                devices_found,
+                on_resolved=lambda mac, hostname: self.app.after(0, lambda: self.app.apply_hostname(mac, hostname))
+            )
+            if self.AUTO_PORT_PROBE:
+                self.probe_ports(devices_found)
+            
+            self.last_scan_cancelled = token.cancelled
+            self.last_presence_changes = self.network_scanner.presence_changes
+            if token.cancelled:
+                self.app.log(f"ScannerModule: Scan cancelled. Kept {len(devices_found)} targets found so far.")
+            elif token.expired:
+                self.app.log(f"ScannerModule: Scan hit its {budget}s budget. Found {len(devices_found)} active targets.")
+            elif self.last_scan_was_full:
+                self.app.log(f"ScannerModule: Scan finished. Found {len(devices_found)} active targets.")
             return devices_found
             
         except Exception as e:
@@ -414,8 +222,8 @@ class DeviceCard(ctk.CTkFrame):
         # Status indicator bar (left edge visual)
         status_color = COLOR_ACCENT_GREEN if is_known else COLOR_ACCENT_RED
         
-        # Truncate long vendor names
-        vendor_text = device_data['vendor']
+        # Truncate long vendor names (the hostname, once known, is the title instead)
+        vendor_text = device_data.get('hostname') or device_data['vendor']
         if len(vendor_text) > 20:
             vendor_text = vendor_text[:18] + "..."
         
@@ -426,7 +234,12 @@ class DeviceCard(ctk.CTkFrame):
         vendor_label.grid(row=0, column=0, padx=15, pady=(12, 2), sticky="w") 
 
         # 2. IP Address (Below) - Slightly larger
-        ip_label = ctk.CTkLabel(self, text=device_data['ip'], 
+        ip_text = device_data['ip']
+        if device_data.get('hostname'):
+            ip_text += f"  ·  {device_data['vendor'][:24]}"
+        if device_data.get('presence') == SUSPECT:
+            ip_text += "  ·  no reply"
+        ip_label = ctk.CTkLabel(self, text=ip_text, 
                                  text_color=COLOR_TEXT_LIGHT, 
                                  font=ctk.CTkFont(family=FONT_FAMILY, size=12))
         ip_label.grid(row=1, column=0, padx=15, pady=(0, 12), sticky="w")
@@ -447,6 +260,14 @@ class DeviceCard(ctk.CTkFrame):
                                     width=70,
                                     height=20)
         status_pill.grid(row=0, column=1, padx=15, pady=(12, 0), sticky="e")
+        
+        self.shown = self.shown_fields(device_data)
+
+    @staticmethod
+    def shown_fields(device_data):
+        """What the card displays; a record that still matches needs no new card."""
+        return (device_data['ip'], device_data['mac'], device_data['vendor'], device_data['status'],
+                device_data.get('hostname'), device_data.get('presence') == SUSPECT)
 
 
 # --- Main Application ---
@@ -457,6 +278,7 @@ class NetworkAnalyzerApp(ctk.CTk):
 
         # --- Setup Window ---
         self.title("NETWORK ANALYZER v1.0")
+        self.protocol("WM_DELETE_WINDOW", self.on_closing)
         self.geometry("1000x700")
         self.config(bg=COLOR_BG_DEEP_BLACK)
         self.grid_rowconfigure(0, weight=1)
@@ -466,42 +288,116 @@ class NetworkAnalyzerApp(ctk.CTk):
         self.current_frame = None
         self.current_angle = 0
         self.scan_in_progress = False
+        self.scan_token = None  # CancelToken of the running scan
+        self.scan_is_manual = False
+        self.scan_is_full = False
+        self.pending_full_scan = False  # START SCAN clicked during a liveness round; runs when it ends
         self.detected_devices = []
+        self.last_scan_devices = []  # Result of the last completed scan, which the next one is diffed against
+        self.device_cards = {}  # {ip: DeviceCard} for the radar target list
         self.scan_start_time = 0
 
         # --- Module Instances ---
-        self.db_manager = DatabaseManager(self)
-        self.scanner = ScannerModule(self)
-        
-        # WiFi Blocker instance (optional)
-        self.wifi_blocker = None
-        if WIFI_BLOCKER_AVAILABLE:
-            try:
-                self.wifi_blocker = WiFiBlocker()
-                self.log("WiFiBlocker: Initialized successfully.")
-                # Load persisted blocked devices
-                self._load_blocked_devices()
-            except Exception as e:
-                self.log(f"WiFiBlocker: Initialization failed: {e}")
-                self.wifi_blocker = None
+        # Only the local JSON files are read here; the slow parts (Neo4j connect, OUI index,
+        # the blocker's gateway probe) run in background threads once the window is up
+        self.db_manager = DatabaseManager(self, connect=False)
+        self.scanner = ScannerModule(self, initialize=False)
+        self.wifi_blocker = None  # Set when WiFiBlocker has started
+        self.backend_status = {name: "starting" for name in self.BACKENDS}
+
+        # Metrics are always recorded; the HTTP endpoint only runs if WIFIANALYZER_METRICS_PORT is set
+        self.metrics_server = metrics_exporter.start_from_env()
+        if self.metrics_server:
+            host, port = self.metrics_server.server_address[:2]
+            self.log(f"Metrics endpoint: http://{host}:{port}/metrics")
 
         # --- Build UI Components ---
         self.create_sidebar()
         self.create_main_frames()
         
         self.switch_frame(self.radar_frame)
-        self.log("System initialization complete. Status: Active")
-        self.update_system_status("Active", "green")
+        self.update_system_status("Starting...", "orange")
         
-        # Start Auto-Scan Loop
+        # Auto-Scan starts once the scanner is ready
         self.auto_scan_enabled = True
-        self.schedule_next_scan()
+        self.auto_scan_job = None
+        
+        self.after(0, self.start_backends)
+
+
+    # --- Backend Startup ---
 
+    BACKENDS = ("Database", "Scanner", "Blocker")
+
+    def start_backends(self):
+        """Initializes the database, scanner and blocker concurrently, each in its own thread."""
+        for name, init in (("Database", self._init_database),
+                           ("Scanner", self._init_scanner),
+                           ("Blocker", self._init_blocker)):
+            Thread(target=self._run_backend_init, args=(name, init), daemon=True).start()
+
+    def _run_backend_init(self, name, init):
+        try:
+            ok = init()
+        except Exception as e:
+            self.log(f"{name}: Initialization failed: {e}")
+            ok = False
+        except SystemExit as e:
+            # The scanner's admin check and WiFiBlocker call sys.exit() when they cannot run;
+            # that must not end this thread before the UI hears back
+            self.log(f"{name}: Initialization failed: exited with code {e.code}")
+            ok = False
+        self.after(0, lambda: self._backend_ready(name, ok))
+
+    def _init_database(self):
+        self.db_manager.connect()
+        return True  # The local files work without Neo4j
+
+    def _init_scanner(self):
+        if not self.scanner.initialize():
+            return False
+        metrics_exporter.watch_scanner(self.scanner.network_scanner)
+        self.scanner.start_passive_discovery()
+        return True
+
+    def _init_blocker(self):
+        if not WIFI_BLOCKER_AVAILABLE:
+            return False
+        blocker = WiFiBlocker()
+        self.log("WiFiBlocker: Initialized successfully.")
+        metrics_exporter.watch_blocker(blocker)
+        return blocker
+
+    def _backend_ready(self, name, result):
+        """Runs on the UI thread as each backend finishes starting."""
+        if name == "Blocker" and result:
+            self.wifi_blocker = result
+            # Load persisted blocked devices
+            self._load_blocked_devices()
+        if name == "Scanner":
+            self.scan_button.configure(text="START SCAN", state="normal")
+            if result:
+                self.schedule_next_scan()
+
+        self.backend_status[name] = "ready" if result else "unavailable"
+        self.update_backend_status()
+        if "starting" not in self.backend_status.values():
+            self.log("System initialization complete. Status: Active")
+            self.update_system_status("Active", "green")
+
+    def update_backend_status(self):
+        """Shows which backends are up under the sidebar's status indicator."""
+        marks = {"starting": "…", "ready": "✓", "unavailable": "✗"}
+        text = "   ".join(f"{name} {marks[self.backend_status[name]]}" for name in self.BACKENDS)
+        self.backend_status_label.configure(text=text)
 
     # --- Logging System ---
 
     def log(self, message):
-        """Prints message to console and the System Logs GUI frame."""
+        """Prints message to console and the System Logs GUI frame (safe to call from any thread)."""
+        if threading.current_thread() is not threading.main_thread():
+            self.after(0, lambda: self.log(message))
+            return
         timestamp = time.strftime("[%H:%M:%S]")
         log_message = f"{timestamp} {message}"
         print(log_message)
@@ -564,6 +460,12 @@ class NetworkAnalyzerApp(ctk.CTk):
         self.system_status_label = ctk.CTkLabel(status_frame, text="System Status: Active", text_color="green", font=ctk.CTkFont(size=12))
         self.system_status_label.pack(side="left")
 
+        # Backend readiness (filled in as each one starts)
+        self.backend_status_label = ctk.CTkLabel(self.sidebar_frame, text="", text_color=COLOR_TEXT_GRAY,
+                                                 font=ctk.CTkFont(size=11))
+        self.backend_status_label.grid(row=8, column=0, padx=20, pady=(0, 15), sticky="sw")
+        self.update_backend_status()
+
     def create_main_frames(self):
         """Initializes all content frames for switching."""
         self.main_content_frame = ctk.CTkFrame(self, fg_color=COLOR_BG_DEEP_BLACK, corner_radius=0)
@@ -633,14 +535,14 @@ class NetworkAnalyzerApp(ctk.CTk):
         controls_frame.pack(fill="x", padx=10, pady=(10, 5))
         
         # Scan Button
-        self.scan_button = ctk.CTkButton(controls_frame, text="START SCAN", 
+        self.scan_button = ctk.CTkButton(controls_frame, text="STARTING...", state="disabled",
                                           command=self.start_scan_thread,
                                           fg_color=COLOR_ACCENT_RED, hover_color="#800020")
         self.scan_button.pack(side="top", fill="x", pady=(0, 10))
         
         # Auto-Scan Toggle
         self.auto_scan_var = ctk.BooleanVar(value=True)
-        self.auto_scan_switch = ctk.CTkSwitch(controls_frame, text="Auto-Scan (60s)", 
+        self.auto_scan_switch = ctk.CTkSwitch(controls_frame, text="Auto-Scan (adaptive)", 
                                               command=self.toggle_auto_scan,
                                               variable=self.auto_scan_var,
                                               progress_color=COLOR_ACCENT_BLUE,
@@ -726,8 +628,24 @@ class NetworkAnalyzerApp(ctk.CTk):
         self.after(25, self.animate_radar_sweep)
 
 
-    def update_device_list(self, devices):
-        """Updates the device list UI element with new data."""
+    def update_device_list(self, devices, diff=None):
+        """
+        Updates the device list UI element with new data.
+        With the scan's `diff` only the cards that changed are removed, added or rebuilt.
+        """
+        # Sync status with device_statuses dictionary (persisted to file)
+        for device in devices:
+            mac = device['mac']
+            # Look up status from persisted dictionary, default to Unknown
+            device['status'] = self.db_manager.device_statuses.get(mac, 'Unknown')
+
+        if diff is None or not self.apply_device_diff(devices, diff):
+            self.rebuild_device_cards(devices)
+            
+        self.detected_devices = devices 
+        self.draw_radar() 
+
+    def rebuild_device_cards(self, devices):
         # Clear existing cards
         controls_frame = self.scan_button.master
         for widget in self.device_list_frame.winfo_children():
@@ -737,92 +655,218 @@ class NetworkAnalyzerApp(ctk.CTk):
         # Re-pack the controls
         controls_frame.pack_forget() # Unpack the controls frame
         controls_frame.pack(fill="x", padx=10, pady=(10, 5)) # Pack it back at top
-        
-        # Sync status with device_statuses dictionary (persisted to file)
-        for device in devices:
-            mac = device['mac']
-            # Look up status from persisted dictionary, default to Unknown
-            device['status'] = self.db_manager.device_statuses.get(mac, 'Unknown')
 
         # Add new cards
+        self.device_cards = {}
         for i, device in enumerate(devices):
             card = DeviceCard(self.device_list_frame, device_data=device)
             card.pack(fill="x", padx=10, pady=(0, 10))
-            
-        self.detected_devices = devices 
-        self.draw_radar() 
+            self.device_cards[device['ip']] = card
+
+    def apply_device_diff(self, devices, diff):
+        """Updates the target list card by card. Returns False if it needs a full rebuild instead."""
+        current_ips = {device['ip'] for device in devices}
+        gone_ips = [device['ip'] for device in diff.departed] + [old_ip for _device, old_ip in diff.ip_changed]
+        for ip in gone_ips:
+            card = self.device_cards.pop(ip, None) if ip not in current_ips else None
+            if card is not None:
+                card.destroy()
+
+        for device in devices:
+            old_card = self.device_cards.get(device['ip'])
+            if old_card is not None and old_card.shown == DeviceCard.shown_fields(device):
+                continue  # Unchanged (or already added live during the scan)
+            card = DeviceCard(self.device_list_frame, device_data=device)
+            if old_card is not None:
+                card.pack(fill="x", padx=10, pady=(0, 10), before=old_card)
+                old_card.destroy()
+            else:
+                card.pack(fill="x", padx=10, pady=(0, 10))
+            self.device_cards[device['ip']] = card
+
+        # Cards left over from something the diff did not cover (e.g. a stopped scan's live results)
+        return len(self.device_cards) == len(current_ips)
+
+    def add_live_device(self, device):
+        """Adds (or refreshes) a single device on the radar and target list while a scan runs."""
+        device['status'] = self.db_manager.device_statuses.get(device['mac'], 'Unknown')
+        
+        # Replace an earlier record for the same IP (e.g. a MAC was found later)
+        old_card = self.device_cards.pop(device['ip'], None)
+        if old_card is not None:
+            old_card.destroy()
+        self.detected_devices = [d for d in self.detected_devices if d['ip'] != device['ip']]
+        
+        card = DeviceCard(self.device_list_frame, device_data=device)
+        card.pack(fill="x", padx=10, pady=(0, 10))
+        self.device_cards[device['ip']] = card
+        
+        self.detected_devices.append(device)
+        self.draw_radar()
+
+    def apply_hostname(self, mac, hostname):
+        """Shows a hostname resolved in the background on the device's card."""
+        for device in self.db_manager.local_cache:
+            if device['mac'] == mac:
+                device['hostname'] = hostname
+        for device in self.detected_devices:
+            if device['mac'] != mac:
+                continue
+            device['hostname'] = hostname
+            old_card = self.device_cards.get(device['ip'])
+            if old_card is not None:
+                card = DeviceCard(self.device_list_frame, device_data=device)
+                card.pack(fill="x", padx=10, pady=(0, 10), before=old_card)
+                old_card.destroy()
+                self.device_cards[device['ip']] = card
 
 
     # --- Scan Functionality ---
 
-    def start_scan_thread(self):
-        """Starts the network scan in a separate thread."""
+    def start_scan_thread(self, full_sweep=True, manual=True):
+        """
+        Starts the network scan in a separate thread.
+        `full_sweep=False` lets the scheduler run a quiet liveness round instead when no sweep is due.
+        `manual=False` marks scans started by Auto-Scan (turning Auto-Scan off stops them).
+        A manual scan asked for during a liveness round starts as soon as the round ends.
+        """
         if self.scan_in_progress:
-            self.log("Scan failed: A scan is already in progress.")
+            if manual and full_sweep and not self.scan_is_full:
+                self.pending_full_scan = True
+                self.log("Scan: Starting after the current liveness check...")
+                self.scan_button.configure(text="STARTING...", state="disabled")
+            else:
+                self.log("Scan failed: A scan is already in progress.")
             return
 
         self.scan_in_progress = True
+        self.scan_is_manual = manual
+        self.scan_is_full = full_sweep
+        self.scan_token = CancelToken()
         self.scan_start_time = time.time()
-        self.update_system_status("Scanning...", "orange")
-        self.scan_button.configure(text="SCANNING...", state="disabled", fg_color="gray")
+        if full_sweep:
+            self.update_system_status("Scanning...", "orange")
+            self.scan_button.configure(text="STOP SCAN", command=self.stop_scan, fg_color="gray")
         
-        scan_thread = Thread(target=self.run_scanner_logic)
+        scan_thread = Thread(target=self.run_scanner_logic, args=(full_sweep, self.scan_token), daemon=True)
         scan_thread.start()
 
-    def run_scanner_logic(self):
+    def stop_scan(self):
+        """Aborts the running scan; it returns what it has found so far."""
+        if self.scan_in_progress and self.scan_token:
+            self.scan_token.cancel()
+            self.log("Scan: Stopping...")
+            self.scan_button.configure(text="STOPPING...", state="disabled")
+
+    def run_scanner_logic(self, full_sweep=True, cancel=None):
         """Called by the thread to perform scan."""
         try:
             # Execute scan
-            devices_from_db = self.db_manager.fetch_devices() # fetch first? mostly for merging if needed
-            newly_found_devices = self.scanner.run_network_scan()
+            newly_found_devices = self.scanner.run_network_scan(
+                on_device=lambda device: self.after(0, lambda: self.add_live_device(device)),
+                force_full=full_sweep,
+                cancel=cancel
+            )
             
             duration = time.time() - self.scan_start_time
+            was_full = self.scanner.last_scan_was_full
+            cancelled = self.scanner.last_scan_cancelled
+            # Against the last completed scan: live results and stopped scans change detected_devices
+            diff = diff_scans(self.last_scan_devices, newly_found_devices)
+            if not cancelled:
+                self.last_scan_devices = list(newly_found_devices)
+            # Presence changes too (e.g. online -> suspect), so the card's "no reply" follows a liveness round
+            changed = not cancelled and (was_full or bool(diff) or self.scanner.last_presence_changes > 0)
+            metrics = self.scanner.last_metrics()
             
-            # Save to DB
-            self.db_manager.save_scan_results(newly_found_devices, duration)
+            # Save to DB (liveness rounds only when something changed; never a cancelled scan)
+            if changed:
+                save_start = time.perf_counter()
+                self.db_manager.save_scan_results(newly_found_devices, duration, diff)
+                if metrics:
+                    metrics.add_time("persistence", time.perf_counter() - save_start)
             
             # Update UI (Must be done in main thread)
-            self.after(0, lambda: self.finish_scan_update_gui(newly_found_devices))
+            self.after(0, lambda: self.finish_scan_update_gui(newly_found_devices, was_full, changed, cancelled,
+                                                              metrics, diff))
             
         except Exception as e:
             self.after(0, lambda: self.log(f"Scan Error: {e}"))
+            self.after(0, lambda: self.finish_scan_update_gui(None, True, False))
 
-    def finish_scan_update_gui(self, devices):
+    def finish_scan_update_gui(self, devices, was_full=True, changed=True, cancelled=False, metrics=None, diff=None):
         """Updates the UI after the scan thread finishes."""
-        self.update_device_list(devices)
+        if changed:
+            render_start = time.perf_counter()
+            self.update_device_list(devices, diff)
+            if metrics:
+                metrics.add_time("gui_render", time.perf_counter() - render_start)
         
         self.scan_in_progress = False
+        self.scan_token = None
         self.update_system_status("Active", "green")
-        self.scan_button.configure(text="START SCAN", state="normal", fg_color=COLOR_ACCENT_RED)
+        self.scan_button.configure(text="START SCAN", command=self.start_scan_thread,
+                                   state="normal", fg_color=COLOR_ACCENT_RED)
+        
+        if cancelled:
+            self.log(f"Scan stopped. {len(devices)} devices found before it was cancelled.")
         
         # Refresh device manager if active
-        if self.current_frame == self.device_manager_frame:
+        if changed and self.current_frame == self.device_manager_frame:
              # Just refresh the current tab
              self.refresh_device_list(self.current_tab)
             
-        self.log(f"Scan completed. Found {len(devices)} devices.")
+        if devices is not None and was_full:
+            self.log(f"Scan completed. Found {len(devices)} devices.")
+            if metrics:
+                self.log(f"Scan metrics: {format_summary(metrics.summary())}")
+        elif changed:
+            self.log(f"Liveness check: {len(devices)} devices online.")
+        
+        if self.pending_full_scan:
+            self.pending_full_scan = False
+            self.start_scan_thread(full_sweep=True, manual=True)
+            return
         
         # Schedule next scan check
         self.schedule_next_scan()
 
     def schedule_next_scan(self):
-        """Schedules the next auto-scan check."""
-        self.after(60000, self.auto_scan_trigger)
+        """Schedules the next auto-scan check for when the scheduler next has work."""
+        if self.auto_scan_job:
+            self.after_cancel(self.auto_scan_job)
+        delay = min(max(self.scanner.seconds_until_next_scan(), 1), 60)
+        self.auto_scan_job = self.after(int(delay * 1000), self.auto_scan_trigger)
 
     def auto_scan_trigger(self):
         """Triggered by timer. Runs scan if enabled and idle."""
+        self.auto_scan_job = None
         if self.auto_scan_enabled and not self.scan_in_progress:
-            self.log("Auto-Scan: Triggering scheduled scan...")
-            self.start_scan_thread()
+            full_sweep = self.scanner.full_sweep_due()
+            if full_sweep:
+                self.log("Auto-Scan: Triggering scheduled scan...")
+            self.start_scan_thread(full_sweep=full_sweep, manual=False)
         else:
             # Just reschedule check if we skipped
             self.schedule_next_scan()
         
     def toggle_auto_scan(self):
-        """Toggles the auto-scan feature."""
+        """Toggles the auto-scan feature. Turning it off stops a running automatic scan."""
         self.auto_scan_enabled = self.auto_scan_var.get()
         status = "Enabled" if self.auto_scan_enabled else "Disabled"
         self.log(f"Auto-Scan: {status}")
+        if not self.auto_scan_enabled and self.scan_in_progress and not self.scan_is_manual:
+            self.stop_scan()
+
+    def on_closing(self):
+        """Stops any running scan and background listener, then closes the window."""
+        if self.scan_token:
+            self.scan_token.cancel()
+        if self.scanner.network_scanner:
+            self.scanner.network_scanner.stop_passive_discovery()
+        if self.metrics_server:
+            self.metrics_server.shutdown()
+        self.destroy()
 
 
     # --- System Logs Implementation ---
@@ -833,10 +877,21 @@ class NetworkAnalyzerApp(ctk.CTk):
         logs_frame.grid_rowconfigure(1, weight=1)
         logs_frame.grid_columnconfigure(0, weight=1)
 
-        # Title
-        title = ctk.CTkLabel(logs_frame, text="SYSTEM LOGS", 
+        # Header
+        header_frame = ctk.CTkFrame(logs_frame, fg_color="transparent")
+        header_frame.grid(row=0, column=0, padx=20, pady=20, sticky="ew")
+        
+        title = ctk.CTkLabel(header_frame, text="SYSTEM LOGS", 
                              font=ctk.CTkFont(size=20, weight="bold"), text_color=COLOR_ACCENT_RED)
-        title.grid(row=0, column=0, padx=20, pady=20, sticky="w")
+        title.pack(side="left")
+        
+        # Scan timing breakdown button
+        metrics_btn = ctk.CTkButton(header_frame, text="📊 Scan Metrics", width=130,
+                                    command=self.show_scan_metrics,
+                                    fg_color=COLOR_PANEL_DARK_CHARCOAL, 
+                                    hover_color=COLOR_BUTTON_HOVER,
+                                    corner_radius=8)
+        metrics_btn.pack(side="right")
 
         # Text Area for Logs
         self.log_text_area = ctk.CTkTextbox(logs_frame, 
@@ -851,6 +906,23 @@ class NetworkAnalyzerApp(ctk.CTk):
 
         return logs_frame
 
+    def show_scan_metrics(self, count=10):
+        """Writes the per-phase timing breakdown of the recent full sweeps (and the last liveness round) to the logs."""
+        summaries = self.scanner.recent_metrics(count, kind="full") + self.scanner.recent_metrics(1, kind="liveness")
+        if not summaries:
+            self.log("Scan metrics: no scans recorded yet.")
+            return
+        
+        self.log(f"--- Scan metrics (last {len(summaries)}) ---")
+        for summary in summaries:
+            started = time.strftime("%H:%M:%S", time.localtime(summary["started_at"]))
+            self.log(f"{started} {format_summary(summary)}")
+            counters = summary["counters"]
+            if counters:
+                self.log("    " + ", ".join(f"{name}={value}" for name, value in sorted(counters.items())))
+            if summary["most_probed"]:
+                self.log("    most probed: " + ", ".join(f"{ip} x{n}" for ip, n in summary["most_probed"]))
+
     def create_history_frame(self):
         """Creates the History page with date filtering."""
         page_frame = ctk.CTkFrame(self.main_content_frame, fg_color=COLOR_BG_DEEP_BLACK)
@@ -985,6 +1057,12 @@ class NetworkAnalyzerApp(ctk.CTk):
                      font=ctk.CTkFont(family=FONT_FAMILY, weight="bold", size=14),
                      text_color=COLOR_ACCENT_BLUE if is_known else COLOR_TEXT_LIGHT).pack(anchor="w")
         
+        # Hostname
+        if device.get('hostname'):
+            ctk.CTkLabel(info_frame, text=device['hostname'], 
+                         font=ctk.CTkFont(family=FONT_FAMILY, size=12),
+                         text_color=COLOR_TEXT_LIGHT).pack(anchor="w")
+        
         # MAC
         ctk.CTkLabel(info_frame, text=device.get('mac', 'Unknown'), 
                      font=ctk.CTkFont(family="Consolas", size=11),
@@ -1156,16 +1234,16 @@ class NetworkAnalyzerApp(ctk.CTk):
         else:
              devices = [d for d in self.db_manager.local_cache if d.get('status') == filter_type]
 
-        # Sync with current scan results to get live IPs
+        # Sync with current scan results to get live IPs (and names/ports found since)
+        active_by_mac = {d['mac']: d for d in self.detected_devices}
         for device in devices:
-            current_ip = 'Unknown'
-            for active_device in self.detected_devices:
-                if active_device['mac'] == device['mac']:
-                    current_ip = active_device['ip']
-                    break
-            
-            if current_ip != 'Unknown':
-                device['ip'] = current_ip
+            active_device = active_by_mac.get(device['mac'])
+            if active_device is None:
+                continue
+            device['ip'] = active_device['ip']
+            for key in ('hostname', 'ports', 'services'):
+                if key in active_device:
+                    device[key] = active_device[key]
         
         if not devices:
             ctk.CTkLabel(container, text=f"No {filter_type} devices found.", text_color=COLOR_TEXT_GRAY).pack(pady=20)
@@ -1203,6 +1281,12 @@ class NetworkAnalyzerApp(ctk.CTk):
                      font=ctk.CTkFont(family=FONT_FAMILY, weight="bold", size=14),
                      text_color=COLOR_ACCENT_BLUE if is_known else COLOR_TEXT_LIGHT).pack(anchor="w")
         
+        # Hostname
+        if device.get('hostname'):
+            ctk.CTkLabel(info_frame, text=device['hostname'], 
+                         font=ctk.CTkFont(family=FONT_FAMILY, size=12),
+                         text_color=COLOR_TEXT_LIGHT).pack(anchor="w")
+        
         # MAC Address (Monospace)
         ctk.CTkLabel(info_frame, text=device['mac'], 
                      font=ctk.CTkFont(family="Consolas", size=11),
@@ -1304,8 +1388,12 @@ class NetworkAnalyzerApp(ctk.CTk):
         
         # Device Info
         info_text = f"{device.get('vendor', 'Unknown')}\n{device['mac']}"
+        if device.get('hostname'):
+            info_text = f"{device['hostname']}\n" + info_text
         if 'ip' in device and device['ip'] != 'Unknown':
              info_text += f"\n{device['ip']}"
+        if 'ports' in device:
+             info_text += "\nPorts: " + (", ".join(device.get('services') or map(str, device['ports'])) or "none open")
              
         ctk.CTkLabel(card_frame, text=info_text, justify="left", 
                      font=ctk.CTkFont(size=12)).pack(side="left", padx=10, pady=10)
@@ -1314,6 +1402,11 @@ class NetworkAnalyzerApp(ctk.CTk):
         btn_frame = ctk.CTkFrame(card_frame, fg_color="transparent")
         btn_frame.pack(side="right", padx=10, pady=10)
         
+        if device.get('ip') and device['ip'] != 'Unknown':
+            # Probe common TCP ports
+            ctk.CTkButton(btn_frame, text="Ports", width=60, fg_color="gray",
+                          command=lambda d=device: self.probe_ports_action(d)).pack(side="left", padx=5)
+        
         if list_type == "Unknown":
             # Mark Known
             ctk.CTkButton(btn_frame, text="✓ Known", width=80, fg_color="green",
@@ -1462,6 +1555,23 @@ class NetworkAnalyzerApp(ctk.CTk):
         self.refresh_history_list()  # Load history on show
     def show_system_logs(self): self.switch_frame(self.logs_frame)
     
+    def probe_ports_action(self, device):
+        """Probes one device's common TCP ports now, ignoring cached results."""
+        if self.scanner.probe_ports([device], force=True):
+            self.log(f"Action: Probing ports on {device['ip']}...")
+        else:
+            self.log("Error: Port probe is not available.")
+
+    def apply_ports(self, mac, ports, services):
+        """Attaches port probe results to the device's records and refreshes the Device Manager."""
+        for device in self.db_manager.local_cache + self.detected_devices:
+            if device['mac'] == mac:
+                device['ports'] = ports
+                device['services'] = services
+        self.log(f"Ports {mac}: {', '.join(services) or 'none open'}")
+        if self.current_frame == self.device_manager_frame:
+            self.refresh_device_list(self.current_tab)
+
     def mark_device_as_known_action(self, mac):
         """Marks a device as Known and refreshes the list."""
         if self.db_manager.mark_device_as_known(mac):
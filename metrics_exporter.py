@@ -0,0 +1,257 @@
+"""
+Metrics Exporter - Prometheus text-format endpoint for headless monitoring.
+
+The instruments below are always recorded (an observation is a bisect and
+two additions under a lock, so the scan loop does not notice them); the
+HTTP endpoint only runs when started:
+
+    start_metrics_server(9464)          # or set WIFIANALYZER_METRICS_PORT
+    watch_scanner(network_scanner)      # scan durations, devices, OUI hits
+    watch_blocker(wifi_blocker)         # active block threads
+
+    curl http://127.0.0.1:9464/metrics
+"""
+
+import os
+import time
+import threading
+from bisect import bisect_left
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 9464
+
+
+def _format_labels(names, values, extra=None):
+    pairs = list(zip(names, values))
+    if extra:
+        pairs.append(extra)
+    if not pairs:
+        return ""
+    escaped = (str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, v in pairs)
+    return "{" + ",".join(f'{k}="{v}"' for (k, _), v in zip(pairs, escaped)) + "}"
+
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    """Monotonic counter, optionally split by labels."""
+
+    kind = "counter"
+
+    def __init__(self, name, help_text, labels=()):
+        self.name = name
+        self.help = help_text
+        self.labels = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, n=1, *label_values):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + n
+
+    def value(self, *label_values):
+        with self._lock:
+            return self._values.get(label_values, 0)
+
+    def samples(self):
+        with self._lock:
+            items = sorted(self._values.items())
+        return [(self.name, _format_labels(self.labels, key), value) for key, value in items]
+
+
+class Gauge:
+    """Current value, either set directly or read from `func` at scrape time."""
+
+    kind = "gauge"
+
+    def __init__(self, name, help_text, func=None):
+        self.name = name
+        self.help = help_text
+        self.func = func
+        self._value = 0
+
+    def set(self, value):
+        self._value = value
+
+    def samples(self):
+        value = self._value
+        if self.func:
+            try:
+                value = self.func()
+            except Exception:
+                return []
+        return [(self.name, "", value)]
+
+
+class Histogram:
+    """Cumulative-bucket histogram, optionally split by labels."""
+
+    kind = "histogram"
+
+    def __init__(self, name, help_text, buckets, labels=()):
+        self.name = name
+        self.help = help_text
+        self.buckets = sorted(buckets)
+        self.labels = tuple(labels)
+        self._series = {}  # {label values: [bucket counts..., +Inf count, sum]}
+        self._lock = threading.Lock()
+
+    def observe(self, value, *label_values):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [0] * (len(self.buckets) + 2)
+            series[index] += 1
+            series[-1] += value
+
+    @contextmanager
+    def time(self, *label_values):
+        """Observes how long the enclosed block took, in seconds."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, *label_values)
+
+    def samples(self):
+        with self._lock:
+            items = sorted((key, list(series)) for key, series in self._series.items())
+        samples = []
+        for key, series in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + [float("inf")], series):
+                cumulative += count
+                le = ("le", _format_value(float(bound)))
+                samples.append((self.name + "_bucket", _format_labels(self.labels, key, le), cumulative))
+            labels = _format_labels(self.labels, key)
+            samples.append((self.name + "_sum", labels, series[-1]))
+            samples.append((self.name + "_count", labels, cumulative))
+        return samples
+
+
+class Registry:
+    """The set of instruments the endpoint exposes."""
+
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric):
+        with self._lock:
+            self._metrics[metric.name] = metric
+        return metric
+
+    def render(self):
+        """All metrics in the Prometheus text exposition format."""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            for name, labels, value in metric.samples():
+                lines.append(f"{name}{labels} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+SCAN_DURATION = REGISTRY.register(Histogram(
+    "wifianalyzer_scan_duration_seconds", "Wall time of network scans.",
+    [0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300], labels=("kind",)))
+SCAN_DEVICES = REGISTRY.register(Histogram(
+    "wifianalyzer_scan_devices", "Devices found per scan.",
+    [0, 1, 2, 5, 10, 20, 50, 100, 250, 500, 1000], labels=("kind",)))
+OUI_LOOKUPS = REGISTRY.register(Counter(
+    "wifianalyzer_oui_lookups_total", "Vendor lookups by outcome.", labels=("result",)))
+OUI_HIT_RATIO = REGISTRY.register(Gauge(
+    "wifianalyzer_oui_hit_ratio", "Share of vendor lookups that found a vendor.",
+    func=lambda: OUI_LOOKUPS.value("hit") / max(OUI_LOOKUPS.value("hit") + OUI_LOOKUPS.value("miss"), 1)))
+DB_SAVE_LATENCY = REGISTRY.register(Histogram(
+    "wifianalyzer_db_save_seconds", "Time DatabaseManager takes to save a scan.",
+    [0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10]))
+NEO4J_QUERY_LATENCY = REGISTRY.register(Histogram(
+    "wifianalyzer_neo4j_query_seconds", "Neo4j query latency by operation.",
+    [0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5], labels=("operation",)))
+BLOCKER_THREADS = REGISTRY.register(Gauge(
+    "wifianalyzer_blocker_active_threads", "Running WiFiBlocker spoofing threads."))
+
+
+def _observe_scan(metrics):
+    """MetricsHistory listener: records a finished scan."""
+    SCAN_DURATION.observe(metrics.duration, metrics.kind)
+    counters = metrics.counters
+    if "devices" in counters:
+        SCAN_DEVICES.observe(counters["devices"], metrics.kind)
+    if counters.get("oui_hits"):
+        OUI_LOOKUPS.inc(counters["oui_hits"], "hit")
+    if counters.get("oui_misses"):
+        OUI_LOOKUPS.inc(counters["oui_misses"], "miss")
+
+
+def watch_scanner(network_scanner):
+    """Records every scan `network_scanner` finishes from now on."""
+    listeners = network_scanner.metrics_history.listeners
+    if _observe_scan not in listeners:
+        listeners.append(_observe_scan)
+
+
+def watch_blocker(wifi_blocker):
+    """Reports `wifi_blocker`'s live block threads at each scrape."""
+    def active_threads():
+        entries = list(wifi_blocker.blocked_devices.values())
+        return sum(1 for entry in entries if entry.get("thread") and entry["thread"].is_alive())
+    BLOCKER_THREADS.func = active_threads
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] not in ("/metrics", "/"):
+            self.send_error(404)
+            return
+        body = REGISTRY.render().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", CONTENT_TYPE)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass  # Scrapes every few seconds would flood the console
+
+
+def start_metrics_server(port=DEFAULT_PORT, host=DEFAULT_HOST):
+    """Serves /metrics from a daemon thread. Returns the server, or None if it could not bind."""
+    try:
+        server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    except OSError as e:
+        print(f"[-] Metrics endpoint unavailable on {host}:{port}: {e}")
+        return None
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+    print(f"[+] Metrics endpoint: http://{host}:{server.server_address[1]}/metrics")
+    return server
+
+
+def start_from_env():
+    """Starts the endpoint if WIFIANALYZER_METRICS_PORT is set. Returns the server or None."""
+    port = os.getenv("WIFIANALYZER_METRICS_PORT")
+    if not port:
+        return None
+    try:
+        port = int(port)
+    except ValueError:
+        print(f"[-] Ignoring invalid WIFIANALYZER_METRICS_PORT: {port}")
+        return None
+    return start_metrics_server(port, os.getenv("WIFIANALYZER_METRICS_HOST", DEFAULT_HOST))
@@ -0,0 +1,169 @@
+"""
+NDP Discovery - Finds IPv6 hosts on the local links in one round.
+
+Everything goes over a single raw ICMPv6 socket:
+
+- an Echo Request to the all-nodes group ff02::1 on each interface; every
+  IPv6 host on the link answers from its link-local address
+- Neighbor Solicitations for candidate addresses (the kernel's IPv6 neighbor
+  table and the EUI-64 link-local addresses of MACs we already know), sent
+  to their solicited-node groups; the Neighbor Advertisements carry the MAC
+- Neighbor Solicitations other hosts send while this runs (they carry the
+  sender's MAC too)
+
+The kernel's IPv6 neighbor table is read again afterwards to fill in the
+MAC of echo responders that did not advertise one. Needs root and Linux
+(raw ICMPv6 socket, rtnetlink); elsewhere discover() returns {}.
+"""
+
+import os
+import socket
+import struct
+import select
+import time
+
+from neighbor_table import read_neighbor_table
+from scan_control import POLL_INTERVAL
+
+ICMPV6_ECHO_REQUEST = 128
+ICMPV6_ECHO_REPLY = 129
+ICMPV6_NEIGHBOR_SOLICIT = 135
+ICMPV6_NEIGHBOR_ADVERT = 136
+OPT_SOURCE_LLADDR = 1
+OPT_TARGET_LLADDR = 2
+
+ALL_NODES = "ff02::1"
+NDP_HOP_LIMIT = 255  # RFC 4861: receivers drop NDP packets with any other hop limit
+
+
+def _format_mac(raw):
+    return ":".join(f"{b:02X}" for b in raw)
+
+
+def eui64_link_local(mac):
+    """The EUI-64 link-local address a host with `mac` would have (fe80::...ff:fe...)."""
+    b = bytes.fromhex(mac.replace(":", "").replace("-", ""))
+    iid = bytes([b[0] ^ 0x02]) + b[1:3] + b"\xff\xfe" + b[3:6]
+    return socket.inet_ntop(socket.AF_INET6, b"\xfe\x80" + b"\0" * 6 + iid)
+
+
+def solicited_node(ip):
+    """The solicited-node multicast group of `ip` (ff02::1:ffXX:XXXX)."""
+    low = socket.inet_pton(socket.AF_INET6, ip)[13:]
+    return socket.inet_ntop(socket.AF_INET6, b"\xff\x02" + b"\0" * 9 + b"\x01\xff" + low)
+
+
+def _lladdr_option(options, wanted):
+    """MAC from the first link-layer address option of type `wanted`, else None."""
+    offset = 0
+    while offset + 8 <= len(options):
+        opt_type, length = options[offset], options[offset + 1]
+        if length == 0:
+            return None
+        if opt_type == wanted:
+            return _format_mac(options[offset + 2:offset + 8])
+        offset += length * 8
+    return None
+
+
+def _usable(ip):
+    return not ip.startswith("ff") and ip != "::" and ip != "::1"
+
+
+class NdpDiscovery:
+    """
+    IPv6 host discovery on the given interfaces: [(interface name, our MAC)].
+    """
+
+    def __init__(self, interfaces):
+        self.interfaces = []
+        for name, mac in interfaces:
+            try:
+                self.interfaces.append((socket.if_nametoindex(name), name, bytes.fromhex(mac.replace(":", ""))))
+            except (OSError, ValueError):
+                continue
+
+    def discover(self, candidates=(), ping=True, timeout=1.0, cancel=None):
+        """
+        Runs one round: echo to ff02::1 (with `ping`) and a solicitation for each
+        candidate address, then listens `timeout` seconds.
+        Returns {ipv6 address: MAC} for every host that answered.
+        """
+        if not self.interfaces or not hasattr(socket, "AF_INET6") or os.name == "nt":
+            return {}
+        try:
+            sock = socket.socket(socket.AF_INET6, socket.SOCK_RAW, socket.IPPROTO_ICMPV6)
+        except OSError:
+            return {}
+
+        found = {}
+        try:
+            sock.setsockopt(socket.IPPROTO_IPV6, socket.IPV6_MULTICAST_HOPS, NDP_HOP_LIMIT)
+            sock.setsockopt(socket.IPPROTO_IPV6, socket.IPV6_UNICAST_HOPS, NDP_HOP_LIMIT)
+            sock.setsockopt(socket.IPPROTO_IPV6, socket.IPV6_MULTICAST_LOOP, 0)  # Not our own echo
+            sock.setblocking(False)
+            ident = os.getpid() & 0xFFFF
+            our_macs = {mac for _index, _name, mac in self.interfaces}
+
+            for ifindex, _name, mac in self.interfaces:
+                if ping:
+                    echo = struct.pack("!BBHHH", ICMPV6_ECHO_REQUEST, 0, 0, ident, 1) + b"wifianalyzer"
+                    self._send(sock, echo, ALL_NODES, ifindex)
+                for target in candidates:
+                    if not _usable(target):
+                        continue
+                    solicit = struct.pack("!BBHI", ICMPV6_NEIGHBOR_SOLICIT, 0, 0, 0) + \
+                        socket.inet_pton(socket.AF_INET6, target) + \
+                        bytes([OPT_SOURCE_LLADDR, 1]) + mac
+                    self._send(sock, solicit, solicited_node(target), ifindex)
+
+            deadline = time.monotonic() + timeout
+            while True:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or (cancel and cancel.stopped()):
+                    break
+                readable, _, _ = select.select([sock], [], [], min(remaining, POLL_INTERVAL))
+                if not readable:
+                    continue
+                while True:
+                    try:
+                        packet, addr = sock.recvfrom(2048)
+                    except (BlockingIOError, InterruptedError):
+                        break
+                    self._handle(packet, addr[0].split("%")[0], ident, our_macs, found)
+        finally:
+            sock.close()
+
+        # Echo responders that did not advertise a MAC are in the neighbor table by now
+        # (they had to resolve ours to answer)
+        missing = [ip for ip, mac in found.items() if mac is None]
+        if missing:
+            neighbors = read_neighbor_table(socket.AF_INET6)
+            for ip in missing:
+                found[ip] = neighbors.get(ip)
+        return {ip: mac for ip, mac in found.items() if mac}
+
+    @staticmethod
+    def _send(sock, packet, dest, ifindex):
+        try:
+            sock.sendto(packet, (dest, 0, 0, ifindex))
+        except OSError:
+            pass
+
+    @staticmethod
+    def _handle(packet, source, ident, our_macs, found):
+        if len(packet) < 8 or not _usable(source):
+            return
+        icmp_type = packet[0]
+        if icmp_type == ICMPV6_ECHO_REPLY:
+            if struct.unpack_from("!H", packet, 4)[0] == ident:
+                found.setdefault(source, None)
+        elif icmp_type == ICMPV6_NEIGHBOR_ADVERT and len(packet) >= 24:
+            target = socket.inet_ntop(socket.AF_INET6, packet[8:24])
+            mac = _lladdr_option(packet[24:], OPT_TARGET_LLADDR)
+            if mac and bytes.fromhex(mac.replace(":", "")) not in our_macs:
+                found[target] = mac
+        elif icmp_type == ICMPV6_NEIGHBOR_SOLICIT and len(packet) >= 24:
+            mac = _lladdr_option(packet[24:], OPT_SOURCE_LLADDR)
+            if mac and bytes.fromhex(mac.replace(":", "")) not in our_macs:
+                found[source] = mac
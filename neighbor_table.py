@@ -0,0 +1,151 @@
+"""
+Neighbor Table - Reads the system's IP -> MAC neighbor (ARP/NDP) cache in one go.
+
+Linux:   dumps the kernel table over rtnetlink (RTM_GETNEIGH), falling back
+         to parsing /proc/net/arp if netlink is unavailable.
+Windows: parses a single `arp -a` run.
+
+Used by NetworkScanner and WiFiBlocker so that resolving many IPs costs one
+table read instead of one read (or one process) per IP.
+"""
+
+import os
+import socket
+import struct
+import subprocess
+import time
+
+# rtnetlink constants (linux/netlink.h, linux/rtnetlink.h, linux/neighbour.h)
+NETLINK_ROUTE = 0
+NLMSG_ERROR = 2
+NLMSG_DONE = 3
+RTM_NEWNEIGH = 28
+RTM_GETNEIGH = 30
+NLM_F_REQUEST = 0x01
+NLM_F_DUMP = 0x300
+NDA_DST = 1
+NDA_LLADDR = 2
+NUD_INCOMPLETE = 0x01
+NUD_FAILED = 0x20
+NUD_NOARP = 0x40  # multicast/broadcast mappings, not real neighbors
+
+NLMSGHDR = struct.Struct("=IHHII")   # length, type, flags, seq, pid
+NDMSG = struct.Struct("=BBHiHBB")    # family, pad, pad, ifindex, state, flags, type
+RTATTR = struct.Struct("=HH")        # length, type
+
+EMPTY_MAC = "00:00:00:00:00:00"
+
+
+def _align(length):
+    return (length + 3) & ~3
+
+
+def _format_mac(raw):
+    return ":".join(f"{b:02X}" for b in raw)
+
+
+def _read_netlink(family):
+    """Dumps the kernel neighbor table for `family`. Returns {ip: mac}."""
+    entries = {}
+    sock = socket.socket(socket.AF_NETLINK, socket.SOCK_RAW, NETLINK_ROUTE)
+    try:
+        sock.bind((0, 0))
+        seq = int(time.time()) & 0xFFFFFFFF
+        request = NLMSGHDR.pack(NLMSGHDR.size + NDMSG.size, RTM_GETNEIGH,
+                                NLM_F_REQUEST | NLM_F_DUMP, seq, 0)
+        request += NDMSG.pack(family, 0, 0, 0, 0, 0, 0)
+        sock.send(request)
+
+        while True:
+            data = sock.recv(65536)
+            offset = 0
+            while offset + NLMSGHDR.size <= len(data):
+                msg_len, msg_type, _flags, msg_seq, _pid = NLMSGHDR.unpack_from(data, offset)
+                if msg_len < NLMSGHDR.size:
+                    return entries
+                if msg_seq != seq:
+                    offset += _align(msg_len)
+                    continue
+                if msg_type == NLMSG_DONE:
+                    return entries
+                if msg_type == NLMSG_ERROR:
+                    raise OSError("rtnetlink neighbor dump failed")
+
+                if msg_type == RTM_NEWNEIGH:
+                    body = offset + NLMSGHDR.size
+                    ndm_family, _, _, _ifindex, state, _, _ = NDMSG.unpack_from(data, body)
+                    ip = mac = None
+                    attr = body + NDMSG.size
+                    end = offset + msg_len
+                    while attr + RTATTR.size <= end:
+                        attr_len, attr_type = RTATTR.unpack_from(data, attr)
+                        if attr_len < RTATTR.size:
+                            break
+                        value = data[attr + RTATTR.size:attr + attr_len]
+                        if attr_type == NDA_DST:
+                            ip = socket.inet_ntop(ndm_family, value)
+                        elif attr_type == NDA_LLADDR and len(value) == 6:
+                            mac = _format_mac(value)
+                        attr += _align(attr_len)
+
+                    if ip and mac and mac != EMPTY_MAC and not state & (NUD_INCOMPLETE | NUD_FAILED | NUD_NOARP):
+                        entries[ip] = mac
+
+                offset += _align(msg_len)
+    finally:
+        sock.close()
+
+
+def _read_proc_arp(path="/proc/net/arp"):
+    """Parses /proc/net/arp (or a file in the same format). Returns {ip: mac}."""
+    entries = {}
+    with open(path, "r") as f:
+        # Skip header
+        next(f)
+        for line in f:
+            parts = line.split()
+            # Format: IP address       HW type     Flags       HW address            Mask     Device
+            #         192.168.1.1      0x1         0x2         00:50:56:c0:00:08     *        ens33
+            if len(parts) >= 4 and parts[3] != EMPTY_MAC:
+                entries[parts[0]] = parts[3].upper()
+    return entries
+
+
+def _read_windows_arp():
+    """Parses one `arp -a` run. Returns {ip: mac}."""
+    entries = {}
+    output = subprocess.run(
+        ["arp", "-a"],
+        capture_output=True,
+        text=True,
+        creationflags=0x08000000  # CREATE_NO_WINDOW
+    ).stdout
+    for line in output.splitlines():
+        parts = line.split()
+        if len(parts) >= 2 and parts[0].count('.') == 3:
+            mac_part = parts[1]
+            if "-" in mac_part and len(mac_part) == 17:
+                try:
+                    socket.inet_aton(parts[0])
+                except OSError:
+                    continue
+                entries[parts[0]] = mac_part.replace("-", ":").upper()
+    return entries
+
+
+def read_neighbor_table(family=socket.AF_INET):
+    """
+    Returns the system neighbor table as {ip: "AA:BB:CC:DD:EE:FF"}.
+    Returns an empty dict if the table cannot be read.
+    """
+    try:
+        if os.name == 'nt':
+            return _read_windows_arp() if family == socket.AF_INET else {}
+        try:
+            return _read_netlink(family)
+        except (OSError, AttributeError, struct.error):
+            if family == socket.AF_INET:
+                return _read_proc_arp()
+            raise
+    except Exception:
+        return {}
@@ -1,13 +1,15 @@
 import os
-from neo4j import GraphDatabase
-from dotenv import load_dotenv
 import time
-
-# Load environment variables
-load_dotenv()
+from metrics_exporter import NEO4J_QUERY_LATENCY
 
 class Neo4jManager:
     def __init__(self):
+        # The driver and dotenv are imported here so loading this module stays cheap
+        from neo4j import GraphDatabase
+        from dotenv import load_dotenv
+
+        # Load environment variables
+        load_dotenv()
         self.uri = os.getenv("NEO4J_URI", "bolt://localhost:7687")
         self.user = os.getenv("NEO4J_USERNAME", "neo4j")
         self.password = os.getenv("NEO4J_PASSWORD", "password")
@@ -41,7 +43,7 @@ class Neo4jManager:
             return None
         
         try:
-            with self.driver.session() as session:
+            with NEO4J_QUERY_LATENCY.time("execute_query"), self.driver.session() as session:
                 result = session.run(query, parameters)
                 return [record.data() for record in result]
         except Exception as e:
@@ -59,7 +61,7 @@ class DeviceManager:
                d.first_seen as first_seen, d.last_seen as last_seen
         """
         try:
-            with self.driver.session() as session:
+            with NEO4J_QUERY_LATENCY.time("get_all_devices"), self.driver.session() as session:
                 result = session.run(query)
                 return [record.data() for record in result]
         except Exception as e:
@@ -68,13 +70,13 @@ class DeviceManager:
 
     def get_known_devices(self):
         query = "MATCH (d:Device) WHERE d.status = 'Known' RETURN d.vendor as vendor, d.mac as mac, d.status as status"
-        with self.driver.session() as session:
+        with NEO4J_QUERY_LATENCY.time("get_known_devices"), self.driver.session() as session:
             result = session.run(query)
             return [record.data() for record in result]
 
     def get_unknown_devices(self):
         query = "MATCH (d:Device) WHERE d.status = 'Unknown' RETURN d.vendor as vendor, d.mac as mac, d.status as status"
-        with self.driver.session() as session:
+        with NEO4J_QUERY_LATENCY.time("get_unknown_devices"), self.driver.session() as session:
             result = session.run(query)
             return [record.data() for record in result]
 
@@ -89,7 +91,7 @@ class DeviceManager:
         ORDER BY s.timestamp DESC
         """
         try:
-            with self.driver.session() as session:
+            with NEO4J_QUERY_LATENCY.time("get_devices_by_date_range"), self.driver.session() as session:
                 result = session.run(query, start_date=start_date, end_date=end_date)
                 return [record.data() for record in result]
         except Exception as e:
@@ -102,7 +104,7 @@ class DeviceManager:
         RETURN count(r) as count
         """
         try:
-            with self.driver.session() as session:
+            with NEO4J_QUERY_LATENCY.time("get_device_appearance_count"), self.driver.session() as session:
                 result = session.run(query, mac=mac)
                 record = result.single()
                 return record["count"] if record else 0
@@ -113,7 +115,7 @@ class DeviceManager:
     def mark_device_as_known(self, mac):
         query = "MERGE (d:Device {mac: $mac}) SET d.status = 'Known'"
         try:
-            with self.driver.session() as session:
+            with NEO4J_QUERY_LATENCY.time("mark_device_as_known"), self.driver.session() as session:
                 session.run(query, mac=mac)
         except Exception as e:
             print(f"Error marking device as known: {e}")
@@ -122,7 +124,11 @@ class ScanManager:
     def __init__(self, driver):
         self.driver = driver
 
-    def create_scan(self, devices, duration):
+    def create_scan(self, devices, duration, diff=None):
+        """
+        Records a scan and links every device seen in it. With the scan's ScanDiff,
+        devices whose vendor lookup changed also get their stored vendor updated.
+        """
         scan_id = f"SCAN_{int(time.time())}"
         timestamp = time.strftime("%Y-%m-%d %H:%M:%S")
         
@@ -134,13 +140,16 @@ class ScanManager:
         MERGE (d:Device {mac: $mac})
         ON CREATE SET d.vendor = $vendor, d.status = 'Unknown', d.first_seen = $timestamp
         ON MATCH SET d.last_seen = $timestamp
+        SET d.hostname = coalesce($hostname, d.hostname)
         WITH d
         MATCH (s:NetworkScan {id: $scan_id})
         MERGE (d)-[:DETECTED_IN {ip_at_scan: $ip}]->(s)
         """
         
+        query_vendor = "MATCH (d:Device {mac: $mac}) SET d.vendor = $vendor"
+        
         try:
-            with self.driver.session() as session:
+            with NEO4J_QUERY_LATENCY.time("create_scan"), self.driver.session() as session:
                 # Create Scan Node
                 session.run(query_scan, scan_id=scan_id, timestamp=timestamp, duration=duration)
                 
@@ -150,8 +159,14 @@ class ScanManager:
                                 mac=device['mac'], 
                                 vendor=device.get('vendor', 'Unknown'), 
                                 ip=device.get('ip', 'Unknown'),
+                                hostname=device.get('hostname'),
                                 timestamp=timestamp,
                                 scan_id=scan_id)
+                
+                # Only the delta: vendors are otherwise set once, when the device is created
+                for device, _old_vendor in (diff.vendor_changed if diff else []):
+                    if device['mac'] != 'Unknown':  # Devices keyed by IP have no node of their own
+                        session.run(query_vendor, mac=device['mac'], vendor=device['vendor'])
                                 
             return scan_id
         except Exception as e:
@@ -166,7 +181,7 @@ class ScanManager:
         LIMIT $limit
         """
         try:
-            with self.driver.session() as session:
+            with NEO4J_QUERY_LATENCY.time("get_scan_history"), self.driver.session() as session:
                 result = session.run(query, limit=limit)
                 return [record.data() for record in result]
         except Exception as e:
@@ -0,0 +1,257 @@
+"""
+OUI Index - Compiled, memory-mapped vendor lookup table.
+
+Parsing the IEEE registries (`oui.txt` MA-L, `mam.txt` MA-M and
+`oui36.txt` MA-S) on every start is slow, so they are compiled once into
+a small binary file that is memory-mapped on load:
+
+    header    magic, version, byte-order marker, source signature, table count
+    tables    (prefix length in bits, entry count) for each table, longest first
+    prefixes  uint64 array; each table's MAC prefixes, sorted
+    offsets   uint32 array (entries + 1) of vendor name offsets into the string table
+    strings   UTF-8 vendor names, back to back
+
+Lookups are longest-prefix matches: the 36-bit table is searched first,
+then 28-bit, then 24-bit, each by binary search directly in the mapping.
+The index is rebuilt automatically whenever a source file's mtime or size
+changes (or a missing registry appears).
+"""
+
+import os
+import mmap
+import struct
+import bisect
+import hashlib
+from array import array
+
+INDEX_MAGIC = b"OUIX"
+INDEX_VERSION = 2
+BYTE_ORDER_MARK = 0x01020304
+
+# magic, version, byte-order mark, source signature, table count (padded to 8 bytes)
+HEADER = struct.Struct("=4sHIQI2x")
+# prefix length in bits, entry count
+TABLE = struct.Struct("=II")
+
+
+def mac_to_int(mac):
+    """Converts 'AA:BB:CC:DD:EE:FF' (or dash-separated) to a 48-bit integer."""
+    return int(mac.replace(":", "").replace("-", ""), 16)
+
+
+def _source_signature(source_files):
+    """64-bit digest of each source file's mtime and size (missing files included)."""
+    digest = hashlib.blake2b(digest_size=8)
+    for path in source_files:
+        try:
+            st = os.stat(path)
+            digest.update(struct.pack("=qq", st.st_mtime_ns, st.st_size))
+        except OSError:
+            digest.update(b"missing")
+    return struct.unpack("=Q", digest.digest())[0]
+
+
+def _parse_registry(path):
+    """
+    Returns [(bits, prefix, vendor)] from an IEEE registry text file.
+
+    Every assignment starts with an "XX-XX-XX (hex)" line. MA-M and MA-S
+    entries follow it with a "LOW-HIGH (base 16)" line giving the block
+    within that OUI, which determines the prefix length.
+    """
+    entries = []
+    pending = None
+    with open(path, "r", encoding="utf-8", errors="ignore") as f:
+        for line in f:
+            if "(hex)" in line:
+                if pending:
+                    entries.append(pending)
+                left, vendor = line.split("(hex)", 1)
+                digits = left.strip().replace("-", "")
+                try:
+                    pending = (4 * len(digits), int(digits, 16), vendor.strip())
+                except ValueError:
+                    pending = None
+            elif "(base 16)" in line and pending:
+                token = line.split("(base 16)", 1)[0].strip()
+                if "-" not in token:
+                    continue  # MA-L: the whole OUI is assigned
+                try:
+                    low, high = (int(part, 16) for part in token.split("-"))
+                except ValueError:
+                    continue
+                host_bits = (high - low + 1).bit_length() - 1
+                _bits, oui, vendor = pending
+                entries.append((48 - host_bits, ((oui << 24) | low) >> host_bits, vendor))
+                pending = None
+    if pending:
+        entries.append(pending)
+    return entries
+
+
+def build_index(source_files, index_file):
+    """Compiles the registry files into `index_file`. Returns the number of entries."""
+    signature = _source_signature(source_files)
+
+    # {bits: {prefix: vendor}} - later files/lines override earlier ones
+    tables = {}
+    for path in source_files:
+        if os.path.exists(path):
+            for bits, prefix, vendor in _parse_registry(path):
+                tables.setdefault(bits, {})[prefix] = vendor
+
+    table_lengths = sorted(tables, reverse=True)
+    prefixes = array("Q")
+    offsets = array("I")
+    strings = bytearray()
+    for bits in table_lengths:
+        for prefix in sorted(tables[bits]):
+            prefixes.append(prefix)
+            offsets.append(len(strings))
+            strings += tables[bits][prefix].encode("utf-8")
+    offsets.append(len(strings))
+
+    # Write to a temporary file first so readers never see a partial index
+    tmp_file = index_file + ".tmp"
+    with open(tmp_file, "wb") as f:
+        f.write(HEADER.pack(INDEX_MAGIC, INDEX_VERSION, BYTE_ORDER_MARK, signature, len(table_lengths)))
+        for bits in table_lengths:
+            f.write(TABLE.pack(bits, len(tables[bits])))
+        f.write(prefixes.tobytes())
+        f.write(offsets.tobytes())
+        f.write(strings)
+    os.replace(tmp_file, index_file)
+    return len(prefixes)
+
+
+class OuiIndex:
+    """
+    Read-only view of a compiled OUI index file.
+    """
+
+    def __init__(self, index_file):
+        self.index_file = index_file
+        self._file = open(index_file, "rb")
+        try:
+            self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except Exception:
+            self._file.close()
+            raise
+
+        magic, version, bom, self.signature, table_count = HEADER.unpack_from(self._mm, 0)
+        if magic != INDEX_MAGIC or version != INDEX_VERSION or bom != BYTE_ORDER_MARK:
+            self.close()
+            raise ValueError(f"{index_file} is not a compatible OUI index")
+
+        # [(bits, first entry, end entry)], longest prefix first
+        self.tables = []
+        start = HEADER.size
+        base = 0
+        for _ in range(table_count):
+            bits, count = TABLE.unpack_from(self._mm, start)
+            self.tables.append((bits, base, base + count))
+            base += count
+            start += TABLE.size
+        self.count = base
+
+        self._view = view = memoryview(self._mm)
+        self._prefixes = view[start:start + 8 * self.count].cast("Q")
+        start += 8 * self.count
+        self._offsets = view[start:start + 4 * (self.count + 1)].cast("I")
+        self._strings_start = start + 4 * (self.count + 1)
+
+    @classmethod
+    def open(cls, source_files, index_file=None):
+        """
+        Opens the index for the registry file(s), (re)building it first if it
+        is missing or out of date. Returns None if there is nothing to load.
+        """
+        if isinstance(source_files, str):
+            source_files = [source_files]
+        if index_file is None:
+            index_file = os.path.splitext(source_files[0])[0] + ".idx"
+        sources_exist = any(os.path.exists(path) for path in source_files)
+
+        if os.path.exists(index_file):
+            try:
+                index = cls(index_file)
+                if not sources_exist or index.is_current(source_files):
+                    return index
+                index.close()
+            except (OSError, ValueError, struct.error):
+                pass
+
+        if not sources_exist:
+            return None
+
+        build_index(source_files, index_file)
+        return cls(index_file)
+
+    def is_current(self, source_files):
+        """True if the index was built from the current versions of `source_files`."""
+        return _source_signature(source_files) == self.signature
+
+    def _vendor_at(self, i):
+        start = self._strings_start + self._offsets[i]
+        end = self._strings_start + self._offsets[i + 1]
+        return self._mm[start:end].decode("utf-8")
+
+    def _lookup_int(self, value, starts=None):
+        """
+        Longest-prefix match for a 48-bit MAC value. Returns the entry index or -1.
+        `starts` optionally holds a lower search bound per table (for sorted batches).
+        """
+        for t, (bits, lo, hi) in enumerate(self.tables):
+            prefix = value >> (48 - bits)
+            i = bisect.bisect_left(self._prefixes, prefix, starts[t] if starts else lo, hi)
+            if starts:
+                starts[t] = i
+            if i < hi and self._prefixes[i] == prefix:
+                return i
+        return -1
+
+    def lookup(self, mac):
+        """Returns the vendor for a MAC address string, or None if unknown."""
+        try:
+            value = mac_to_int(mac)
+        except ValueError:
+            return None
+        i = self._lookup_int(value)
+        return self._vendor_at(i) if i >= 0 else None
+
+    def resolve(self, macs):
+        """
+        Resolves many MAC address strings in one pass.
+        Returns a list of vendors (None where unknown) in the same order as `macs`.
+        """
+        values = {}
+        for mac in macs:
+            if mac not in values:
+                try:
+                    values[mac] = mac_to_int(mac)
+                except (ValueError, AttributeError):
+                    values[mac] = None
+
+        # Walk the MACs in ascending order so each table search resumes where the last ended
+        starts = [lo for _bits, lo, _hi in self.tables]
+        vendors = {}
+        for mac, value in sorted(((m, v) for m, v in values.items() if v is not None), key=lambda mv: mv[1]):
+            i = self._lookup_int(value, starts)
+            vendors[mac] = self._vendor_at(i) if i >= 0 else None
+
+        return [vendors.get(mac) for mac in macs]
+
+    def __len__(self):
+        return self.count
+
+    def close(self):
+        """Releases the memory mapping."""
+        for attr in ("_prefixes", "_offsets", "_view"):
+            view = getattr(self, attr, None)
+            if view is not None:
+                view.release()
+                setattr(self, attr, None)
+        if self._mm is not None:
+            self._mm.close()
+            self._mm = None
+        self._file.close()
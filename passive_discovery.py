@@ -0,0 +1,193 @@
+"""
+Passive Discovery - Keeps a device table current from traffic devices send anyway.
+
+A background scapy AsyncSniffer with a kernel-side BPF filter listens for
+ARP, DHCP and mDNS packets and records the sender's IP/MAC (plus the
+hostname when DHCP or mDNS announce one). No probes are sent; hosts heard
+here count as seen, so the AdaptiveScheduler only probes the ones that
+have gone quiet.
+"""
+
+import time
+import threading
+import ipaddress
+
+# scapy takes seconds to import, so it is loaded by the first start()
+AsyncSniffer = ARP = BOOTP = DHCP = DNS = IP = Ether = None
+
+# Filtered in the kernel so only these packets ever reach Python
+BPF_FILTER = "arp or (udp and (port 67 or port 68 or port 5353))"
+
+
+def _import_scapy():
+    global AsyncSniffer, ARP, BOOTP, DHCP, DNS, IP, Ether
+    if AsyncSniffer is None:
+        from scapy.all import AsyncSniffer, ARP, BOOTP, DHCP, DNS, IP, Ether
+
+
+def _format_mac(raw):
+    return ":".join(f"{b:02X}" for b in raw)
+
+
+class PassiveDiscovery:
+    """
+    Sniffs ARP, DHCP and mDNS traffic and maintains {mac: device} with last-seen times.
+
+    networks:      IPv4Networks to track (others are ignored); None tracks everything
+    vendor_lookup: optional callable mac -> vendor name
+    on_device:     optional callback(device) for new devices and IP changes
+    """
+
+    def __init__(self, networks=None, vendor_lookup=None, on_device=None, iface=None):
+        self.networks = networks
+        self.vendor_lookup = vendor_lookup
+        self.on_device = on_device
+        self.iface = iface
+        self.devices_by_mac = {}
+        self._lock = threading.Lock()
+        self._sniffer = None
+
+    # --- Lifecycle ---
+
+    def start(self):
+        """Starts sniffing in the background. Returns True on success."""
+        if self._sniffer:
+            return True
+        try:
+            _import_scapy()
+            kwargs = {"iface": self.iface} if self.iface else {}
+            self._sniffer = AsyncSniffer(filter=BPF_FILTER, prn=self._handle_packet, store=False, **kwargs)
+            self._sniffer.start()
+            print("[+] Passive discovery started.")
+            return True
+        except Exception as e:
+            print(f"[-] Passive discovery failed to start: {e}")
+            self._sniffer = None
+            return False
+
+    def stop(self):
+        """Stops sniffing."""
+        if self._sniffer:
+            try:
+                self._sniffer.stop()
+            except Exception:
+                pass
+            self._sniffer = None
+
+    @property
+    def running(self):
+        return self._sniffer is not None
+
+    # --- Device table ---
+
+    def _in_scope(self, ip):
+        if not ip or ip == "0.0.0.0":
+            return False
+        if self.networks is None:
+            return True
+        try:
+            address = ipaddress.IPv4Address(ip)
+        except ValueError:
+            return False
+        return any(address in network for network in self.networks)
+
+    def record(self, ip, mac, source, hostname=None, seen_at=None):
+        """Records a sighting of `mac` at `ip`. Also used to feed in active scan results."""
+        if not mac or mac == "Unknown" or not self._in_scope(ip):
+            return
+        mac = mac.upper()
+        seen_at = seen_at or time.time()
+
+        with self._lock:
+            device = self.devices_by_mac.get(mac)
+            changed = device is None or device["ip"] != ip
+            if device is None:
+                device = {
+                    "ip": ip,
+                    "mac": mac,
+                    "vendor": self.vendor_lookup(mac) if self.vendor_lookup else "Unknown",
+                    "source": source,
+                    "last_seen": seen_at
+                }
+                self.devices_by_mac[mac] = device
+            else:
+                device["ip"] = ip
+                device["source"] = source
+                device["last_seen"] = max(device["last_seen"], seen_at)
+            if hostname:
+                device["hostname"] = hostname
+            notify = dict(device) if changed else None
+
+        if notify and self.on_device:
+            self.on_device(notify)
+
+    def devices(self):
+        """Returns a copy of every tracked device."""
+        with self._lock:
+            return [dict(d) for d in self.devices_by_mac.values()]
+
+    # --- Packet handlers ---
+
+    def _handle_packet(self, packet):
+        try:
+            if ARP in packet:
+                self._handle_arp(packet)
+            elif DHCP in packet:
+                self._handle_dhcp(packet)
+            elif DNS in packet and IP in packet and Ether in packet:
+                self._handle_mdns(packet)
+        except Exception:
+            # Malformed packets must never kill the sniffer thread
+            pass
+
+    def _handle_arp(self, packet):
+        arp = packet[ARP]
+        # Requests and replies both reveal the sender
+        self.record(arp.psrc, arp.hwsrc, "arp")
+
+    def _handle_dhcp(self, packet):
+        bootp = packet[BOOTP]
+        if bootp.htype != 1:
+            return
+        mac = _format_mac(bytes(bootp.chaddr)[:6])
+
+        options = {}
+        for option in packet[DHCP].options:
+            if isinstance(option, tuple) and len(option) >= 2:
+                options[option[0]] = option[1]
+
+        # ACK carries the assigned address; a renewing client uses ciaddr;
+        # a new client announces the address it wants
+        ip = None
+        if options.get("message-type") == 5:
+            ip = bootp.yiaddr
+        elif bootp.ciaddr != "0.0.0.0":
+            ip = bootp.ciaddr
+        elif options.get("message-type") == 3:
+            ip = options.get("requested_addr")
+
+        hostname = options.get("hostname")
+        if isinstance(hostname, bytes):
+            hostname = hostname.decode("utf-8", errors="ignore")
+        self.record(ip, mac, "dhcp", hostname=hostname)
+
+    def _handle_mdns(self, packet):
+        ip = packet[IP].src
+        mac = packet[Ether].src
+        dns = packet[DNS]
+
+        # A record answers pointing at the sender name the host
+        hostname = None
+        for i in range(dns.ancount or 0):
+            try:
+                rr = dns.an[i]
+            except IndexError:
+                break
+            if getattr(rr, "type", None) == 1 and getattr(rr, "rdata", None) == ip:
+                name = rr.rrname.decode("utf-8", errors="ignore") if isinstance(rr.rrname, bytes) else str(rr.rrname)
+                hostname = name.rstrip(".")
+                if hostname.endswith(".local"):
+                    hostname = hostname[:-len(".local")]
+                break
+
+        self.record(ip, mac, "mdns", hostname=hostname)
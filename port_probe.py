@@ -0,0 +1,175 @@
+"""
+Port Probe - Which common TCP services discovered hosts are running.
+
+A TCP connect attempt per (host, port), all on one asyncio loop (no
+threads), bounded two ways:
+
+- a global limit on connection attempts in flight (open sockets)
+- a per-host rate: attempts to the same host are spaced 1/host_rate apart,
+  so no single device gets a burst of SYNs
+
+Services that speak first (SSH, FTP, SMTP, Telnet) have their greeting line
+read as a banner. Results are kept in a JSON cache keyed by MAC with a TTL,
+so repeat scans only probe new hosts and hosts whose entry expired.
+"""
+
+import os
+import json
+import time
+import asyncio
+import contextlib
+import threading
+
+# Common ports on home/office devices: remote access, web UIs, file/print sharing, IoT
+DEFAULT_PORTS = (21, 22, 23, 25, 53, 80, 110, 139, 143, 443, 445, 548, 554, 631, 1883,
+                 3389, 5000, 5900, 7000, 8008, 8009, 8080, 8443, 8883, 9100, 32400, 49152, 62078)
+
+SERVICES = {
+    21: "ftp", 22: "ssh", 23: "telnet", 25: "smtp", 53: "dns", 80: "http", 110: "pop3",
+    139: "netbios", 143: "imap", 443: "https", 445: "smb", 548: "afp", 554: "rtsp",
+    631: "ipp", 1883: "mqtt", 3389: "rdp", 5000: "upnp", 5900: "vnc", 7000: "airplay",
+    8008: "chromecast", 8009: "chromecast", 8080: "http-alt", 8443: "https-alt",
+    8883: "mqtt-tls", 9100: "printer", 32400: "plex", 49152: "upnp", 62078: "iphone-sync"
+}
+
+# Services that send a greeting line as soon as the connection opens
+BANNER_PORTS = frozenset((21, 22, 23, 25, 110, 143))
+
+
+def describe_services(ports, banners=None):
+    """["22/ssh (SSH-2.0-OpenSSH_9.6)", "80/http", ...] for a list of open ports."""
+    banners = banners or {}
+    described = []
+    for port in ports:
+        text = f"{port}/{SERVICES.get(port, 'tcp')}"
+        banner = banners.get(str(port))
+        if banner:
+            text += f" ({banner})"
+        described.append(text)
+    return described
+
+
+class PortCache:
+    """
+    {mac: {"ports", "banners", "probed_at", "port_set"}} persisted to a JSON file.
+    An entry is reused for `ttl` seconds, as long as it covered the same port set.
+    """
+
+    def __init__(self, path="port_probes.json", ttl=6 * 3600):
+        self.path = path
+        self.ttl = ttl
+        self.entries = {}
+        self._lock = threading.Lock()
+        self._load()
+
+    def _load(self):
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, "r") as f:
+                self.entries = json.load(f)
+        except (OSError, ValueError):
+            self.entries = {}
+
+    def save(self):
+        if not self.path:
+            return
+        with self._lock:
+            data = dict(self.entries)
+        try:
+            tmp_file = self.path + ".tmp"
+            with open(tmp_file, "w") as f:
+                json.dump(data, f, indent=2)
+            os.replace(tmp_file, self.path)
+        except OSError as e:
+            print(f"[-] Could not save port probe cache: {e}")
+
+    def lookup(self, mac, port_set, now=None):
+        """Returns (fresh, entry or None) for `mac`; entries for another port set are never fresh."""
+        with self._lock:
+            entry = self.entries.get(mac)
+        if not entry:
+            return False, None
+        fresh = entry["port_set"] == list(port_set) and (now or time.time()) - entry["probed_at"] < self.ttl
+        return fresh, entry
+
+    def store(self, mac, ports, banners, port_set, now=None):
+        with self._lock:
+            self.entries[mac] = {"ports": ports, "banners": banners, "probed_at": now or time.time(),
+                                 "port_set": list(port_set)}
+
+
+class PortProber:
+    """
+    Probes hosts for open TCP ports.
+    ports: the port set tried on every host
+    max_in_flight: connection attempts open at once, across all hosts
+    host_rate: connection attempts per second to any one host (0 = unlimited)
+    timeout: seconds to wait for a connection (and for a banner)
+    """
+
+    def __init__(self, ports=DEFAULT_PORTS, cache=None, max_in_flight=256, host_rate=20, timeout=1.0):
+        self.ports = tuple(sorted(set(ports)))
+        self.cache = cache if cache is not None else PortCache()
+        self.max_in_flight = max_in_flight
+        self.host_rate = host_rate
+        self.timeout = timeout
+
+    def probe(self, hosts):
+        """
+        Probes [(ip, mac)] and stores the results in the cache.
+        Returns {mac: {"ports": [open ports], "banners": {port: banner}}}.
+        """
+        if not hosts:
+            return {}
+        results = asyncio.run(self._probe_all(hosts))
+        now = time.time()
+        found = {}
+        for (_ip, mac), (ports, banners) in zip(hosts, results):
+            self.cache.store(mac, ports, banners, self.ports, now)
+            found[mac] = {"ports": ports, "banners": banners}
+        self.cache.save()
+        return found
+
+    async def _probe_all(self, hosts):
+        in_flight = asyncio.Semaphore(self.max_in_flight)
+        return await asyncio.gather(*(self._probe_host(ip, in_flight) for ip, _mac in hosts))
+
+    async def _probe_host(self, ip, in_flight):
+        """Returns ([open ports], {port: banner}) for one host."""
+        interval = 1.0 / self.host_rate if self.host_rate else 0
+        attempts = []
+        for port in self.ports:
+            await in_flight.acquire()
+            attempt = asyncio.ensure_future(self._connect(ip, port))
+            attempt.add_done_callback(lambda _: in_flight.release())
+            attempts.append(attempt)
+            if interval:
+                await asyncio.sleep(interval)
+
+        ports, banners = [], {}
+        for port, outcome in zip(self.ports, await asyncio.gather(*attempts)):
+            if outcome is not None:
+                ports.append(port)
+                if outcome:
+                    banners[str(port)] = outcome
+        return ports, banners
+
+    async def _connect(self, ip, port):
+        """None if the port is closed or filtered, else the banner ("" if there is none)."""
+        try:
+            reader, writer = await asyncio.wait_for(asyncio.open_connection(ip, port), self.timeout)
+        except (asyncio.TimeoutError, OSError):
+            return None
+        banner = ""
+        try:
+            if port in BANNER_PORTS:
+                line = await asyncio.wait_for(reader.readline(), self.timeout)
+                banner = line[:80].decode("utf-8", errors="ignore").strip()
+        except (asyncio.TimeoutError, OSError):
+            pass
+        finally:
+            writer.close()
+            with contextlib.suppress(OSError):
+                await writer.wait_closed()
+        return banner
@@ -0,0 +1,200 @@
+"""
+Presence Tracker - Which devices are online, with hysteresis and change events.
+
+Every device (keyed by MAC, or by IP when the MAC is unknown) is in one of
+three states:
+
+    online    seen in the latest round it was expected in
+    suspect   missed at least one sighting; still listed as present
+    offline   missed `offline_after` sightings in a row
+
+so one lost ARP reply no longer makes a device drop out of the list. State
+changes are reported to listeners as events:
+
+    joined       a new device, or an offline one seen again
+    left         a device went offline
+    ip_changed   a device was seen with a different IP address
+
+A state change gives the device a new record (a copy with the new
+"presence"), so lists handed out earlier are never changed underneath
+their holder; `changes` counts every state change, including online <->
+suspect, so a caller can tell whether a round changed anything.
+
+A sighting or a miss is a dict lookup plus a few assignments (O(1)); a full
+sweep's end-of-round only walks the devices currently present, and forgets
+devices that have been offline longer than `forget_after` (oldest first, so
+randomized MACs do not pile up in a long-running daemon).
+"""
+
+import time
+import threading
+from collections import deque
+
+ONLINE = "online"
+SUSPECT = "suspect"
+OFFLINE = "offline"
+
+
+def describe_event(event):
+    """One log line for an event: 'joined: 192.168.1.20 (AA:BB:...) Apple, Inc.'"""
+    text = f"{event['event']}: {event['ip']} ({event['mac']}) {event['vendor']}"
+    if "old_ip" in event:
+        text += f", was {event['old_ip']}"
+    return text
+
+
+class PresenceTracker:
+    """
+    offline_after: missed sightings in a row before a device is marked offline
+    history: how many recent events events() keeps
+    forget_after: seconds an offline device is remembered (seen again within it, it "joins" as before)
+    """
+
+    def __init__(self, offline_after=2, history=200, forget_after=86400):
+        self.offline_after = max(1, offline_after)
+        self.forget_after = forget_after
+        self.listeners = []      # Callables given each event dict as it happens
+        self.changes = 0         # State changes so far (online/suspect/offline)
+        self._devices = {}       # {key: entry}
+        self._present = {}       # {key: entry} for online and suspect devices, in order of arrival
+        self._offline = {}       # {key: entry} for offline devices, in the order they went offline
+        self._events = deque(maxlen=history)
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(device):
+        mac = device.get("mac", "Unknown")
+        return mac if mac and mac != "Unknown" else device["ip"]
+
+    # --- Sightings and misses ---
+
+    def seen(self, device, seen_at=None, keep_record=False):
+        """
+        Records a sighting of `device` (a record with "ip" and "mac").
+        keep_record: `device` only carries the address (e.g. a passive sighting); a device
+                     already tracked keeps its record (interface, ports, ...) with the new IP
+        """
+        seen_at = seen_at or time.time()
+        key = self._key(device)
+        events = []
+        with self._lock:
+            entry = self._devices.get(key)
+            if entry is None:
+                entry = self._devices[key] = {"device": device, "state": OFFLINE, "misses": 0, "last_seen": 0}
+            elif seen_at <= entry["last_seen"]:
+                return  # Not newer than what we have (e.g. a passive sighting reported again)
+
+            old_ip = entry["device"]["ip"]
+            if entry["state"] == OFFLINE:
+                events.append(self._event("joined", device, seen_at))
+            elif device["ip"] != old_ip and device["ip"] != "Unknown":
+                events.append(self._event("ip_changed", device, seen_at, old_ip=old_ip))
+
+            if keep_record and entry["device"] is not device:
+                # A copy, so lists handed out earlier still show the old address
+                record = entry["device"].copy()
+                if device["ip"] != "Unknown":
+                    record["ip"] = device["ip"]
+                if device.get("hostname") and not record.get("hostname"):
+                    record["hostname"] = device["hostname"]
+                device = record
+            elif device.get("presence") != ONLINE:
+                device = device.copy()  # The caller may have handed this record out already
+
+            if entry["state"] != ONLINE:
+                self.changes += 1
+            entry["device"] = device
+            entry["state"] = ONLINE
+            entry["misses"] = 0
+            entry["last_seen"] = seen_at
+            device["presence"] = ONLINE
+            self._present[key] = entry
+            self._offline.pop(key, None)
+        self._notify(events)
+
+    def missed(self, device, now=None):
+        """Records that `device` was expected to answer and did not."""
+        with self._lock:
+            entry = self._devices.get(self._key(device))
+            events = self._miss(entry, now or time.time()) if entry else []
+        self._notify(events)
+
+    def end_sweep(self, seen_keys, now=None):
+        """
+        After a full sweep: every present device not among `seen_keys` (from key_of())
+        counts one missed sighting.
+        """
+        now = now or time.time()
+        events = []
+        with self._lock:
+            for key, entry in list(self._present.items()):
+                if key not in seen_keys:
+                    events += self._miss(entry, now)
+            self._forget(now)
+        self._notify(events)
+
+    def key_of(self, device):
+        return self._key(device)
+
+    def _miss(self, entry, now):
+        if entry["state"] == OFFLINE:
+            return []
+        entry["misses"] += 1
+        state = SUSPECT if entry["misses"] < self.offline_after else OFFLINE
+        if state == entry["state"]:
+            return []
+        self.changes += 1
+        entry["state"] = state
+        device = entry["device"] = entry["device"].copy()
+        device["presence"] = state
+        if state == SUSPECT:
+            return []
+        entry["left_at"] = now
+        key = self._key(device)
+        self._present.pop(key, None)
+        self._offline[key] = entry
+        return [self._event("left", device, now)]
+
+    def _forget(self, now):
+        """Drops devices offline for longer than `forget_after`; only walks the expired ones."""
+        cutoff = now - self.forget_after
+        while self._offline:
+            key, entry = next(iter(self._offline.items()))
+            if entry["left_at"] >= cutoff:
+                break
+            del self._offline[key]
+            self._devices.pop(key, None)
+
+    # --- Results ---
+
+    def present_devices(self):
+        """Online and suspect devices (their latest records), in the order they first appeared."""
+        with self._lock:
+            return [entry["device"] for entry in self._present.values()]
+
+    def state(self, device):
+        """ONLINE, SUSPECT or OFFLINE (OFFLINE for devices never seen)."""
+        entry = self._devices.get(self._key(device))
+        return entry["state"] if entry else OFFLINE
+
+    def events(self, n=None):
+        """The most recent events (all kept ones if `n` is None), oldest first."""
+        with self._lock:
+            events = list(self._events)
+        return events if n is None else events[-n:]
+
+    def _event(self, kind, device, at, old_ip=None):
+        event = {"event": kind, "mac": device["mac"], "ip": device["ip"], "vendor": device.get("vendor", "Unknown"),
+                 "at": at}
+        if old_ip is not None:
+            event["old_ip"] = old_ip
+        self._events.append(event)
+        return event
+
+    def _notify(self, events):
+        for event in events:
+            for listener in list(self.listeners):
+                try:
+                    listener(event)
+                except Exception as e:
+                    print(f"[-] Presence listener failed: {e}")
@@ -0,0 +1,75 @@
+"""
+Scan Control - Cancellation and time budgets for running scans.
+
+A CancelToken is handed down through every scan phase (ARP exchange,
+ICMP sweep, ping pool). Phases poll `stopped()` between packets and while
+waiting for replies, and return whatever they have found so far once it is
+set, either because `cancel()` was called (e.g. from the GUI) or because
+the token's deadline passed.
+"""
+
+import time
+import threading
+
+# Longest a phase may block without checking its token
+POLL_INTERVAL = 0.1
+
+
+class CancelToken:
+    """
+    timeout: seconds from now until the token expires on its own (None = no deadline)
+    parent:  another token; cancelling the parent also stops this one
+    event:   Event object to signal through, e.g. a multiprocessing.Event so that
+             worker processes can hold tokens that the parent cancels
+    """
+
+    def __init__(self, timeout=None, parent=None, event=None):
+        self._event = event if event is not None else threading.Event()
+        self.deadline = time.monotonic() + timeout if timeout is not None else None
+        self.parent = parent
+
+    def cancel(self):
+        """Asks every phase using this token to stop as soon as possible."""
+        self._event.set()
+
+    @property
+    def cancelled(self):
+        """True if cancel() was called (on this token or its parent)."""
+        return self._event.is_set() or (self.parent is not None and self.parent.cancelled)
+
+    @property
+    def expired(self):
+        """True if the deadline has passed."""
+        if self.deadline is not None and time.monotonic() >= self.deadline:
+            return True
+        return self.parent is not None and self.parent.expired
+
+    def stopped(self):
+        """True if the work should stop (cancelled or out of time)."""
+        return self.cancelled or self.expired
+
+    def remaining(self):
+        """Seconds until the deadline, or None if there is none."""
+        remaining = None
+        if self.deadline is not None:
+            remaining = max(self.deadline - time.monotonic(), 0)
+        if self.parent is not None:
+            parent_remaining = self.parent.remaining()
+            if parent_remaining is not None:
+                remaining = parent_remaining if remaining is None else min(remaining, parent_remaining)
+        return remaining
+
+    def clamp(self, seconds):
+        """Shortens a wait of `seconds` so it ends by the deadline."""
+        remaining = self.remaining()
+        return seconds if remaining is None else min(seconds, remaining)
+
+    def sleep(self, seconds):
+        """Sleeps up to `seconds`, waking early if stopped. Returns stopped()."""
+        deadline = time.monotonic() + self.clamp(seconds)
+        while not self.stopped():
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            self._event.wait(min(remaining, POLL_INTERVAL))
+        return self.stopped()
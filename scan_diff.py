@@ -0,0 +1,72 @@
+"""
+Scan Diff - What changed between two consecutive scans.
+
+Both scans are indexed once by device key (the integer MAC, or the IP when
+the MAC is unknown), so a diff is one pass over each list: O(n), no
+pairwise comparisons. The result lists
+
+    new             devices in the current scan only
+    departed        devices in the previous scan only
+    ip_changed      (device, old IP) for devices seen at a different address
+    vendor_changed  (device, old vendor) for devices whose vendor lookup changed
+
+so the database, the Neo4j writer and the GUI can act on the delta instead
+of the full device set.
+"""
+
+from device_record import DeviceRecord, UNKNOWN, mac_to_int
+
+
+def device_key(device):
+    """The MAC as an int (records keep it that way already), else ("ip", ip)."""
+    if isinstance(device, DeviceRecord):
+        mac = device.mac_int
+    else:
+        mac = mac_to_int(device.get("mac"))
+    return mac if mac is not None else ("ip", device.get("ip", UNKNOWN))
+
+
+class ScanDiff:
+    """The changes from one scan to the next; false when nothing changed."""
+
+    __slots__ = ("new", "departed", "ip_changed", "vendor_changed")
+
+    def __init__(self):
+        self.new = []
+        self.departed = []
+        self.ip_changed = []
+        self.vendor_changed = []
+
+    def __bool__(self):
+        return bool(self.new or self.departed or self.ip_changed or self.vendor_changed)
+
+    def summary(self):
+        """'2 new, 1 departed, 1 IP changed' (or 'no changes')."""
+        parts = [f"{len(items)} {label}" for items, label in (
+            (self.new, "new"), (self.departed, "departed"),
+            (self.ip_changed, "IP changed"), (self.vendor_changed, "vendor changed")) if items]
+        return ", ".join(parts) or "no changes"
+
+
+def diff_scans(previous, current):
+    """Compares two scans' device lists (records or dicts). Returns a ScanDiff."""
+    diff = ScanDiff()
+    before = {device_key(device): device for device in previous}
+    seen = set()
+
+    for device in current:
+        key = device_key(device)
+        seen.add(key)
+        old = before.get(key)
+        if old is None:
+            diff.new.append(device)
+            continue
+        ip, old_ip = device.get("ip", UNKNOWN), old.get("ip", UNKNOWN)
+        if ip != old_ip and ip != UNKNOWN:
+            diff.ip_changed.append((device, old_ip))
+        vendor, old_vendor = device.get("vendor", UNKNOWN), old.get("vendor", UNKNOWN)
+        if vendor != old_vendor and vendor != UNKNOWN:
+            diff.vendor_changed.append((device, old_vendor))
+
+    diff.departed = [device for key, device in before.items() if key not in seen]
+    return diff
@@ -0,0 +1,185 @@
+"""
+Scan Metrics - Per-phase timers and counters for each scan.
+
+Every scan gets a ScanMetrics record. The scan phases time themselves
+with `phase()` and bump counters with `count()`; probes are counted per
+host so retries show up (finish() reduces those counts to a histogram and
+the most probed hosts, so a /16 sweep does not keep 65k keys around).
+Finished records are kept in a MetricsHistory ring buffer so the last few
+scans can be compared when one slows down:
+
+    metrics = history.start("full")
+    with metrics.phase("arp"):
+        ...
+    metrics.count("arp_requests", 256)
+    metrics.finish()
+    history.recent(5)   # -> [summary dict, ...], newest last
+"""
+
+import time
+import heapq
+import threading
+from collections import Counter, deque
+from contextlib import contextmanager
+
+# Order phases are listed in; anything else follows alphabetically
+PHASE_ORDER = ["arp", "icmp", "arp_fallback", "vendor_lookup", "persistence", "gui_render"]
+
+
+class ScanMetrics:
+    """Timers and counters for one scan. Safe to update from several threads."""
+
+    def __init__(self, kind="full", on_finish=None):
+        self.kind = kind
+        self.on_finish = on_finish  # Called with this record once finished
+        self.started_at = time.time()
+        self._start = time.perf_counter()
+        self.duration = None
+        self.phases = {}          # {phase: seconds}
+        self.counters = Counter()
+        self.probes = Counter()   # {ip: probes sent}, until finish() reduces it
+        self.probes_per_host = Counter()  # {probes: hosts} reduced or merged so far
+        self.most_probed = []             # [(ip, probes)] reduced or merged so far, at most 5
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def phase(self, name):
+        """Times the enclosed block and adds it to `name` (phases may overlap)."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_time(name, time.perf_counter() - start)
+
+    def add_time(self, name, seconds):
+        with self._lock:
+            self.phases[name] = self.phases.get(name, 0.0) + seconds
+
+    def count(self, name, n=1):
+        with self._lock:
+            self.counters[name] += n
+
+    def probe(self, ips):
+        """Counts one probe sent to each address in `ips`."""
+        with self._lock:
+            self.probes.update(ips)
+
+    def merge(self, phases, counters, probe_stats=None):
+        """
+        Adds timings and counts recorded elsewhere (e.g. in a worker process).
+        probe_stats: that record's probe_stats(); the hosts it probed must not
+                     overlap the ones probed here
+        """
+        with self._lock:
+            for name, seconds in phases.items():
+                self.phases[name] = self.phases.get(name, 0.0) + seconds
+            self.counters.update(counters)
+            if probe_stats:
+                self.probes_per_host.update({int(k): v for k, v in probe_stats["probes_per_host"].items()})
+                self.most_probed = self._top(self.most_probed + [tuple(p) for p in probe_stats["most_probed"]])
+
+    @staticmethod
+    def _top(probed):
+        return heapq.nlargest(5, probed, key=lambda item: item[1])
+
+    def _reduce_probes(self):
+        """({probes: hosts}, [(ip, probes)] top 5) over everything recorded. Call with the lock held."""
+        per_host = self.probes_per_host + Counter(self.probes.values())
+        return per_host, self._top(self.most_probed + self.probes.most_common(5))
+
+    def probe_stats(self):
+        """The per-host probe counts reduced to what summary() reports (small, picklable)."""
+        with self._lock:
+            per_host, most_probed = self._reduce_probes()
+        return {"probes_per_host": dict(per_host), "most_probed": most_probed}
+
+    def finish(self):
+        """
+        Stops the scan clock (phases recorded later, e.g. rendering, are still added)
+        and reduces the per-host probe counts to their histogram and top 5.
+        """
+        if self.duration is None:
+            self.duration = time.perf_counter() - self._start
+            with self._lock:
+                self.probes_per_host, self.most_probed = self._reduce_probes()
+                self.probes = Counter()
+            if self.on_finish:
+                self.on_finish(self)
+
+    def summary(self):
+        """Plain dict of everything recorded."""
+        with self._lock:
+            per_host, most_probed = self._reduce_probes()
+            phases = dict(self.phases)
+            counters = dict(self.counters)
+        ordered = [p for p in PHASE_ORDER if p in phases] + sorted(p for p in phases if p not in PHASE_ORDER)
+        return {
+            "kind": self.kind,
+            "started_at": self.started_at,
+            "duration": self.duration if self.duration is not None else time.perf_counter() - self._start,
+            "phases": {p: phases[p] for p in ordered},
+            "counters": counters,
+            "hosts_probed": sum(per_host.values()),
+            "probes_per_host": dict(sorted(per_host.items())),  # {probes: hosts}
+            "most_probed": most_probed
+        }
+
+
+class MetricsHistory:
+    """
+    Ring buffer of the most recent scans' metrics. Full sweeps are also kept in
+    a ring of their own, so frequent liveness rounds do not push them out.
+    """
+
+    def __init__(self, maxlen=50, sweeps=10):
+        self._scans = deque(maxlen=maxlen)
+        self._sweeps = deque(maxlen=sweeps)  # Kind "full" only
+        self._lock = threading.Lock()
+        self.listeners = []  # Callables given each ScanMetrics as it finishes
+
+    def start(self, kind="full"):
+        """Creates the record for a new scan and keeps it in the buffer."""
+        metrics = ScanMetrics(kind, on_finish=self._finished)
+        with self._lock:
+            self._scans.append(metrics)
+            if kind == "full":
+                self._sweeps.append(metrics)
+        return metrics
+
+    def _finished(self, metrics):
+        for listener in list(self.listeners):
+            try:
+                listener(metrics)
+            except Exception as e:
+                print(f"[-] Scan metrics listener failed: {e}")
+
+    def last(self):
+        """The most recent scan's ScanMetrics, or None."""
+        with self._lock:
+            return self._scans[-1] if self._scans else None
+
+    def recent(self, n=None, kind=None):
+        """Summaries of the last `n` scans (all if None) of `kind` (any if None), oldest first."""
+        with self._lock:
+            scans = list(self._sweeps if kind == "full" else self._scans)
+        if kind is not None:
+            scans = [m for m in scans if m.kind == kind]
+        if n is not None:
+            scans = scans[-n:]
+        return [m.summary() for m in scans]
+
+
+def format_summary(summary):
+    """One-line description of a scan summary for the logs."""
+    parts = [f"{summary['kind']} {summary['duration']:.2f}s"]
+    parts += [f"{name} {seconds:.2f}s" for name, seconds in summary["phases"].items()]
+    counters = summary["counters"]
+    if summary["hosts_probed"]:
+        max_probes = max(summary["probes_per_host"])
+        parts.append(f"{sum(k * v for k, v in summary['probes_per_host'].items())} probes "
+                     f"to {summary['hosts_probed']} hosts (max {max_probes}/host)")
+    if counters.get("arp_retry_rounds"):
+        parts.append(f"{counters['arp_retry_rounds']} ARP retry rounds ({counters.get('arp_retry_requests', 0)} requests)")
+    if "devices" in counters:
+        parts.append(f"{counters['devices']} devices")
+    return " | ".join(parts)
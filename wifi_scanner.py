@@ -5,11 +5,26 @@ import socket
 import struct
 import threading
 import subprocess
-import requests
 import concurrent.futures
 import uuid
-import re
-from scapy.all import ARP, Ether, srp
+import ipaddress
+import itertools
+import queue
+import copy
+import io
+import contextlib
+import multiprocessing
+from icmp_sweep import IcmpSweeper, raw_icmp_available
+from oui_index import OuiIndex
+from neighbor_table import read_neighbor_table
+from arp_io import get_l2_socket
+from arp_timing import ArpTimeoutEstimator
+from scan_control import CancelToken, POLL_INTERVAL
+from scan_metrics import ScanMetrics, MetricsHistory
+from device_record import DeviceRecord
+from interfaces import list_interfaces, interface_for
+from ndp_discovery import NdpDiscovery, eui64_link_local
+from presence import PresenceTracker
 
 # Try to import ctypes for Windows admin check
 try:
@@ -18,15 +33,71 @@ except ImportError:
     ctypes = None
 
 class NetworkScanner:
-    def __init__(self, oui_file="oui.txt"):
-        self.oui_file = oui_file
-        self.vendors = {}
+    # Largest range scanned by default when the interface netmask is very wide (e.g. a /8)
+    MAX_DEFAULT_PREFIX = 16
+    # Addresses handed to the ping sweep at a time
+    PING_BATCH_SIZE = 4096
+    # Seconds of ping replies gathered per neighbor table read in pipelined mode
+    NEIGHBOR_BATCH_WINDOW = 0.05
+    # ARP retry rounds are skipped when more addresses than this stayed silent (e.g. a /16)
+    ARP_MAX_RETRY_TARGETS = 4096
+    # Each ARP retry round waits this much longer than the one before
+    ARP_RETRY_BACKOFF = 1.5
+    # Multi-interface sweeps: at this many addresses in total they move to worker
+    # processes, with segments wider than SEGMENT_PREFIX split into chunks of that size
+    PROCESS_POOL_MIN_ADDRESSES = 4096
+    SEGMENT_PREFIX = 22
+
+    def __init__(self, oui_file="oui.txt", icmp_timeout=0.5, icmp_rate=2000,
+                 arp_batch_size=256, arp_timeout=3, arp_batch_timeout=1.0, arp_rate=1000,
+                 mam_file="mam.txt", oui36_file="oui36.txt", pipelined=True, arp_retries=2,
+                 arp_timing_file="arp_timing.json", all_interfaces=True, max_processes=None,
+                 hostname_cache_file="hostnames.json", probe_ports=None, port_cache_file="port_probes.json",
+                 ipv6=True, ipv6_timeout=1.0, offline_after=2, setup=True):
+        """
+        setup: check privileges, detect our own address and load the vendor index now;
+               with False the caller fills those in (worker processes of a large sweep)
+        """
+        self.oui_file = oui_file        # IEEE MA-L registry (24-bit prefixes)
+        self.mam_file = mam_file        # IEEE MA-M registry (28-bit prefixes)
+        self.oui36_file = oui36_file    # IEEE MA-S registry (36-bit prefixes)
+        self.oui_index = None
         self.my_ip = None
         self.my_mac = None
+        self.my_netmask = None
+        self.icmp_timeout = icmp_timeout  # Seconds to wait for late echo replies
+        self.icmp_rate = icmp_rate        # Echo requests per second (0 = unlimited)
+        self.arp_batch_size = arp_batch_size        # ARP requests per batch
+        self.arp_timeout = arp_timeout              # Longest wait per round when the range fits in one batch
+        self.arp_batch_timeout = arp_batch_timeout  # Longest final wait for larger ranges
+        self.arp_retries = arp_retries              # Retry rounds for addresses that stayed silent
+        self.arp_timing = ArpTimeoutEstimator(arp_timing_file)  # Learned per-network reply timeouts
+        self.arp_rate = arp_rate                    # ARP requests per second (0 = unlimited)
+        self.pipelined = pipelined  # Run the ARP and ICMP phases concurrently
+        self.all_interfaces = all_interfaces  # Full sweeps cover every up interface, not just the default route's
+        self.max_processes = max_processes    # Worker processes for large sweeps (None = CPU count)
+        self.interfaces = []        # Interfaces the last multi-interface sweep covered
+        self.ipv6 = ipv6                  # Also discover IPv6 hosts (NDP) alongside every full sweep
+        self.ipv6_timeout = ipv6_timeout  # Seconds an IPv6 discovery round listens for answers
+        self._known_macs = set()          # MACs of the last sweep, solicited over IPv6 next time
+        self.passive = None         # PassiveDiscovery listener, once started
+        self.hostname_cache_file = hostname_cache_file
+        self.hostname_resolver = None  # HostnameResolver, created on first use
+        self._resolving = set()        # MACs a background enrichment is working on
+        self._resolving_lock = threading.Lock()
+        self.probe_port_set = probe_ports  # TCP ports the port probe tries (None = port_probe.DEFAULT_PORTS)
+        self.port_cache_file = port_cache_file
+        self.port_prober = None        # PortProber, created on first use
+        self._probing = set()          # MACs a background port probe is working on
+        self.metrics_history = MetricsHistory()  # Per-phase timings of recent scans
+        self.presence = PresenceTracker(offline_after)  # Online/suspect/offline per device, with join/leave events
+        self.presence_changes = 0  # Presence state changes in the last scheduled_scan() cycle
+        self.current_metrics = ScanMetrics("idle")  # Record the running scan reports into
         
-        self._check_admin()
-        self._detect_self()
-        self._load_oui()
+        if setup:
+            self._check_admin()
+            self._detect_self()
+            self._load_oui()
 
     def _check_admin(self):
         """
@@ -72,6 +143,8 @@ class NetworkScanner:
             self.my_ip = s.getsockname()[0]
             s.close()
             
+            self.my_netmask = self._get_netmask(self.my_ip)
+            
             # Get MAC
             # uuid.getnode() returns the MAC as a 48-bit integer
             mac_int = uuid.getnode()
@@ -82,107 +155,383 @@ class NetworkScanner:
         except Exception as e:
             print(f"[-] Error detecting self: {e}")
 
+    def _get_netmask(self, ip):
+        """
+        Returns the netmask of the interface that owns `ip`, or None if unknown.
+        """
+        try:
+            if os.name == 'nt':
+                # Windows: find the adapter block with our IPv4 address in ipconfig
+                output = subprocess.check_output(
+                    ["ipconfig"],
+                    creationflags=0x08000000,
+                    stderr=subprocess.DEVNULL
+                ).decode("utf-8", errors="ignore")
+                
+                found = False
+                for line in output.splitlines():
+                    if "IPv4" in line and line.strip().endswith(ip):
+                        found = True
+                    elif found and "Subnet Mask" in line:
+                        return line.split(":")[-1].strip()
+            else:
+                # Linux: ask the kernel for each interface's address and netmask
+                import fcntl
+                SIOCGIFADDR = 0x8915
+                SIOCGIFNETMASK = 0x891b
+                
+                s = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+                try:
+                    for _, ifname in socket.if_nameindex():
+                        ifreq = struct.pack("256s", ifname.encode()[:15])
+                        try:
+                            addr = fcntl.ioctl(s.fileno(), SIOCGIFADDR, ifreq)[20:24]
+                            if socket.inet_ntoa(addr) != ip:
+                                continue
+                            mask = fcntl.ioctl(s.fileno(), SIOCGIFNETMASK, ifreq)[20:24]
+                            return socket.inet_ntoa(mask)
+                        except OSError:
+                            continue
+                finally:
+                    s.close()
+        except Exception:
+            pass
+        return None
+
+    def _download_file(self, path, urls, label):
+        """
+        Downloads `path` from the first URL that works. Returns True on success.
+        """
+        print(f"[*] {label} file not found. Downloading...")
+        import requests  # Only needed for the first download; slow to import
+        headers = {
+            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+        }
+        
+        for url in urls:
+            try:
+                print(f"[*] Trying to download from {url}...")
+                response = requests.get(url, headers=headers, timeout=15)
+                if response.status_code == 200:
+                    with open(path, "wb") as f:
+                        f.write(response.content)
+                    print("[+] Download complete.")
+                    return True
+                else:
+                    print(f"[-] Failed to download from {url}. Status: {response.status_code}")
+            except Exception as e:
+                print(f"[-] Error downloading from {url}: {e}")
+        return False
+
     def _load_oui(self):
         """
-        Loads OUI data from local file or downloads it if missing.
+        Loads the IEEE MA-L/MA-M/MA-S registries from local files, downloading any that are missing.
+        The text files are compiled into a memory-mapped index (rebuilt when a file changes).
         """
-        if not os.path.exists(self.oui_file):
-            print("[*] OUI file not found. Downloading...")
-            headers = {
-                'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-            }
-            urls = [
+        registries = [
+            (self.oui_file, "OUI", [
                 "https://linuxnet.ca/ieee/oui.txt",
                 "http://standards-oui.ieee.org/oui/oui.txt"
-            ]
-            
-            downloaded = False
-            for url in urls:
-                try:
-                    print(f"[*] Trying to download from {url}...")
-                    response = requests.get(url, headers=headers, timeout=15)
-                    if response.status_code == 200:
-                        with open(self.oui_file, "wb") as f:
-                            f.write(response.content)
-                        print("[+] Download complete.")
-                        downloaded = True
-                        break
-                    else:
-                        print(f"[-] Failed to download from {url}. Status: {response.status_code}")
-                except Exception as e:
-                    print(f"[-] Error downloading from {url}: {e}")
-            
-            if not downloaded:
-                print("[-] Could not download OUI file. Vendor lookup will be limited.")
+            ]),
+            (self.mam_file, "MA-M", ["https://standards-oui.ieee.org/oui28/mam.txt"]),
+            (self.oui36_file, "MA-S", ["https://standards-oui.ieee.org/oui36/oui36.txt"]),
+        ]
+        
+        for path, label, urls in registries:
+            if not os.path.exists(path) and not self._download_file(path, urls, label):
+                print(f"[-] Could not download {label} file. Vendor lookup will be limited.")
 
-        if os.path.exists(self.oui_file):
-            print("[*] Parsing OUI file...")
+        source_files = [path for path, _, _ in registries]
+        if any(os.path.exists(path) for path in source_files):
+            print("[*] Loading OUI index...")
             try:
-                with open(self.oui_file, "r", encoding="utf-8", errors="ignore") as f:
-                    for line in f:
-                        if "(hex)" in line:
-                            parts = line.split("(hex)")
-                            mac_prefix = parts[0].strip().replace("-", ":")
-                            vendor = parts[1].strip()
-                            self.vendors[mac_prefix] = vendor
-                print(f"[+] Loaded {len(self.vendors)} vendor entries.")
+                self.oui_index = OuiIndex.open(source_files)
+                print(f"[+] Loaded {len(self.oui_index)} vendor entries.")
             except Exception as e:
-                print(f"[-] Error parsing OUI file: {e}")
+                print(f"[-] Error loading OUI index: {e}")
 
     def _get_vendor(self, mac):
         """
-        Looks up vendor by MAC address.
+        Looks up vendor by MAC address (longest-prefix match over MA-S, MA-M and MA-L).
+        """
+        return self.resolve_vendors([mac])[0]
+
+    def resolve_vendors(self, macs):
+        """
+        Looks up the vendors for a list of MAC addresses in a single pass.
+        Returns a list of vendor names in the same order as `macs`.
         """
-        if not mac or mac == "Unknown":
-            return "Unknown"
+        start = time.perf_counter()
+        my_mac = self.my_mac.upper() if self.my_mac else None
+        known = self.oui_index.resolve(macs) if self.oui_index else [None] * len(macs)
         
-        # Check if it's me
-        if self.my_mac and mac.upper() == self.my_mac.upper():
-            return "THIS COMPUTER"
-            
-        prefix = mac[:8].upper()
-        return self.vendors.get(prefix, "Unknown")
+        vendors = []
+        for mac, vendor in zip(macs, known):
+            if not mac or mac == "Unknown":
+                vendors.append("Unknown")
+            elif my_mac and mac.upper() == my_mac:
+                # Check if it's me
+                vendors.append("THIS COMPUTER")
+            else:
+                vendors.append(vendor or "Unknown")
+        
+        hits = sum(1 for vendor in known if vendor)
+        self.current_metrics.add_time("vendor_lookup", time.perf_counter() - start)
+        self.current_metrics.count("vendor_lookups", len(macs))
+        self.current_metrics.count("oui_hits", hits)
+        self.current_metrics.count("oui_misses", len(macs) - hits)
+        return vendors
 
     def _get_local_ip_range(self):
         """
-        Auto-detects the local IP range (e.g., 192.168.1.0/24).
+        Auto-detects the local IP range from the interface netmask (e.g., 192.168.0.0/22).
+        Falls back to a /24 around our IP if the netmask is unknown.
         """
         if self.my_ip:
-            ip_parts = self.my_ip.split(".")
-            base_ip = f"{ip_parts[0]}.{ip_parts[1]}.{ip_parts[2]}.0/24"
-            return base_ip
+            return str(self._sweep_network(self.my_ip, self.my_netmask))
         return "192.168.1.0/24"
 
-    def _arp_scan(self, target_ip_range):
+    def _sweep_network(self, ip, netmask):
+        """The subnet of `ip`, limited to /MAX_DEFAULT_PREFIX around it."""
+        network = ipaddress.ip_interface(f"{ip}/{netmask or '255.255.255.0'}").network
+        if network.prefixlen < self.MAX_DEFAULT_PREFIX:
+            print(f"[!] {network} is too large to sweep by default, limiting to /{self.MAX_DEFAULT_PREFIX}.")
+            network = ipaddress.ip_interface(f"{ip}/{self.MAX_DEFAULT_PREFIX}").network
+        return network
+
+    def _parse_targets(self, targets):
+        """
+        Normalizes a CIDR string or a list of CIDR strings into a list of IPv4Networks.
+        """
+        if targets is None:
+            targets = self._get_local_ip_range()
+        if isinstance(targets, (str, ipaddress.IPv4Network)):
+            targets = [targets]
+        
+        # Drop ranges already covered by a wider one so no host is probed twice.
+        # (Not collapse_addresses(): merging single hosts into a block would
+        # drop that block's network/broadcast addresses from hosts().)
+        parsed = {ipaddress.ip_network(target, strict=False) for target in targets}
+        networks = []
+        for network in sorted(parsed, key=lambda n: (n.prefixlen, n)):
+            if not any(network.subnet_of(wider) for wider in networks):
+                networks.append(network)
+        return networks
+
+    def _iter_host_batches(self, target_ip_range, batch_size):
+        """
+        Yields lists of host addresses (as strings) from the target range(s), `batch_size` at a time.
+        Addresses are generated lazily, so even a /16 never sits in memory all at once.
+        """
+        hosts = (str(ip) for network in self._parse_targets(target_ip_range) for ip in network.hosts())
+        while True:
+            batch = list(itertools.islice(hosts, batch_size))
+            if not batch:
+                return
+            yield batch
+
+    def _timing_key(self):
+        """Network the ARP timing estimate is learned for (our own subnet)."""
+        try:
+            return self._get_local_ip_range()
+        except Exception:
+            return "default"
+
+    def _arp_exchange(self, batches, build, accept, max_wait, on_device=None, cancel=None):
+        """
+        ARP engine shared by scans and liveness probes.
+
+        Sends `build(ips)` frames for each batch of IPs over the shared layer-2 socket.
+        A round ends once replies stop arriving for the learned per-network timeout
+        (at most `max_wait`); addresses that stayed silent are then retried up to
+        `arp_retries` times with exponentially growing waits, the last one never
+        shorter than the estimator's default timeout so slow hosts can still answer.
+        `accept(ip)` decides which replies belong to this exchange; `on_device(record)`
+        is called as each new responder arrives. A stopped `cancel` token ends it early.
+        Returns the responders as device records.
+        """
+        l2 = get_l2_socket(self.my_ip)
+        if l2 is None:
+            raise OSError("layer-2 socket unavailable")
+        
+        metrics = self.current_metrics
+        start = time.perf_counter()
+        network = self._timing_key()
+        idle = self.arp_timing.timeout_for(network)
+        replies = {}
+        rtts = []
+        late_rtts = []  # Replies that only came in a retry round: the idle timeout was too short
+        
+        def accept_new(ip):
+            return ip not in replies and accept(ip)
+        
+        def handle_reply(ip, mac, rtt):
+            replies[ip] = mac
+            (late_rtts if retrying else rtts).append(rtt)
+            if on_device:
+                on_device(DeviceRecord(ip, mac, self._get_vendor(mac)))
+        
+        sent = []
+        def first_round():
+            for ips in batches:
+                sent.extend(ips)
+                metrics.probe(ips)
+                metrics.count("arp_requests", len(ips))
+                yield build(ips)
+        
+        retrying = False
+        l2.exchange(first_round(), accept_new, max_wait, rate=self.arp_rate,
+                    on_reply=handle_reply, idle=idle, cancel=cancel)
+        retrying = True
+        
+        # Targeted retries: only the addresses that stayed silent, backing off each round
+        silent = [ip for ip in sent if ip not in replies]
+        for attempt in range(1, self.arp_retries + 1):
+            if not silent or len(silent) > self.ARP_MAX_RETRY_TARGETS or (cancel and cancel.stopped()):
+                break
+            wait = min(idle * (self.ARP_RETRY_BACKOFF ** attempt), self.arp_timeout)
+            if attempt == self.arp_retries:
+                # A learned timeout that got too short must not lose slow hosts for good
+                wait = max(wait, self.arp_timing.default_timeout)
+            metrics.probe(silent)
+            metrics.count("arp_retry_rounds")
+            metrics.count("arp_retry_requests", len(silent))
+            l2.exchange([build(silent)], accept_new, wait, rate=self.arp_rate,
+                        on_reply=handle_reply, idle=wait, flush=False, cancel=cancel)
+            found = len(silent)
+            silent = [ip for ip in silent if ip not in replies]
+            if len(silent) < found:
+                print(f"[*] ARP retry {attempt}: {found - len(silent)} more device(s) answered.")
+        
+        self.arp_timing.observe(network, rtts, late_rtts)
+        self.arp_timing.save()
+        metrics.count("arp_replies", len(replies))
+        metrics.add_time("arp", time.perf_counter() - start)
+        
+        # Classify all responders in one pass
+        vendors = self.resolve_vendors(list(replies.values()))
+        return [
+            DeviceRecord(ip, mac, vendor)
+            for (ip, mac), vendor in zip(replies.items(), vendors)
+        ]
+
+    def _arp_scan(self, target_ip_range, on_device=None, cancel=None):
         """
-        Step 1: Send ARP requests to the local subnet using Scapy.
+        Step 1: Send broadcast ARP requests to the target range(s).
+        Large ranges are split into paced batches of `arp_batch_size` requests.
+        Replies are collected as they arrive, and `on_device(record)` is called for each one.
         """
         print(f"[*] Starting ARP scan on {target_ip_range}...")
         devices = []
+        
         try:
-            # Create ARP request packet
-            arp = ARP(pdst=target_ip_range)
-            ether = Ether(dst="ff:ff:ff:ff:ff:ff")
-            packet = ether/arp
-
-            # Send packet and wait for response
-            result = srp(packet, timeout=3, verbose=0)[0]
-
-            for sent, received in result:
-                devices.append({
-                    "ip": received.psrc,
-                    "mac": received.hwsrc.upper(),
-                    "vendor": self._get_vendor(received.hwsrc)
-                })
+            networks = self._parse_targets(target_ip_range)
+            single_batch = sum(n.num_addresses for n in networks) <= self.arp_batch_size
+            max_wait = self.arp_timeout if single_batch else self.arp_batch_timeout
+            
+            def in_range(ip):
+                try:
+                    return any(ipaddress.IPv4Address(ip) in network for network in networks)
+                except ValueError:
+                    return False
+            
+            l2 = get_l2_socket(self.my_ip)
+            if l2 is None:
+                raise OSError("layer-2 socket unavailable")
+            batches = self._iter_host_batches(networks, self.arp_batch_size)
+            devices = self._arp_exchange(batches, l2.builder.requests, in_range, max_wait, on_device, cancel)
         except Exception as e:
             print(f"[-] ARP scan failed: {e}")
         
         return devices
 
-    def _ping_host(self, ip):
+    def probe_hosts(self, hosts, timeout=1.0, on_device=None, cancel=None):
+        """
+        Liveness check for known hosts: one unicast ARP request to each
+        ({"ip", "mac"} records; hosts without a known MAC are asked by broadcast).
+        Silent hosts are retried like any other ARP round.
+        Returns the hosts that answered, as device records.
+        """
+        if not hosts:
+            return []
+        
+        metrics = self.current_metrics = self.metrics_history.start("liveness")
+        
+        # Hosts found by a multi-interface sweep are asked on the interface they were found on
+        sources = {iface["subnet"]: iface for iface in self.interfaces}
+        groups = {}
+        for host in hosts:
+            if ":" in host["ip"]:
+                groups.setdefault("ipv6", []).append(host)  # IPv6-only hosts get a Neighbor Solicitation
+            else:
+                groups.setdefault(host.get("subnet") if host.get("subnet") in sources else None, []).append(host)
+        
+        def probe(subnet, group):
+            scanner = self._for_interface(sources[subnet]) if subnet not in (None, "ipv6") else self
+            try:
+                if subnet == "ipv6":
+                    return self._probe_ipv6_group(group, timeout, on_device, cancel)
+                return scanner._probe_group(group, timeout, on_device, cancel)
+            except Exception as e:
+                print(f"[-] Liveness probe failed: {e}")
+                return []
+        
+        if len(groups) == 1:
+            responded = probe(*next(iter(groups.items())))
+        else:
+            with concurrent.futures.ThreadPoolExecutor(max_workers=len(groups)) as executor:
+                futures = [executor.submit(probe, subnet, group) for subnet, group in groups.items()]
+                responded = [device for future in futures for device in future.result()]
+        
+        metrics.count("devices", len(responded))
+        metrics.finish()
+        return responded
+
+    def _probe_ipv6_group(self, hosts, timeout, on_device, cancel):
+        """Liveness round for IPv6-only hosts: one Neighbor Solicitation each."""
+        found = self.discover_ipv6(candidates=[host["ip"] for host in hosts], ping=False,
+                                   timeout=timeout, cancel=cancel)
+        responded = []
+        for host in hosts:
+            if host["ip"] in found:
+                device = DeviceRecord(host["ip"], found[host["ip"]], host.get("vendor", "Unknown"), ipv6=[host["ip"]])
+                responded.append(device)
+                if on_device:
+                    on_device(device)
+        return responded
+
+    def _probe_group(self, hosts, timeout, on_device, cancel):
+        """Unicast ARP liveness round for `hosts` on this scanner's interface."""
+        l2 = get_l2_socket(self.my_ip)
+        if l2 is None:
+            raise OSError("layer-2 socket unavailable")
+        known_macs = {}
+        tags = {}
+        for host in hosts:
+            mac = host.get("mac", "Unknown")
+            known_macs[host["ip"]] = mac if mac != "Unknown" else None
+            if host.get("subnet"):
+                tags[host["ip"]] = {"interface": host.get("interface"), "subnet": host["subnet"]}
+        
+        def build(ips):
+            return [l2.builder.request(ip, known_macs[ip]) for ip in ips]
+        
+        def tagged(device):
+            device.update(tags.get(device["ip"], {}))
+            return device
+        
+        callback = (lambda device: on_device(tagged(device))) if on_device else None
+        responded = self._arp_exchange([list(known_macs)], build, known_macs.__contains__, timeout,
+                                       callback, cancel)
+        return [tagged(device) for device in responded]
+
+    def _ping_host(self, ip, cancel=None):
         """
-        Pings a single host.
+        Pings a single host with the system `ping` command.
+        Only used as a fallback when raw ICMP sockets are unavailable.
         """
+        if cancel and cancel.stopped():
+            return None
         try:
             if os.name == 'nt':
                 command = ["ping", "-n", "1", "-w", "200", ip]
@@ -204,113 +553,750 @@ class NetworkScanner:
             pass
         return None
 
-    def _ping_sweep(self, target_ip_range):
+    def _ping_sweep(self, target_ip_range, on_reply=None, cancel=None):
         """
-        Step 2: Run a multi-threaded ICMP Ping Sweep.
+        Step 2: Run an ICMP Ping Sweep.
+        Uses the raw-socket sweeper when possible, otherwise a pool of `ping` processes.
+        `on_reply(ip)` is called as soon as each host answers.
+        A stopped `cancel` token ends the sweep early with the hosts found so far.
         """
         print("[*] Starting Ping Sweep...")
         active_ips = []
+        metrics = self.current_metrics
+        start = time.perf_counter()
         
         try:
-            base_ip = target_ip_range.split("/")[0]
-            subnet_parts = base_ip.split(".")
-            prefix = f"{subnet_parts[0]}.{subnet_parts[1]}.{subnet_parts[2]}"
-            
-            # Generate IPs .1 to .254
-            ips_to_scan = [f"{prefix}.{i}" for i in range(1, 255)]
-            
-            with concurrent.futures.ThreadPoolExecutor(max_workers=50) as executor:
-                results = executor.map(self._ping_host, ips_to_scan)
-                
-            for ip in results:
-                if ip:
-                    active_ips.append(ip)
+            if raw_icmp_available():
+                sweeper = IcmpSweeper(timeout=self.icmp_timeout, rate=self.icmp_rate,
+                                      source_ip=self.my_ip if os.name == 'nt' else None)
+                for ips_to_scan in self._iter_host_batches(target_ip_range, self.PING_BATCH_SIZE):
+                    if cancel and cancel.stopped():
+                        break
+                    metrics.probe(ips_to_scan)
+                    metrics.count("icmp_requests", len(ips_to_scan))
+                    active_ips.extend(sweeper.sweep(ips_to_scan, on_reply, cancel))
+            else:
+                # Fallback: one `ping` process per host
+                with concurrent.futures.ThreadPoolExecutor(max_workers=50) as executor:
+                    for ips_to_scan in self._iter_host_batches(target_ip_range, self.PING_BATCH_SIZE):
+                        if cancel and cancel.stopped():
+                            break
+                        metrics.probe(ips_to_scan)
+                        metrics.count("icmp_requests", len(ips_to_scan))
+                        futures = [executor.submit(self._ping_host, ip, cancel) for ip in ips_to_scan]
+                        try:
+                            for future in concurrent.futures.as_completed(futures, timeout=cancel.remaining() if cancel else None):
+                                if future.result() and on_reply:
+                                    on_reply(future.result())
+                                if cancel and cancel.stopped():
+                                    break
+                        except concurrent.futures.TimeoutError:
+                            pass
+                        for future in futures:
+                            # Drop the pings that have not started yet
+                            future.cancel()
+                        for future in futures:
+                            if future.done() and not future.cancelled() and future.result():
+                                active_ips.append(future.result())
                     
         except Exception as e:
             print(f"[-] Ping sweep failed: {e}")
-            
+        
+        metrics.count("icmp_replies", len(active_ips))
+        metrics.add_time("icmp", time.perf_counter() - start)
         return active_ips
 
-    def _get_mac_from_system(self, ip):
+    def _get_mac_from_system(self, ip, neighbors=None):
         """
         Step 2 (Fallback): Get MAC from system ARP cache.
+        `neighbors` is a snapshot from read_neighbor_table(); one is read if not given.
         """
-        try:
-            if os.name == 'nt':
-                # Windows: Parse arp -a <ip>
-                command = ["arp", "-a", ip]
-                creation_flags = 0x08000000
-                output = subprocess.check_output(
-                    command, 
-                    creationflags=creation_flags,
-                    stderr=subprocess.DEVNULL
-                ).decode("utf-8", errors="ignore")
-                
-                for line in output.splitlines():
-                    if ip in line:
-                        # Look for MAC
-                        parts = line.split()
-                        for part in parts:
-                            if "-" in part and len(part) == 17:
-                                return part.replace("-", ":").upper()
-            else:
-                # Linux: Read /proc/net/arp
-                with open("/proc/net/arp", "r") as f:
-                    # Skip header
-                    next(f) 
-                    for line in f:
-                        parts = line.split()
-                        # Format: IP address       HW type     Flags       HW address            Mask     Device
-                        #         192.168.1.1      0x1         0x2         00:50:56:c0:00:08     *        ens33
-                        if len(parts) >= 4 and parts[0] == ip:
-                            mac = parts[3]
-                            if mac != "00:00:00:00:00:00":
-                                return mac.upper()
-                                
-        except Exception:
-            pass
-        return None
+        if neighbors is None:
+            neighbors = self._read_neighbors()
+        return neighbors.get(ip)
+
+    def _read_neighbors(self):
+        """Reads the system neighbor table, timed as the ARP fallback phase."""
+        start = time.perf_counter()
+        neighbors = read_neighbor_table()
+        self.current_metrics.add_time("arp_fallback", time.perf_counter() - start)
+        self.current_metrics.count("neighbor_table_reads")
+        return neighbors
 
-    def scan(self):
+    def _make_emitter(self, on_device):
         """
-        Main scanning method.
+        Wraps an `on_device` callback so it is called from one thread at a time and
+        only once per IP (per subnet), unless a later record improves it (e.g. a MAC for
+        an ICMP-only host).
         """
-        target_ip_range = self._get_local_ip_range()
-        print(f"[*] Target Range: {target_ip_range}")
+        if not on_device:
+            return None
         
-        # Step 1: ARP Scan (Scapy)
-        arp_devices = self._arp_scan(target_ip_range)
-        arp_ips = {d["ip"] for d in arp_devices}
+        lock = threading.Lock()
+        emitted = {}  # {(subnet, ip): mac}
         
-        # Step 2: Ping Sweep
-        ping_ips = self._ping_sweep(target_ip_range)
+        def emit(device):
+            key = (device.get("subnet"), device["ip"])
+            with lock:
+                previous = emitted.get(key)
+                if previous is not None and (previous == device["mac"] or device["mac"] == "Unknown"):
+                    return
+                emitted[key] = device["mac"]
+                on_device(device)
         
+        return emit
+
+    def _icmp_only_device(self, ip, mac):
+        """
+        Builds the record for a host that answered the ping sweep but not ARP.
+        """
+        # If still unknown, check if it's me (Ping sweep finds me)
+        if not mac and ip == self.my_ip:
+            mac = self.my_mac
+        
+        return DeviceRecord(ip, mac or "Unknown", "Unknown (ICMP Response)")
+
+    def _merge_results(self, arp_devices, ping_ips, system_macs=None, on_device=None):
+        """
+        Step 3: Adds hosts that answered the ping sweep but not ARP, using the system ARP cache.
+        `system_macs` holds MACs already looked up for those IPs (pipelined mode).
+        """
+        arp_ips = {d["ip"] for d in arp_devices}
         final_results = arp_devices
+        icmp_only = []
+        neighbors = None
         
         for ip in ping_ips:
             if ip not in arp_ips:
                 # Device found via Ping but blocked Scapy ARP
-                # Step 3: System ARP Fallback
-                mac = self._get_mac_from_system(ip)
-                
-                # If still unknown, check if it's me (Ping sweep finds me)
-                if not mac and ip == self.my_ip:
-                    mac = self.my_mac
-                
-                vendor = "Unknown (ICMP Response)"
-                if mac:
-                    vendor = self._get_vendor(mac)
+                # System ARP Fallback
+                if system_macs is not None and ip in system_macs:
+                    mac = system_macs[ip]
                 else:
-                    mac = "Unknown"
-                
-                final_results.append({
-                    "ip": ip,
-                    "mac": mac,
-                    "vendor": vendor
-                })
+                    # One snapshot of the neighbor table serves every host
+                    if neighbors is None:
+                        neighbors = self._read_neighbors()
+                    mac = self._get_mac_from_system(ip, neighbors)
                 
+                icmp_only.append(self._icmp_only_device(ip, mac))
+        
+        # Classify the ICMP-only hosts with a known MAC in one pass
+        with_mac = [d for d in icmp_only if d["mac"] != "Unknown"]
+        for device, vendor in zip(with_mac, self.resolve_vendors([d["mac"] for d in with_mac])):
+            device["vendor"] = vendor
+        
+        if on_device:
+            for device in icmp_only:
+                on_device(device.copy())
+        
+        final_results.extend(icmp_only)
         return final_results
 
+    def _scan_pipelined(self, target_ip_range, on_device=None, cancel=None):
+        """
+        Runs the ARP scan and the ping sweep at the same time. Ping replies are
+        handed straight to a worker that looks their MACs up in the system ARP cache,
+        so the fallback is finished by the time both sweeps are.
+        """
+        replies = queue.Queue()
+        system_macs = {}
+        
+        def resolve_replies():
+            finished = False
+            while not finished:
+                # Gather the replies that arrive within a short window, then
+                # resolve them all from a single neighbor table snapshot
+                batch = [replies.get()]
+                deadline = time.monotonic() + self.NEIGHBOR_BATCH_WINDOW
+                while batch[-1] is not None:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    try:
+                        batch.append(replies.get(timeout=remaining))
+                    except queue.Empty:
+                        break
+                
+                if batch[-1] is None:
+                    finished = True
+                    batch.pop()
+                if not batch:
+                    continue
+                
+                neighbors = self._read_neighbors()
+                for ip in batch:
+                    system_macs[ip] = self._get_mac_from_system(ip, neighbors)
+                    if on_device:
+                        device = self._icmp_only_device(ip, system_macs[ip])
+                        if device["mac"] != "Unknown":
+                            device["vendor"] = self._get_vendor(device["mac"])
+                        on_device(device)
+        
+        with concurrent.futures.ThreadPoolExecutor(max_workers=3) as executor:
+            fallback = executor.submit(resolve_replies)
+            arp_future = executor.submit(self._arp_scan, target_ip_range, on_device, cancel)
+            ping_future = executor.submit(self._ping_sweep, target_ip_range, replies.put, cancel)
+            
+            try:
+                ping_ips = ping_future.result()
+            finally:
+                replies.put(None)
+            arp_devices = arp_future.result()
+            fallback.result()
+        
+        return self._merge_results(arp_devices, ping_ips, system_macs)
+
+    def scan(self, targets=None, on_device=None, cancel=None, timeout=None):
+        """
+        Main scanning method.
+        `targets` may be a CIDR string or a list of CIDR strings; defaults to the local subnet.
+        `on_device(record)` is called for each device as soon as it is discovered; a later
+        call for the same IP supersedes the earlier one. The complete list is returned at the end.
+        `cancel` (a CancelToken) and `timeout` (seconds) stop the scan early; every phase
+        then returns what it has found so far.
+        """
+        if timeout is not None:
+            cancel = CancelToken(timeout, parent=cancel)
+        metrics = self.current_metrics = self.metrics_history.start("full")
+        target_ip_range = self._parse_targets(targets)
+        print(f"[*] Target Range: {', '.join(str(n) for n in target_ip_range)}")
+        emit = self._make_emitter(on_device)
+        ipv6 = self._start_ipv6_discovery(cancel) if targets is None else None
+        results = self._scan_networks(target_ip_range, emit, cancel)
+        return self._finish_scan(results, metrics, cancel, ipv6, emit)
+
+    def _scan_networks(self, target_ip_range, emit=None, cancel=None):
+        """ARP scan, ping sweep and neighbor fallback over parsed target networks."""
+        if self.pipelined:
+            return self._scan_pipelined(target_ip_range, emit, cancel)
+        
+        # Step 1: ARP Scan
+        arp_devices = self._arp_scan(target_ip_range, emit, cancel)
+        
+        # Step 2: Ping Sweep
+        ping_ips = self._ping_sweep(target_ip_range, cancel=cancel)
+        
+        # Step 3: System ARP Fallback for ping-only hosts
+        return self._merge_results(arp_devices, ping_ips, on_device=emit)
+
+    def _finish_scan(self, results, metrics, cancel, ipv6=None, emit=None):
+        if ipv6 is not None:
+            # Ran alongside the IPv4 sweep, which takes longer than its single round
+            self._merge_ipv6(results, ipv6.result(), emit)
+        
+        if cancel and cancel.stopped():
+            reason = "cancelled" if cancel.cancelled else "out of time"
+            print(f"[!] Scan {reason}: returning {len(results)} device(s) found so far.")
+        
+        # Actively found devices count as sightings for passive discovery
+        if self.passive:
+            for device in results:
+                if "." in device["ip"]:
+                    self.passive.record(device["ip"], device["mac"], "scan")
+        self._known_macs = {device["mac"] for device in results if device["mac"] != "Unknown"}
+        
+        metrics.count("devices", len(results))
+        metrics.finish()
+        return results
+
+    # --- Multi-interface sweeps ---
+
+    def scan_interfaces_list(self):
+        """
+        The interfaces a full sweep covers, with the subnet swept on each ("subnet").
+        Every up interface and subnet when `all_interfaces` is set and they can be
+        listed; otherwise just the interface of the default route.
+        """
+        found = list_interfaces() if self.all_interfaces else []
+        if not found and self.my_ip:
+            owner = interface_for(self.my_ip)
+            netmask = self.my_netmask or "255.255.255.0"
+            found = [{"name": owner[0] if owner else "default", "ip": self.my_ip, "mac": self.my_mac,
+                      "netmask": netmask, "network": ipaddress.ip_interface(f"{self.my_ip}/{netmask}").network}]
+        for iface in found:
+            iface["subnet"] = str(self._sweep_network(iface["ip"], iface["netmask"]))
+        return found
+
+    def _for_interface(self, iface):
+        """A shallow copy of this scanner that works from `iface` (shares caches, timing and metrics)."""
+        scanner = copy.copy(self)
+        scanner.my_ip = iface["ip"]
+        scanner.my_mac = iface["mac"]
+        scanner.my_netmask = iface["netmask"]
+        return scanner
+
+    def _segment_jobs(self, interfaces):
+        """
+        Splits the interfaces' subnets into worker-process jobs of at most /SEGMENT_PREFIX.
+        Returns [(iface, [target CIDRs])]. The chunk boundary addresses (which a chunk's
+        hosts() would skip but are real hosts of the whole subnet) go into one extra job.
+        """
+        jobs = []
+        for iface in interfaces:
+            network = ipaddress.ip_network(iface["subnet"])
+            if network.prefixlen >= self.SEGMENT_PREFIX:
+                jobs.append((iface, [str(network)]))
+                continue
+            edges = []
+            for chunk in network.subnets(new_prefix=self.SEGMENT_PREFIX):
+                jobs.append((iface, [str(chunk)]))
+                edges += [chunk.network_address, chunk.broadcast_address]
+            edges = [f"{ip}/32" for ip in edges if ip not in (network.network_address, network.broadcast_address)]
+            if edges:
+                jobs.append((iface, edges))
+        return jobs
+
+    def scan_all_interfaces(self, on_device=None, cancel=None, timeout=None):
+        """
+        Full sweep of every subnet on every up interface, in parallel.
+        Small sweeps run in threads (one per interface/subnet); from
+        PROCESS_POOL_MIN_ADDRESSES addresses on, segments are spread across worker
+        processes so packet building and parsing are not bound to one interpreter.
+        Devices are tagged with the "interface" and "subnet" they were found on.
+        Takes and returns the same things as scan().
+        """
+        if timeout is not None:
+            cancel = CancelToken(timeout, parent=cancel)
+        interfaces = self.scan_interfaces_list()
+        if not interfaces:
+            return self.scan(on_device=on_device, cancel=cancel)
+        self.interfaces = interfaces
+        
+        metrics = self.current_metrics = self.metrics_history.start("full")
+        print(f"[*] Target Range: {', '.join(i['subnet'] + ' (' + i['name'] + ')' for i in interfaces)}")
+        emit = self._make_emitter(on_device)
+        ipv6 = self._start_ipv6_discovery(cancel)
+        total = sum(ipaddress.ip_network(i["subnet"]).num_addresses for i in interfaces)
+        
+        if total >= self.PROCESS_POOL_MIN_ADDRESSES:
+            results = self._scan_on_process_pool(interfaces, emit, cancel)
+        else:
+            results = self._scan_on_threads(interfaces, emit, cancel)
+        
+        # One table: a device answering twice on the same segment is listed once
+        merged = {}
+        for device in results:
+            key = (device["subnet"], device["ip"])
+            if key not in merged or merged[key]["mac"] == "Unknown":
+                merged[key] = device
+        return self._finish_scan(list(merged.values()), metrics, cancel, ipv6, emit)
+
+    # --- IPv6 ---
+
+    def discover_ipv6(self, candidates=None, ping=True, timeout=None, cancel=None):
+        """
+        One NDP round (echo to ff02::1 and Neighbor Solicitations) on the scanned interfaces.
+        `candidates` defaults to the kernel's IPv6 neighbors plus the EUI-64 link-local
+        addresses of the MACs seen so far. Returns {ipv6 address: MAC}.
+        """
+        metrics = self.current_metrics
+        start = time.perf_counter()
+        sources = {(i["name"], i["mac"]) for i in self.interfaces}
+        if not sources and self.my_ip and self.my_mac:
+            owner = interface_for(self.my_ip)
+            if owner:
+                sources = {(owner[0], self.my_mac)}
+        
+        if candidates is None:
+            candidates = set(read_neighbor_table(socket.AF_INET6))
+            macs = set(self._known_macs)
+            if self.passive:
+                macs.update(device["mac"] for device in self.passive.devices())
+            candidates.update(eui64_link_local(mac) for mac in macs)
+        
+        found = NdpDiscovery(sorted(sources)).discover(candidates, ping, timeout or self.ipv6_timeout, cancel)
+        metrics.add_time("ipv6", time.perf_counter() - start)
+        metrics.count("ipv6_replies", len(found))
+        return found
+
+    def _start_ipv6_discovery(self, cancel=None):
+        """Runs discover_ipv6() in a background thread; returns a Future of its result (None if disabled)."""
+        if not self.ipv6:
+            return None
+        future = concurrent.futures.Future()
+        
+        def run():
+            try:
+                future.set_result(self.discover_ipv6(cancel=cancel))
+            except Exception as e:
+                print(f"[-] IPv6 discovery failed: {e}")
+                future.set_result({})
+        
+        threading.Thread(target=run, daemon=True).start()
+        return future
+
+    def _merge_ipv6(self, results, found, emit=None):
+        """
+        Adds IPv6 hosts to `results`, keyed by MAC: addresses of a device already found
+        over IPv4 go into its "ipv6" list; IPv6-only devices are added as new records.
+        """
+        by_mac = {}
+        for ip, mac in found.items():
+            by_mac.setdefault(mac, []).append(ip)
+        if not by_mac:
+            return results
+        
+        for device in results:
+            addresses = by_mac.pop(device["mac"], None)
+            if addresses:
+                device["ipv6"] = sorted(addresses)
+        
+        macs = list(by_mac)
+        for mac, vendor in zip(macs, self.resolve_vendors(macs)):
+            addresses = sorted(by_mac[mac], key=lambda ip: (ip.startswith("fe80"), ip))  # Global first
+            device = DeviceRecord(addresses[0], mac, vendor, ipv6=addresses)
+            results.append(device)
+            if emit:
+                emit(device)
+        print(f"[*] IPv6: {len(found)} address(es), {len(macs)} IPv6-only device(s).")
+        return results
+
+    @staticmethod
+    def _tag(devices, iface):
+        for device in devices:
+            device["interface"] = iface["name"]
+            device["subnet"] = iface["subnet"]
+        return devices
+
+    def _scan_on_threads(self, interfaces, emit, cancel):
+        def scan_one(iface):
+            scanner = self._for_interface(iface)
+            callback = (lambda device: emit(self._tag([device], iface)[0])) if emit else None
+            networks = [ipaddress.ip_network(iface["subnet"])]
+            return self._tag(scanner._scan_networks(networks, callback, cancel), iface)
+        
+        if len(interfaces) == 1:
+            return scan_one(interfaces[0])
+        with concurrent.futures.ThreadPoolExecutor(max_workers=len(interfaces)) as executor:
+            futures = [executor.submit(scan_one, iface) for iface in interfaces]
+            return [device for future in futures for device in future.result()]
+
+    def _scan_on_process_pool(self, interfaces, emit, cancel):
+        jobs = self._segment_jobs(interfaces)
+        workers = min(len(jobs), self.max_processes or os.cpu_count() or 1)
+        print(f"[*] Sweeping {len(jobs)} segment(s) on {workers} worker process(es)...")
+        
+        ctx = multiprocessing.get_context("spawn")  # Forking a process with live threads is unsafe
+        stop_event = ctx.Event()
+        settings = self._worker_settings(workers)
+        context = {
+            "my_ip": self.my_ip, "my_mac": self.my_mac, "my_netmask": self.my_netmask,
+            "oui_index_file": self.oui_index.index_file if self.oui_index else None
+        }
+        metrics = self.current_metrics
+        results = []
+        
+        with concurrent.futures.ProcessPoolExecutor(max_workers=workers, mp_context=ctx,
+                                                    initializer=_init_segment_worker,
+                                                    initargs=(settings, context, stop_event)) as pool:
+            remaining = cancel.remaining() if cancel else None
+            pending = {
+                pool.submit(_scan_segment, {"iface": {k: v for k, v in iface.items() if k != "network"},
+                                            "targets": targets, "timeout": remaining}): iface
+                for iface, targets in jobs
+            }
+            while pending:
+                done, _ = concurrent.futures.wait(pending, timeout=POLL_INTERVAL,
+                                                  return_when=concurrent.futures.FIRST_COMPLETED)
+                if cancel and cancel.stopped():
+                    stop_event.set()
+                for future in done:
+                    iface = pending.pop(future)
+                    try:
+                        outcome = future.result()
+                    except Exception as e:
+                        print(f"[-] Segment scan on {iface['name']} failed: {e}")
+                        continue
+                    metrics.merge(outcome["phases"], outcome["counters"], outcome["probe_stats"])
+                    if outcome["timing"]:
+                        self.arp_timing.networks[outcome["timing"][0]] = outcome["timing"][1]
+                    devices = self._tag(outcome["devices"], iface)
+                    if emit:
+                        for device in devices:
+                            emit(device)
+                    results.extend(devices)
+        
+        self.arp_timing.save()
+        return results
+
+    def _worker_settings(self, workers):
+        """
+        Constructor arguments that recreate this scanner's configuration in one of
+        `workers` worker processes. The packet rates are split between the workers,
+        so together they send no faster than this scanner would on its own.
+        """
+        return {
+            "oui_file": self.oui_file, "mam_file": self.mam_file, "oui36_file": self.oui36_file,
+            "icmp_timeout": self.icmp_timeout, "icmp_rate": self.icmp_rate / workers,
+            "arp_batch_size": self.arp_batch_size, "arp_timeout": self.arp_timeout,
+            "arp_batch_timeout": self.arp_batch_timeout, "arp_rate": self.arp_rate / workers,
+            "pipelined": self.pipelined, "arp_retries": self.arp_retries,
+            "arp_timing_file": self.arp_timing.path, "all_interfaces": False,
+            "setup": False
+        }
+
+    def recent_metrics(self, n=None, kind=None):
+        """
+        Per-phase timing summaries of the last `n` scans and liveness rounds, oldest first
+        (only full sweeps with kind="full", only liveness rounds with kind="liveness").
+        """
+        return self.metrics_history.recent(n, kind)
+
+    def start_passive_discovery(self, on_device=None):
+        """
+        Starts listening for ARP, DHCP and mDNS traffic on the local subnet.
+        Returns True if the listener is running.
+        """
+        if self.passive is None:
+            from passive_discovery import PassiveDiscovery
+            self.passive = PassiveDiscovery(
+                networks=self._parse_targets(None),
+                vendor_lookup=self._get_vendor,
+                on_device=on_device
+            )
+        return self.passive.start()
+
+    def enrich_hostnames(self, devices, on_resolved=None):
+        """
+        Adds a "hostname" to each of `devices` whose name is cached, right away, and
+        resolves the missing or expired ones (reverse DNS, mDNS, NetBIOS) in a
+        background thread, calling on_resolved(mac, hostname) for each name found.
+        Names announced over DHCP/mDNS to passive discovery are used as they are.
+        Returns the background thread, or None if there was nothing to resolve.
+        """
+        if self.hostname_resolver is None:
+            from hostname_resolver import HostnameResolver, HostnameCache  # Loads asyncio
+            self.hostname_resolver = HostnameResolver(HostnameCache(self.hostname_cache_file))
+        cache = self.hostname_resolver.cache
+        
+        if self.passive:
+            for device in self.passive.devices():
+                if device.get("hostname"):
+                    cache.store(device["mac"], device["hostname"], "passive")
+        
+        now = time.time()
+        pending = []
+        with self._resolving_lock:
+            for device in devices:
+                mac = device.get("mac", "Unknown")
+                if mac == "Unknown":
+                    continue
+                fresh, hostname = cache.lookup(mac, now)
+                if hostname:
+                    device["hostname"] = hostname
+                if not fresh and mac not in self._resolving and "." in device.get("ip", ""):
+                    self._resolving.add(mac)
+                    pending.append((device["ip"], mac))
+        if not pending:
+            return None
+        
+        def run():
+            try:
+                found = self.hostname_resolver.resolve(pending)
+                print(f"[*] Hostnames: resolved {len(found)} of {len(pending)} host(s).")
+                if on_resolved:
+                    for mac, (hostname, _source) in found.items():
+                        on_resolved(mac, hostname)
+            except Exception as e:
+                print(f"[-] Hostname resolution failed: {e}")
+            finally:
+                with self._resolving_lock:
+                    self._resolving.difference_update(mac for _ip, mac in pending)
+        
+        thread = threading.Thread(target=run, daemon=True)
+        thread.start()
+        return thread
+
+    def probe_ports(self, devices, on_probed=None, force=False):
+        """
+        Attaches open TCP ports ("ports") and service descriptions ("services") to
+        `devices`: cached results right away, hosts that are new or expired probed in a
+        background thread, calling on_probed(mac, ports, services) for each.
+        `force` probes every host again. Returns the background thread, or None if
+        there was nothing to probe.
+        """
+        from port_probe import PortProber, PortCache, DEFAULT_PORTS, describe_services  # Loads asyncio
+        if self.port_prober is None:
+            self.port_prober = PortProber(self.probe_port_set or DEFAULT_PORTS, PortCache(self.port_cache_file))
+        prober = self.port_prober
+        
+        now = time.time()
+        pending = []
+        with self._resolving_lock:
+            for device in devices:
+                mac = device.get("mac", "Unknown")
+                if mac == "Unknown" or device.get("vendor") == "THIS COMPUTER":
+                    continue
+                fresh, entry = prober.cache.lookup(mac, prober.ports, now)
+                if entry:
+                    device["ports"] = entry["ports"]
+                    device["services"] = describe_services(entry["ports"], entry["banners"])
+                if (force or not fresh) and mac not in self._probing and "." in device.get("ip", ""):
+                    self._probing.add(mac)
+                    pending.append((device["ip"], mac))
+        if not pending:
+            return None
+        
+        def run():
+            try:
+                print(f"[*] Port probe: {len(pending)} host(s) x {len(prober.ports)} port(s)...")
+                found = prober.probe(pending)
+                print(f"[*] Port probe: {sum(1 for r in found.values() if r['ports'])} host(s) with open ports.")
+                if on_probed:
+                    for mac, result in found.items():
+                        on_probed(mac, result["ports"], describe_services(result["ports"], result["banners"]))
+            except Exception as e:
+                print(f"[-] Port probe failed: {e}")
+            finally:
+                with self._resolving_lock:
+                    self._probing.difference_update(mac for _ip, mac in pending)
+        
+        thread = threading.Thread(target=run, daemon=True)
+        thread.start()
+        return thread
+
+    def stop_passive_discovery(self):
+        """Stops the passive listener (the device table is kept)."""
+        if self.passive:
+            self.passive.stop()
+
+    def scheduled_scan(self, scheduler, force_discovery=False, on_device=None, cancel=None):
+        """
+        Runs one cycle of an AdaptiveScheduler: a full discovery sweep when one is due
+        (or forced), otherwise unicast ARP liveness checks on the known hosts that are due.
+        Devices heard by passive discovery count as seen and are not probed.
+        A cycle stopped through `cancel` only records the hosts that did answer.
+        Every sighting and miss also goes to `self.presence`, so a device that misses
+        a check stays listed (as "suspect") until it misses `offline_after` in a row;
+        the number of state changes this cycle is left in `self.presence_changes`.
+        Returns (devices currently present, True if this was a full sweep).
+        """
+        now = time.time()
+        presence = self.presence
+        changes_before = presence.changes
+        
+        if self.passive:
+            for device in self.passive.devices():
+                scheduler.observe(device, device["last_seen"])
+                sighting = DeviceRecord(device["ip"], device["mac"], device.get("vendor", "Unknown"),
+                                        hostname=device.get("hostname"))
+                presence.seen(sighting, device["last_seen"], keep_record=True)
+        
+        if force_discovery or scheduler.discovery_due(now):
+            if self.all_interfaces:
+                results = self.scan_all_interfaces(on_device=on_device, cancel=cancel)
+            else:
+                results = self.scan(on_device=on_device, cancel=cancel)
+            finished_at = time.time()
+            for device in results:
+                presence.seen(device, finished_at)
+            if cancel and cancel.stopped():
+                # A partial sweep says nothing about the hosts it did not reach
+                for device in results:
+                    scheduler.observe(device)
+            else:
+                scheduler.record_discovery(results, finished_at)
+                presence.end_sweep({presence.key_of(device) for device in results}, finished_at)
+            self.presence_changes = presence.changes - changes_before
+            return presence.present_devices(), True
+        
+        due = scheduler.due_hosts(now)
+        if due:
+            print(f"[*] Liveness check on {len(due)} host(s)...")
+            responded = self.probe_hosts(due, on_device=on_device, cancel=cancel)
+            finished_at = time.time()
+            for device in responded:
+                presence.seen(device, finished_at)
+            if cancel and cancel.stopped():
+                for device in responded:
+                    scheduler.observe(device)
+            else:
+                scheduler.record_probe(due, responded, finished_at)
+                answered = {presence.key_of(device) for device in responded}
+                for host in due:
+                    if presence.key_of(host) not in answered:
+                        presence.missed(host, finished_at)
+        
+        self.presence_changes = presence.changes - changes_before
+        return presence.present_devices(), False
+
+    def iter_scan(self, targets=None, cancel=None, timeout=None):
+        """
+        Generator variant of scan().
+        Yields ("device", record) as each device is discovered, then ("complete", results).
+        Closing the generator early cancels the scan.
+        """
+        events = queue.Queue()
+        cancel = CancelToken(timeout, parent=cancel)
+        
+        def run():
+            try:
+                results = self.scan(targets, on_device=lambda device: events.put(("device", device)),
+                                    cancel=cancel)
+            except Exception as e:
+                print(f"[-] Scan failed: {e}")
+                results = []
+            events.put(("complete", results))
+        
+        threading.Thread(target=run, daemon=True).start()
+        
+        try:
+            while True:
+                event = events.get()
+                yield event
+                if event[0] == "complete":
+                    return
+        finally:
+            cancel.cancel()
+
+# --- Worker processes for large multi-interface sweeps ---
+
+_worker_scanner = None
+_worker_stop = None
+
+
+def _init_segment_worker(settings, context, stop_event):
+    """
+    Process pool initializer: one quiet scanner per worker process. It skips the
+    admin check and address detection (the parent did both) and opens the vendor
+    index the parent already built, so workers never download or rebuild it.
+    """
+    global _worker_scanner, _worker_stop
+    with contextlib.redirect_stdout(io.StringIO()):
+        _worker_scanner = NetworkScanner(**settings)
+    _worker_scanner.my_ip = context["my_ip"]
+    _worker_scanner.my_mac = context["my_mac"]
+    _worker_scanner.my_netmask = context["my_netmask"]
+    if context["oui_index_file"]:
+        try:
+            _worker_scanner.oui_index = OuiIndex(context["oui_index_file"])
+        except (OSError, ValueError):
+            pass  # Devices from this worker are listed with "Unknown" vendors
+    _worker_scanner.arp_timing.path = None  # The parent merges and saves the estimates
+    _worker_stop = stop_event
+
+
+def _scan_segment(job):
+    """
+    Scans job["targets"] from job["iface"] in a worker process.
+    Returns the devices plus the metrics and ARP timing estimate recorded, for the parent to merge.
+    """
+    scanner = _worker_scanner._for_interface(job["iface"])
+    metrics = scanner.current_metrics = ScanMetrics("segment")
+    cancel = CancelToken(job["timeout"], event=_worker_stop)
+    with contextlib.redirect_stdout(io.StringIO()):
+        devices = scanner._scan_networks(scanner._parse_targets(job["targets"]), cancel=cancel)
+    key = scanner._timing_key()
+    entry = scanner.arp_timing.networks.get(key)
+    return {
+        "devices": devices,
+        "phases": metrics.phases,
+        "counters": dict(metrics.counters),
+        "probe_stats": metrics.probe_stats(),
+        "timing": (key, entry) if entry else None
+    }
+
+
 if __name__ == "__main__":
     scanner = NetworkScanner()
     results = scanner.scan()